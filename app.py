@@ -1,6 +1,7 @@
+import sys
+import time
 import streamlit as st
 from frontend.login import render_login_page
-from frontend.dashboard import render_dashboard
 
 # --- PAGE CONFIG ---
 st.set_page_config(page_title="Secure Audit Portal", layout="wide")
@@ -11,6 +12,17 @@ if "logged_in" not in st.session_state:
 
 # --- ROUTING ---
 if st.session_state["logged_in"]:
+    # Backend modules load only once someone has logged in; the model and
+    # index warm up in the background while the dashboard renders (in
+    # thin-client mode the API server owns them; only the client warms up)
+    from backend.warmup import record_step, start_warmup
+    from config import API_URL
+    start_warmup(thin_client=bool(API_URL))
+    first_import = "frontend.dashboard" not in sys.modules
+    start = time.perf_counter()
+    from frontend.dashboard import render_dashboard
+    if first_import:
+        record_step("import_dashboard", (time.perf_counter() - start) * 1000)
     render_dashboard()
 else:
-    render_login_page()
\ No newline at end of file
+    render_login_page()
@@ -0,0 +1,131 @@
+# backend/answer_cache.py
+import re
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+from config import ANSWER_CACHE_SIZE, ANSWER_CACHE_TTL, ANSWER_CACHE_SIMILARITY
+from backend import vector_store
+
+
+def normalize_question(question):
+    return re.sub(r"\s+", " ", re.sub(r"[^\w\s]", " ", question.lower())).strip()
+
+
+def _context_key(allowed_levels, retrieval_results):
+    # Same clearance + same retrieved chunks = same grounding for the LLM
+    chunk_ids = tuple(retrieval_results["ids"][0]) if retrieval_results else ()
+    return tuple(sorted(allowed_levels)), chunk_ids
+
+
+class AnswerCache:
+    """
+    LRU/TTL cache of generated answers, keyed by clearance, retrieved chunk
+    IDs and the normalized question. Questions phrased differently still hit
+    when their embeddings are near-identical and they retrieved the same
+    chunks. The whole cache is dropped when the collection changes.
+    """
+
+    def __init__(self, max_entries=ANSWER_CACHE_SIZE, ttl=ANSWER_CACHE_TTL, similarity=ANSWER_CACHE_SIMILARITY):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.similarity = similarity
+        self._entries = OrderedDict()
+        self._by_context = {}
+        self._generation = vector_store.get_generation()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "semantic_hits": 0, "misses": 0, "evictions": 0, "invalidations": 0}
+
+    def _check_generation(self):
+        generation = vector_store.get_generation()
+        if generation != self._generation:
+            self._entries.clear()
+            self._by_context.clear()
+            self._generation = generation
+            self.stats["invalidations"] += 1
+
+    def _drop(self, key):
+        self._entries.pop(key, None)
+        keys = self._by_context.get(key[:2])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_context[key[:2]]
+
+    def _live(self, key, now):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if now - entry["created"] > self.ttl:
+            self._drop(key)
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def lookup(self, question, allowed_levels, retrieval_results):
+        context = _context_key(allowed_levels, retrieval_results)
+        key = context + (normalize_question(question),)
+        now = time.time()
+        with self._lock:
+            self._check_generation()
+            entry = self._live(key, now)
+            if entry is not None:
+                self.stats["hits"] += 1
+                return entry["answer"]
+            candidates = list(self._by_context.get(context, ()))
+
+        # Near-duplicate check only among answers grounded on the same chunks
+        if candidates:
+            vector = np.asarray(vector_store.embed([question])[0])
+            with self._lock:
+                for candidate in candidates:
+                    entry = self._live(candidate, now)
+                    if entry is not None and float(np.dot(vector, entry["vector"])) >= self.similarity:
+                        self.stats["semantic_hits"] += 1
+                        return entry["answer"]
+
+        with self._lock:
+            self.stats["misses"] += 1
+        return None
+
+    def store(self, question, allowed_levels, retrieval_results, answer):
+        context = _context_key(allowed_levels, retrieval_results)
+        key = context + (normalize_question(question),)
+        vector = np.asarray(vector_store.embed([question])[0])
+        with self._lock:
+            self._check_generation()
+            self._drop(key)
+            self._entries[key] = {"answer": answer, "vector": vector, "created": time.time()}
+            self._by_context.setdefault(context, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                oldest = next(iter(self._entries))
+                self._drop(oldest)
+                self.stats["evictions"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_context.clear()
+
+    def get_stats(self):
+        with self._lock:
+            return {**self.stats, "entries": len(self._entries)}
+
+
+_cache = AnswerCache()
+
+
+def lookup_answer(question, allowed_levels, retrieval_results):
+    return _cache.lookup(question, allowed_levels, retrieval_results)
+
+
+def store_answer(question, allowed_levels, retrieval_results, answer):
+    _cache.store(question, allowed_levels, retrieval_results, answer)
+
+
+def clear_answers():
+    _cache.clear()
+
+
+def get_stats():
+    return _cache.get_stats()
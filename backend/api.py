@@ -0,0 +1,297 @@
+# backend/api.py
+"""
+HTTP query service in front of backend/database.py and backend/llm.py.
+
+    python -m backend.api --workers 4          # or: uvicorn backend.api:app --workers 4
+
+Callers identify themselves with X-User / X-Role headers (the same trust
+model as the Streamlit login) and must send "Authorization: Bearer
+<AUDIT_API_TOKEN>": anyone who can reach the port can claim any role, so
+without a token every request is refused. AUDIT_API_INSECURE=1 drops the
+token check for local testing and only binds to localhost. Blocking work (Chroma, ONNX, SQLite) runs
+in the threadpool; each worker process keeps one Chroma client, one
+pooled Ollama connection (backend/llm_gateway.py) and one audit-log writer.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from contextlib import asynccontextmanager
+from datetime import date
+from typing import List, Optional
+from fastapi import Depends, FastAPI, Header, HTTPException, Request
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from pydantic import BaseModel
+from starlette.concurrency import iterate_in_threadpool, run_in_threadpool
+from config import (API_INSECURE, API_PORT, API_TOKEN, API_WORKERS, BATCH_MAX_QUESTIONS, CHROMA_HOST, DATA_FOLDER,
+                    SECURITY_LEVELS, VECTOR_BACKEND)
+from backend import metrics
+from backend.answer_cache import lookup_answer, store_answer
+from backend.audit_log import count_audit_logs, get_audit_logs, get_log_stats, get_status_summary
+from backend.database import (delete_document, get_allowed_levels, index_saved_file, list_documents,
+                              query_documents, reclassify_document, reset_database)
+from backend.llm import format_sources, generate_rag_response, stream_text
+from backend.questionnaire import run_questionnaire, summarize
+from backend.snapshots import create_snapshot, list_snapshots, restore_snapshot
+from backend.vector_store import get_health
+from backend.warmup import get_warmup_status, start_warmup
+
+ROLES = ["Junior Auditor", "Manager", "Admin"]
+UPLOAD_EXTENSIONS = (".pdf", ".txt")
+MAX_LOG_PAGE = 1000
+
+
+@asynccontextmanager
+async def lifespan(app):
+    # Load the model and open the index before the first request, not during it
+    start_warmup()
+    yield
+
+
+app = FastAPI(title="Secure Audit AI", lifespan=lifespan)
+
+
+class Question(BaseModel):
+    question: str
+
+
+class Questionnaire(BaseModel):
+    questions: List[str]
+    ids: Optional[List[str]] = None
+
+
+def get_identity(x_user: str = Header(...), x_role: str = Header(...),
+                 authorization: Optional[str] = Header(None)):
+    if not API_TOKEN and not API_INSECURE:
+        raise HTTPException(status_code=503, detail="AUDIT_API_TOKEN is not set on the server")
+    if API_TOKEN and authorization != f"Bearer {API_TOKEN}":
+        raise HTTPException(status_code=401, detail="Invalid or missing API token")
+    if x_role not in ROLES:
+        raise HTTPException(status_code=400, detail=f"Unknown role {x_role!r}")
+    return x_user, x_role
+
+
+def require_admin(identity=Depends(get_identity)):
+    if identity[1] != "Admin":
+        raise HTTPException(status_code=403, detail="Admin role required")
+    return identity
+
+
+def _sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@app.post("/query")
+async def query(body: Question, identity=Depends(get_identity)):
+    user, role = identity
+    results, status = await run_in_threadpool(query_documents, body.question, role, user)
+    return {"status": status, "results": results}
+
+
+@app.post("/answer")
+async def answer(body: Question, identity=Depends(get_identity)):
+    """
+    Server-sent events: one "status", then "token" events while the answer
+    streams, then "done" with sources and timing metrics (or "error").
+    """
+    user, role = identity
+    question = body.question
+    results, status = await run_in_threadpool(query_documents, question, role, user)
+
+    async def events():
+        yield _sse("status", {"status": status})
+        if status != "success":
+            yield _sse("done", {"sources": [], "metrics": {}, "cached": False})
+            return
+
+        allowed_levels = get_allowed_levels(role)
+        cached = lookup_answer(question, allowed_levels, results)
+        if cached is not None:
+            yield _sse("token", {"text": cached})
+            yield _sse("done", {"sources": [], "metrics": {}, "cached": True})
+            return
+
+        generation = {}
+        started = time.perf_counter()
+        stream, sources = generate_rag_response(question, results, prompt_stats=generation, user=user)
+        if isinstance(stream, str):
+            yield _sse("error", {"message": stream})
+            return
+        parts = []
+        # The gateway stream blocks on a queue, so drain it off the event loop
+        async for text in iterate_in_threadpool(stream_text(stream, started, generation)):
+            if "error" in generation:
+                # Failed mid-stream: report it, and keep it out of the answer cache
+                yield _sse("error", {"message": text})
+                return
+            parts.append(text)
+            yield _sse("token", {"text": text})
+        store_answer(question, allowed_levels, results, "".join(parts) + format_sources(sources))
+        yield _sse("done", {"sources": sources, "metrics": generation, "cached": False})
+
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+@app.post("/batch")
+async def batch(body: Questionnaire, identity=Depends(get_identity)):
+    """
+    Server-sent events: one "item" per question as it completes (denials
+    and cached answers first), then "done" with a summary.
+    """
+    user, role = identity
+    if len(body.questions) > BATCH_MAX_QUESTIONS:
+        raise HTTPException(status_code=400, detail=f"At most {BATCH_MAX_QUESTIONS} questions per batch")
+    ids = body.ids or [str(n) for n in range(1, len(body.questions) + 1)]
+    if len(ids) != len(body.questions):
+        raise HTTPException(status_code=400, detail="ids and questions differ in length")
+
+    async def events():
+        items = []
+        async for item in iterate_in_threadpool(run_questionnaire(list(zip(ids, body.questions)), role, user)):
+            items.append(item)
+            yield _sse("item", item)
+        yield _sse("done", summarize(items))
+
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+@app.post("/documents")
+async def upload(request: Request, filename: str, security: str = "low", identity=Depends(get_identity)):
+    """
+    Raw request body is the file; streamed to DATA_FOLDER, then indexed.
+    """
+    name = os.path.basename(filename)
+    if not name.lower().endswith(UPLOAD_EXTENSIONS):
+        raise HTTPException(status_code=400, detail="Only PDF and TXT files are supported")
+    if security not in SECURITY_LEVELS:
+        raise HTTPException(status_code=400, detail=f"security must be one of {SECURITY_LEVELS}")
+
+    os.makedirs(DATA_FOLDER, exist_ok=True)
+    file_path = os.path.join(DATA_FOLDER, name)
+    with open(file_path, "wb") as f:
+        async for chunk in request.stream():
+            f.write(chunk)
+    result = await run_in_threadpool(index_saved_file, file_path, name, security)
+    if result is None:
+        raise HTTPException(status_code=422, detail="No text could be indexed from the file")
+    return result
+
+
+@app.get("/documents")
+async def documents(identity=Depends(require_admin)):
+    return {"documents": await run_in_threadpool(list_documents)}
+
+
+@app.delete("/documents/{source:path}")
+async def delete(source: str, identity=Depends(require_admin)):
+    user, role = identity
+    chunks = await run_in_threadpool(delete_document, source, user, role)
+    if not chunks:
+        raise HTTPException(status_code=404, detail=f"{source!r} is not indexed")
+    return {"source": source, "deleted": chunks}
+
+
+@app.patch("/documents/{source:path}")
+async def reclassify(source: str, security: str, identity=Depends(require_admin)):
+    user, role = identity
+    if security not in SECURITY_LEVELS:
+        raise HTTPException(status_code=400, detail=f"security must be one of {SECURITY_LEVELS}")
+    chunks = await run_in_threadpool(reclassify_document, source, security, user, role)
+    if chunks is None:
+        raise HTTPException(status_code=404, detail=f"{source!r} is not indexed")
+    return {"source": source, "security": security, "chunks": chunks}
+
+
+@app.get("/snapshots")
+async def snapshots(identity=Depends(require_admin)):
+    return {"snapshots": await run_in_threadpool(list_snapshots)}
+
+
+@app.post("/snapshots")
+async def snapshot(label: Optional[str] = None, identity=Depends(require_admin)):
+    try:
+        return await run_in_threadpool(create_snapshot, label)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.post("/snapshots/{name}/restore")
+async def restore(name: str, identity=Depends(require_admin)):
+    try:
+        await run_in_threadpool(restore_snapshot, name)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    return {"restored": name}
+
+
+@app.post("/reset")
+async def reset(identity=Depends(require_admin)):
+    """
+    Wipes the whole index (vector store, lexical index, manifest); saved
+    uploads in DATA_FOLDER and the audit log are kept.
+    """
+    user, role = identity
+    await run_in_threadpool(reset_database, user, role)
+    return {"reset": True}
+
+
+@app.get("/logs")
+async def logs(user: Optional[str] = None, status: Optional[str] = None, start_date: Optional[date] = None,
+               end_date: Optional[date] = None, limit: int = 100, offset: int = 0,
+               identity=Depends(get_identity)):
+    filters = {"user": user, "status": status, "start_date": start_date, "end_date": end_date}
+    limit = max(1, min(limit, MAX_LOG_PAGE))
+    total = await run_in_threadpool(count_audit_logs, **filters)
+    page = await run_in_threadpool(get_audit_logs, **filters, limit=limit, offset=max(0, offset))
+    stats = get_log_stats()
+    return {"total": total, "entries": page.to_dict(orient="records"),
+            "write_error": stats["last_error"] if stats["failing"] else None, "unwritten": stats["pending"]}
+
+
+@app.get("/logs/summary")
+async def logs_summary(start_date: Optional[date] = None, end_date: Optional[date] = None,
+                       identity=Depends(get_identity)):
+    summary = await run_in_threadpool(get_status_summary, start_date, end_date)
+    return {"entries": summary.to_dict(orient="records")}
+
+
+@app.get("/health")
+async def health():
+    health = await run_in_threadpool(get_health)
+    return {**health, "warmup": get_warmup_status()}
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    # Per worker process: scrape each worker, or run one worker per container
+    return metrics.registry.to_prometheus()
+
+
+def main(argv=None):
+    import uvicorn
+    parser = argparse.ArgumentParser(description="Run the Secure Audit AI query service.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=API_PORT)
+    parser.add_argument("--workers", type=int, default=API_WORKERS)
+    args = parser.parse_args(argv)
+    if not API_TOKEN:
+        if not API_INSECURE:
+            parser.error("set AUDIT_API_TOKEN (or AUDIT_API_INSECURE=1 for local testing)")
+        if args.host not in ("127.0.0.1", "localhost", "::1"):
+            parser.error("AUDIT_API_INSECURE=1 only serves localhost; set AUDIT_API_TOKEN to bind elsewhere")
+        print("WARNING: AUDIT_API_INSECURE=1, any local process can act as any role", file=sys.stderr)
+
+    workers = args.workers
+    if workers > 1 and (not CHROMA_HOST or VECTOR_BACKEND != "chroma"):
+        # Embedded stores keep their index in process memory; several writers would diverge
+        print("Embedded vector store: running 1 worker (use Chroma with CHROMA_HOST to scale out)",
+              file=sys.stderr)
+        workers = 1
+    uvicorn.run("backend.api:app", host=args.host, port=args.port, workers=workers)
+
+
+if __name__ == "__main__":
+    main()
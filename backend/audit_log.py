@@ -1,32 +1,319 @@
 # backend/audit_log.py
-import pandas as pd
+import atexit
+import csv
 import os
+import queue
+import sqlite3
+import threading
+import time
+from collections import Counter
 from datetime import datetime
-from config import WORKING_DIR
+from config import WORKING_DIR, LOG_FLUSH_SIZE, LOG_FLUSH_INTERVAL, LOG_FLUSH_TIMEOUT
+
+LOG_DB = os.path.join(WORKING_DIR, "audit_log.sqlite3")
+LEGACY_LOG_FILE = os.path.join(WORKING_DIR, "audit_log.csv")
+COLUMNS = ["Timestamp", "User", "Role", "Action", "Query", "Status"]
+
+_conn = None
+_lock = threading.Lock()
+
+# Background writer: log_action() only enqueues, a flusher thread batches inserts
+_queue = queue.Queue()
+_writer = None
+_writer_lock = threading.Lock()
+_stop = threading.Event()
+# Entries taken off the queue but not yet written; shared so shutdown_logs() can finish them
+_inflight = []
+_inflight_lock = threading.Lock()
+_stats = {"enqueued": 0, "written": 0, "flushes": 0, "errors": 0, "failing": False, "last_error": "",
+          "last_flush_ms": 0.0, "max_flush_ms": 0.0, "total_flush_ms": 0.0}
+
+
+def _get_connection():
+    """
+    Opens the shared SQLite log (WAL mode, so dashboard reads never block
+    writers) and imports the old CSV log the first time.
+    """
+    global _conn
+    if _conn is None:
+        conn = sqlite3.connect(LOG_DB, timeout=30, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS audit_log (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                timestamp TEXT NOT NULL,
+                user TEXT,
+                role TEXT,
+                action TEXT,
+                query TEXT,
+                status TEXT
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_audit_timestamp ON audit_log (timestamp)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_audit_user ON audit_log (user, timestamp)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_audit_status ON audit_log (status, timestamp)")
+        # Entry counts per day/user/status, kept current by write_entries()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS audit_daily (
+                day TEXT NOT NULL,
+                user TEXT NOT NULL,
+                status TEXT NOT NULL,
+                count INTEGER NOT NULL,
+                PRIMARY KEY (day, user, status)
+            )
+        """)
+        _import_legacy_csv(conn)
+        _backfill_daily(conn)
+        conn.commit()
+        _conn = conn
+    return _conn
+
+
+def _import_legacy_csv(conn):
+    if not os.path.exists(LEGACY_LOG_FILE):
+        return
+    with open(LEGACY_LOG_FILE, newline="", encoding="utf-8") as f:
+        rows = [tuple(row.get(c) for c in COLUMNS) for row in csv.DictReader(f)]
+    conn.executemany(
+        "INSERT INTO audit_log (timestamp, user, role, action, query, status) VALUES (?, ?, ?, ?, ?, ?)",
+        sorted(rows, key=lambda r: r[0] or "")
+    )
+    os.replace(LEGACY_LOG_FILE, LEGACY_LOG_FILE + ".imported")
+
+
+def _backfill_daily(conn):
+    # Logs written before the aggregate table existed are counted once
+    if conn.execute("SELECT 1 FROM audit_daily LIMIT 1").fetchone():
+        return
+    conn.execute("""
+        INSERT INTO audit_daily (day, user, status, count)
+        SELECT substr(timestamp, 1, 10), COALESCE(user, ''), COALESCE(status, ''), COUNT(*)
+        FROM audit_log GROUP BY 1, 2, 3
+    """)
+
+
+def make_entry(user, role, action, query, status):
+    return (datetime.now().strftime("%Y-%m-%d %H:%M:%S"), user, role, action, query, status)
+
+
+def write_entries(entries):
+    """
+    Appends several log rows and their daily aggregates in one transaction.
+    """
+    daily = Counter((e[0][:10], e[1] or "", e[5] or "") for e in entries)
+    with _lock:
+        conn = _get_connection()
+        with conn:
+            conn.executemany(
+                "INSERT INTO audit_log (timestamp, user, role, action, query, status) VALUES (?, ?, ?, ?, ?, ?)",
+                entries
+            )
+            conn.executemany(
+                "INSERT INTO audit_daily (day, user, status, count) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (day, user, status) DO UPDATE SET count = count + excluded.count",
+                [(day, user, status, n) for (day, user, status), n in daily.items()]
+            )
+
+
+def _flush_batch(batch):
+    start = time.perf_counter()
+    write_entries(batch)
+    elapsed = (time.perf_counter() - start) * 1000
+    _stats["flushes"] += 1
+    _stats["written"] += len(batch)
+    _stats["last_flush_ms"] = elapsed
+    _stats["total_flush_ms"] += elapsed
+    _stats["max_flush_ms"] = max(_stats["max_flush_ms"], elapsed)
+
+
+def _flush_inflight(extra=()):
+    with _inflight_lock:
+        batch = _inflight + list(extra)
+        if batch:
+            _flush_batch(batch)
+        _inflight.clear()
+    _stats["failing"] = False
+    for _ in batch:
+        _queue.task_done()
+
+
+def _writer_loop():
+    deadline = None
+    while not (_stop.is_set() and _queue.empty() and not _inflight):
+        timeout = LOG_FLUSH_INTERVAL if deadline is None else max(0.0, deadline - time.monotonic())
+        try:
+            entry = _queue.get(timeout=timeout)
+            with _inflight_lock:
+                _inflight.append(entry)
+            if deadline is None:
+                deadline = time.monotonic() + LOG_FLUSH_INTERVAL
+        except queue.Empty:
+            pass
+
+        if _inflight and (len(_inflight) >= LOG_FLUSH_SIZE or time.monotonic() >= deadline or _stop.is_set()):
+            try:
+                _flush_inflight()
+            except Exception as e:
+                # Keep the batch and retry on the next cycle rather than drop entries
+                _stats["errors"] += 1
+                _stats["failing"] = True
+                _stats["last_error"] = f"{type(e).__name__}: {e}"
+                if _stop.is_set():
+                    break  # shutdown_logs() makes the last attempt
+                time.sleep(LOG_FLUSH_INTERVAL)
+                continue
+            deadline = None
+
+
+def _ensure_writer():
+    global _writer
+    if _writer is None or not _writer.is_alive():
+        with _writer_lock:
+            if _writer is None or not _writer.is_alive():
+                _stop.clear()
+                _writer = threading.Thread(target=_writer_loop, name="audit-log-writer", daemon=True)
+                _writer.start()
 
-LOG_FILE = os.path.join(WORKING_DIR, "audit_log.csv")
 
 def log_action(user, role, action, query, status):
     """
-    Logs an event to a CSV file.
-    """
-    new_entry = {
-        "Timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-        "User": user,
-        "Role": role,
-        "Action": action,
-        "Query": query,
-        "Status": status
-    }
-    
-    df = pd.DataFrame([new_entry])
-    
-    if not os.path.exists(LOG_FILE):
-        df.to_csv(LOG_FILE, index=False)
-    else:
-        df.to_csv(LOG_FILE, mode='a', header=False, index=False)
-
-def get_audit_logs():
-    if os.path.exists(LOG_FILE):
-        return pd.read_csv(LOG_FILE).sort_values(by="Timestamp", ascending=False)
-    return pd.DataFrame(columns=["Timestamp", "User", "Role", "Action", "Query", "Status"])
\ No newline at end of file
+    Logs an event to the audit log. The row is timestamped now and written
+    by the background writer within LOG_FLUSH_INTERVAL seconds.
+    """
+    _ensure_writer()
+    _queue.put(make_entry(user, role, action, query, status))
+    _stats["enqueued"] += 1
+
+
+def flush_logs(timeout=LOG_FLUSH_TIMEOUT):
+    """
+    Waits up to timeout seconds for queued entries to be written and returns
+    whether they all were. While the writer is failing it returns False at
+    once, so reads show the rows written so far instead of hanging; the
+    error is reported by get_log_stats().
+    """
+    if _writer is None or not _writer.is_alive() or _stats["failing"]:
+        return not _queue.unfinished_tasks
+    deadline = time.monotonic() + timeout
+    with _queue.all_tasks_done:
+        while _queue.unfinished_tasks:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or _stats["failing"]:
+                return False
+            _queue.all_tasks_done.wait(min(remaining, LOG_FLUSH_INTERVAL))
+    return True
+
+
+@atexit.register
+def shutdown_logs():
+    # Drain on interpreter exit so nothing queued or in flight is lost
+    _stop.set()
+    if _writer is not None:
+        _writer.join(timeout=10)
+    leftover = []
+    while True:
+        try:
+            leftover.append(_queue.get_nowait())
+        except queue.Empty:
+            break
+    # Waits for a write the writer may still be in, then takes what it left
+    _flush_inflight(leftover)
+
+
+def get_log_stats():
+    stats = dict(_stats)
+    stats["queue_depth"] = _queue.qsize()
+    stats["pending"] = _queue.unfinished_tasks
+    stats["avg_flush_ms"] = stats["total_flush_ms"] / stats["flushes"] if stats["flushes"] else 0.0
+    return stats
+
+
+def _where(user=None, status=None, start_date=None, end_date=None, after_id=None, max_id=None):
+    clauses, params = [], []
+    if after_id is not None:
+        clauses.append("id > ?")
+        params.append(after_id)
+    if max_id is not None:
+        clauses.append("id <= ?")
+        params.append(max_id)
+    if user:
+        clauses.append("user = ?")
+        params.append(user)
+    if status:
+        clauses.append("status = ?")
+        params.append(status)
+    if start_date:
+        clauses.append("timestamp >= ?")
+        params.append(f"{start_date} 00:00:00")
+    if end_date:
+        clauses.append("timestamp <= ?")
+        params.append(f"{end_date} 23:59:59")
+    return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+
+def get_audit_logs(user=None, status=None, start_date=None, end_date=None, limit=100, offset=0, max_id=None):
+    """
+    Returns one page of log rows, newest first, as a DataFrame. max_id pins
+    the page to a snapshot so rows written meanwhile don't shift it.
+    """
+    import pandas as pd
+    flush_logs()
+    where, params = _where(user, status, start_date, end_date, max_id=max_id)
+    with _lock:
+        rows = _get_connection().execute(
+            f"SELECT timestamp, user, role, action, query, status FROM audit_log{where} "
+            "ORDER BY timestamp DESC, id DESC LIMIT ? OFFSET ?",
+            params + [limit, offset]
+        ).fetchall()
+    return pd.DataFrame(rows, columns=COLUMNS)
+
+
+def count_audit_logs(user=None, status=None, start_date=None, end_date=None, after_id=None, max_id=None):
+    flush_logs()
+    where, params = _where(user, status, start_date, end_date, after_id, max_id)
+    with _lock:
+        return _get_connection().execute(f"SELECT COUNT(*) FROM audit_log{where}", params).fetchone()[0]
+
+
+def get_latest_log_id():
+    """
+    Highest written row id (0 when empty); cheap enough to poll on every rerun.
+    """
+    flush_logs()
+    with _lock:
+        return _get_connection().execute("SELECT COALESCE(MAX(id), 0) FROM audit_log").fetchone()[0]
+
+
+def get_log_filter_values():
+    """
+    Distinct users and statuses, for the dashboard filter widgets.
+    """
+    flush_logs()
+    with _lock:
+        conn = _get_connection()
+        users = [r[0] for r in conn.execute("SELECT DISTINCT user FROM audit_daily ORDER BY user")]
+        statuses = [r[0] for r in conn.execute("SELECT DISTINCT status FROM audit_daily ORDER BY status")]
+    return users, statuses
+
+
+def get_status_summary(start_date=None, end_date=None):
+    """
+    Per-day, per-user, per-status entry counts from the aggregate table,
+    as a DataFrame with columns Day, User, Status, Count.
+    """
+    import pandas as pd
+    flush_logs()
+    clauses, params = [], []
+    if start_date:
+        clauses.append("day >= ?")
+        params.append(str(start_date))
+    if end_date:
+        clauses.append("day <= ?")
+        params.append(str(end_date))
+    where = " WHERE " + " AND ".join(clauses) if clauses else ""
+    with _lock:
+        rows = _get_connection().execute(
+            f"SELECT day, user, status, count FROM audit_daily{where} ORDER BY day", params
+        ).fetchall()
+    return pd.DataFrame(rows, columns=["Day", "User", "Status", "Count"])
@@ -0,0 +1,421 @@
+# backend/benchmark.py
+"""
+Offline benchmark: synthetic corpus -> ingest -> per-role queries -> generation
+against the fake Ollama. Results are JSON so runs can be diffed across commits.
+
+    python -m backend.benchmark --docs 24 --out bench.json
+    python -m backend.benchmark --docs 24 --baseline bench.json
+
+Everything (data/, audit_db_storage/, embedding_cache/, the audit log) is
+created in a scratch working directory, so the real stores are never touched.
+The MiniLM ONNX model must already be in the local Chroma cache.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+LEVELS = ["low", "medium", "high"]
+ROLES = ["Junior Auditor", "Manager", "Admin"]
+
+_FAMILIES = ["AC", "AU", "CM", "IA", "IR", "SC", "SI", "RA"]
+_TEAMS = ["Internal Audit", "IT Risk", "Finance Controls", "Security Operations", "Compliance"]
+_SEVERITIES = ["low", "moderate", "significant", "material"]
+_FILLER = [
+    "Management provided the population listing and the sample was selected at random.",
+    "Evidence was inspected for approval prior to the change being deployed.",
+    "The reviewer confirmed segregation of duties between requestor and approver.",
+    "Exceptions were discussed with the process owner and remediation dates were agreed.",
+    "Quarterly access reviews were performed and signed off by the system owner.",
+    "Walkthrough procedures confirmed the design of the control was appropriate.",
+    "Reconciliations were prepared monthly and reviewed within five business days.",
+    "Backup restoration was tested and the results were retained as evidence.",
+    "Terminated users were removed from the application within the agreed timeframe.",
+    "Configuration baselines were compared against the hardening standard.",
+]
+
+
+# --- Synthetic corpus -------------------------------------------------------
+
+def make_document(rng, doc_index, paragraphs):
+    """
+    Returns (paragraph_list, needles). Each needle is a (control_id, finding)
+    fact that appears exactly once in the corpus, so a query for it has one
+    correct source.
+    """
+    needles = []
+    body = [f"Audit Workpaper {doc_index:04d}"]
+    for p in range(paragraphs):
+        sentences = rng.sample(_FILLER, 3)
+        if p % 3 == 0:
+            control = f"{_FAMILIES[(doc_index + p) % len(_FAMILIES)]}-{doc_index * 100 + p}"
+            finding = f"FND-{doc_index:04d}-{p:02d}"
+            sentences.insert(1, f"Control {control} was tested by {rng.choice(_TEAMS)} and finding "
+                                f"{finding} was rated {rng.choice(_SEVERITIES)}.")
+            needles.append((control, finding))
+        body.append(" ".join(sentences))
+    return body, needles
+
+
+def _pdf_escape(text):
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def _wrap(paragraphs, width=95):
+    lines = []
+    for paragraph in paragraphs:
+        line = ""
+        for word in paragraph.split():
+            if line and len(line) + len(word) + 1 > width:
+                lines.append(line)
+                line = word
+            else:
+                line = f"{line} {word}" if line else word
+        lines.append(line)
+        lines.append("")
+    return lines
+
+
+def write_pdf(path, paragraphs, lines_per_page=56):
+    """
+    Writes a minimal uncompressed PDF (Helvetica text only) that pypdf can
+    extract, so the benchmark needs no PDF-authoring dependency.
+    """
+    lines = _wrap(paragraphs)
+    pages = [lines[i:i + lines_per_page] for i in range(0, len(lines), lines_per_page)] or [[]]
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>", None,
+               "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for page_lines in pages:
+        ops = ["BT", "/F1 10 Tf", "12 TL", "50 790 Td"]
+        ops += [f"({_pdf_escape(line)}) Tj T*" for line in page_lines]
+        ops.append("ET")
+        stream = "\n".join(ops).encode("latin-1")
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream.decode('latin-1')}\nendstream")
+        content_ref = len(objects)
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 842] "
+                       f"/Resources << /Font << /F1 3 0 R >> >> /Contents {content_ref} 0 R >>")
+        kids.append(f"{len(objects)} 0 R")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>"
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n{body}\nendobj\n".encode("latin-1")
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode("latin-1")
+    for offset in offsets:
+        out += f"{offset:010d} 00000 n \n".encode("latin-1")
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode("latin-1")
+    with open(path, "wb") as f:
+        f.write(out)
+
+
+def generate_corpus(folder, docs, paragraphs, pdf_share, seed):
+    """
+    Writes docs files into folder with levels cycling low/medium/high.
+    Returns a list of {"name", "path", "security", "needles"}.
+    """
+    rng = random.Random(seed)
+    os.makedirs(folder, exist_ok=True)
+    corpus = []
+    pdf_every = round(1 / pdf_share) if pdf_share > 0 else 0
+    for i in range(docs):
+        body, needles = make_document(rng, i, paragraphs)
+        is_pdf = pdf_every and i % pdf_every == 0
+        name = f"workpaper_{i:04d}.{'pdf' if is_pdf else 'txt'}"
+        path = os.path.join(folder, name)
+        if is_pdf:
+            write_pdf(path, body)
+        else:
+            with open(path, "w", encoding="utf-8") as f:
+                f.write("\n\n".join(body))
+        corpus.append({"name": name, "path": path, "security": LEVELS[i % len(LEVELS)], "needles": needles})
+    return corpus
+
+
+def make_queries(corpus, count, seed):
+    rng = random.Random(seed + 1)
+    facts = [(doc["name"], doc["security"], control, finding)
+             for doc in corpus for control, finding in doc["needles"]]
+    rng.shuffle(facts)
+    return [{"question": f"What finding was raised for control {control}?", "source": name,
+             "security": security, "finding": finding}
+            for name, security, control, finding in facts[:count]]
+
+
+# --- Stages -----------------------------------------------------------------
+
+class _Upload:
+    # Mimics the Streamlit UploadedFile attributes process_file_upload uses
+    def __init__(self, path):
+        self.name = os.path.basename(path)
+        with open(path, "rb") as f:
+            self._data = f.read()
+
+    def getbuffer(self):
+        return memoryview(self._data)
+
+
+def bench_ingest(corpus):
+    from backend.database import process_file_upload, get_vector_collection
+    from backend.llm_loadtest import percentile
+
+    def upload_all():
+        timings, failures = [], 0
+        started = time.perf_counter()
+        for doc in corpus:
+            upload = _Upload(doc["path"])
+            t = time.perf_counter()
+            if not process_file_upload(upload, doc["security"]):
+                failures += 1
+            timings.append((time.perf_counter() - t) * 1000)
+        return time.perf_counter() - started, timings, failures
+
+    total_bytes = sum(os.path.getsize(doc["path"]) for doc in corpus)
+    cold_seconds, timings, failures = upload_all()
+    chunks = get_vector_collection().count()
+    # Second pass hits the content-hash manifest and should be near free
+    warm_seconds, _, _ = upload_all()
+    return {
+        "docs": len(corpus),
+        "failures": failures,
+        "bytes": total_bytes,
+        "chunks": chunks,
+        "seconds": round(cold_seconds, 3),
+        "docs_per_sec": round(len(corpus) / cold_seconds, 2),
+        "chunks_per_sec": round(chunks / cold_seconds, 2),
+        "mb_per_sec": round(total_bytes / 1e6 / cold_seconds, 3),
+        "upload_p50_ms": round(percentile(timings, 50), 1),
+        "upload_p95_ms": round(percentile(timings, 95), 1),
+        "unchanged_reupload_seconds": round(warm_seconds, 3),
+    }
+
+
+def bench_queries(queries):
+    from backend.database import get_allowed_levels, query_documents
+    from backend.llm_loadtest import percentile
+
+    report = {}
+    for role in ROLES:
+        allowed = get_allowed_levels(role)
+        timings = []
+        eligible = hits = answered = denied = leaks = 0
+        for q in queries:
+            t = time.perf_counter()
+            results, status = query_documents(q["question"], role, "benchmark")
+            timings.append((time.perf_counter() - t) * 1000)
+            metadatas = results["metadatas"][0] if results else []
+            sources = [m.get("source") for m in metadatas]
+            leaks += sum(1 for m in metadatas if m.get("security") not in allowed)
+            if status == "success":
+                answered += 1
+            elif status == "denied":
+                denied += 1
+            if q["security"] in allowed:
+                eligible += 1
+                hits += q["source"] in sources
+        report[role] = {
+            "queries": len(queries),
+            "eligible": eligible,
+            "recall_at_k": round(hits / eligible, 3) if eligible else None,
+            "answered": answered,
+            "denied": denied,
+            "leaks": leaks,
+            "latency_p50_ms": round(percentile(timings, 50), 1),
+            "latency_p95_ms": round(percentile(timings, 95), 1),
+            "latency_p99_ms": round(percentile(timings, 99), 1),
+        }
+    return report
+
+
+def bench_lexical(queries):
+    # BM25 lookups alone (no RBAC, no embedding), i.e. the lexical_search stage of hybrid retrieval
+    from backend import lexical_index
+    from backend.llm_loadtest import percentile
+    from config import RETRIEVAL_CANDIDATES, RETRIEVAL_TOP_K
+
+    limit = max(RETRIEVAL_TOP_K, RETRIEVAL_CANDIDATES)
+    timings = []
+    hits = 0
+    for q in queries:
+        t = time.perf_counter()
+        results = lexical_index.search(q["question"], limit)
+        timings.append((time.perf_counter() - t) * 1000)
+        hits += q["source"] in [m["source"] for m in results["metadatas"][0]]
+    return {
+        "queries": len(queries),
+        "recall_at_k": round(hits / len(queries), 3) if queries else None,
+        "latency_p50_ms": round(percentile(timings, 50), 2),
+        "latency_p95_ms": round(percentile(timings, 95), 2),
+        "latency_p99_ms": round(percentile(timings, 99), 2),
+    }
+
+
+def bench_generation(queries, count):
+    from backend.database import query_documents
+    from backend.llm import generate_rag_response, stream_text
+    from backend.llm_loadtest import percentile
+
+    runs = []
+    errors = 0
+    for i, q in enumerate(queries[:count]):
+        results, status = query_documents(q["question"], "Admin", "benchmark")
+        if status != "success":
+            continue
+        metrics = {}
+        started = time.perf_counter()
+        stream, _ = generate_rag_response(q["question"], results, prompt_stats=metrics, user=f"bench{i}")
+        if isinstance(stream, str):
+            errors += 1
+            continue
+        for _ in stream_text(stream, started, metrics):
+            pass  # stream_text fills metrics as the answer is drained
+        if "error" in metrics:
+            # Also catches streams that failed after some text
+            errors += 1
+            continue
+        runs.append(metrics)
+    ttfts = [m["ttft_ms"] for m in runs if "ttft_ms" in m]
+    totals = [m["total_ms"] for m in runs]
+    tokens = sum(m.get("tokens", 0) for m in runs)
+    return {
+        "requests": len(runs),
+        "errors": errors,
+        "ttft_p50_ms": round(percentile(ttfts, 50), 1),
+        "ttft_p95_ms": round(percentile(ttfts, 95), 1),
+        "latency_p50_ms": round(percentile(totals, 50), 1),
+        "tokens": tokens,
+        "tokens_per_sec": round(tokens / (sum(totals) / 1000), 2) if totals else 0.0,
+        "prompt_tokens_est_avg": round(sum(m.get("prompt_tokens_est", 0) for m in runs) / len(runs), 1)
+        if runs else 0.0,
+    }
+
+
+# --- Reporting --------------------------------------------------------------
+
+def _git_commit(repo_dir):
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=repo_dir, capture_output=True,
+                              text=True, timeout=5).stdout.strip() or None
+    except Exception:
+        return None
+
+
+def compare(current, baseline, path=""):
+    """
+    Returns {dotted.key: {"baseline", "current", "change_pct"}} for every
+    numeric leaf present in both reports.
+    """
+    changes = {}
+    for key, value in current.items():
+        old = baseline.get(key) if isinstance(baseline, dict) else None
+        name = f"{path}.{key}" if path else key
+        if isinstance(value, dict):
+            changes.update(compare(value, old or {}, name))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool) and isinstance(old, (int, float)):
+            change = round((value - old) / old * 100, 1) if old else None
+            changes[name] = {"baseline": old, "current": value, "change_pct": change}
+    return changes
+
+
+def run_benchmark(workdir, docs, paragraphs, pdf_share, queries, generations, seed, fake_options,
+                  vector_backend="chroma"):
+    """
+    Runs every stage inside workdir and returns the report dict. Must be
+    called before config/backend modules are imported, since their paths
+    are resolved from the working directory at import time.
+    """
+    repo_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    os.makedirs(workdir, exist_ok=True)
+    os.chdir(workdir)
+    if repo_dir not in sys.path:
+        sys.path.insert(0, repo_dir)
+
+    from backend.fake_ollama import start_fake_ollama
+    _, host = start_fake_ollama(**fake_options)
+    os.environ["OLLAMA_HOST"] = host
+    os.environ["AUDIT_VECTOR_BACKEND"] = vector_backend
+
+    from backend import metrics
+    from backend.audit_log import flush_logs
+
+    corpus = generate_corpus(os.path.join(workdir, "corpus"), docs, paragraphs, pdf_share, seed)
+    query_set = make_queries(corpus, queries, seed)
+
+    report = {
+        "meta": {
+            "commit": _git_commit(repo_dir),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "seed": seed,
+            "docs": docs,
+            "paragraphs": paragraphs,
+            "pdf_share": pdf_share,
+            "queries": len(query_set),
+            "fake_ollama": fake_options,
+            "vector_backend": vector_backend,
+        },
+    }
+    report["ingest"] = bench_ingest(corpus)
+    report["retrieval"] = bench_queries(query_set)
+    report["lexical"] = bench_lexical(query_set)
+    report["generation"] = bench_generation(query_set, generations)
+    flush_logs()
+    report["stages"] = metrics.registry.summary()
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline ingest/retrieval/generation benchmark.")
+    parser.add_argument("--docs", type=int, default=24)
+    parser.add_argument("--paragraphs", type=int, default=30, help="Paragraphs per document")
+    parser.add_argument("--pdf-share", type=float, default=0.5, help="Fraction of documents written as PDF")
+    parser.add_argument("--queries", type=int, default=30)
+    parser.add_argument("--generations", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=13)
+    parser.add_argument("--workdir", help="Scratch directory (default: a new temp dir)")
+    parser.add_argument("--out", help="Write the JSON report here instead of stdout")
+    parser.add_argument("--baseline", help="Earlier JSON report to compare against")
+    parser.add_argument("--ttft-ms", type=float, default=50)
+    parser.add_argument("--tokens-per-sec", type=float, default=500.0)
+    parser.add_argument("--answer-tokens", type=int, default=32)
+    parser.add_argument("--vector-backend", choices=["chroma", "shards"], default="chroma")
+    args = parser.parse_args(argv)
+
+    # Resolve user paths before run_benchmark() changes directory
+    out = os.path.abspath(args.out) if args.out else None
+    baseline = os.path.abspath(args.baseline) if args.baseline else None
+    workdir = os.path.abspath(args.workdir) if args.workdir else tempfile.mkdtemp(prefix="audit-bench-")
+
+    fake_options = {"ttft_ms": args.ttft_ms, "tokens_per_sec": args.tokens_per_sec,
+                    "answer_tokens": args.answer_tokens, "parallel": 2}
+    report = run_benchmark(workdir, args.docs, args.paragraphs, args.pdf_share, args.queries,
+                           args.generations, args.seed, fake_options, args.vector_backend)
+    if baseline:
+        with open(baseline, encoding="utf-8") as f:
+            previous = json.load(f)
+        report["comparison"] = {
+            "baseline_commit": previous.get("meta", {}).get("commit"),
+            "changes": compare({k: v for k, v in report.items() if k != "meta"},
+                               {k: v for k, v in previous.items() if k != "meta"}),
+        }
+
+    text = json.dumps(report, indent=2)
+    if out:
+        with open(out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+        print(f"Wrote {out} (scratch data in {workdir})", file=sys.stderr)
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+# backend/bulk_ingest.py
+"""
+Headless folder ingestion.
+
+    python -m backend.bulk_ingest ./engagements --security medium --workers 8
+"""
+import argparse
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from config import INGEST_BATCH_SIZE, INGEST_WORKERS
+from backend import manifest, vector_store
+from backend.audit_log import log_action
+from backend.ingest import add_batch, chunk_file, clear_legacy_chunks, finalize_file, is_unchanged, new_chunks
+
+SUPPORTED_EXTENSIONS = (".pdf", ".txt")
+
+
+def find_documents(root):
+    for dirpath, _, filenames in os.walk(root):
+        for filename in sorted(filenames):
+            if filename.lower().endswith(SUPPORTED_EXTENSIONS):
+                yield os.path.join(dirpath, filename)
+
+
+def _chunk_worker(file_path):
+    # Runs in a worker process; only text leaves the worker
+    return chunk_file(file_path)
+
+
+class BulkStats:
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.docs = 0
+        self.unchanged = 0
+        self.chunks = 0
+        self.failures = []
+
+    def elapsed(self):
+        return max(time.perf_counter() - self.start, 1e-9)
+
+    def summary(self):
+        elapsed = self.elapsed()
+        return {
+            "docs": self.docs,
+            "unchanged": self.unchanged,
+            "chunks": self.chunks,
+            "failures": len(self.failures),
+            "seconds": round(elapsed, 2),
+            "docs_per_sec": round(self.docs / elapsed, 2),
+            "chunks_per_sec": round(self.chunks / elapsed, 2),
+        }
+
+
+def ingest_folder(root, security_level, workers=INGEST_WORKERS, batch_size=INGEST_BATCH_SIZE,
+                  source_root=None, progress=None):
+    """
+    Ingests every PDF/TXT under root. Files are extracted and chunked in a
+    process pool; chunks from many files are merged into batch_size adds
+    on the calling thread, which owns the Chroma client. Files whose hash
+    matches the manifest are skipped without being read by a worker.
+    """
+    collection = vector_store.get_collection()
+    source_root = source_root or root
+    stats = BulkStats()
+    documents, metadatas, ids = [], [], []
+    # Manifest updates wait until their chunks have been flushed
+    finished = []
+
+    def flush():
+        if documents:
+            add_batch(collection, documents, metadatas, ids)
+            stats.chunks += len(documents)
+            documents.clear()
+            metadatas.clear()
+            ids.clear()
+        for args in finished:
+            finalize_file(collection, *args, batch_size=batch_size)
+        finished.clear()
+
+    paths = find_documents(root)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        exhausted = False
+        while not exhausted or pending:
+            # Bound the number of chunked files held in memory
+            while not exhausted and len(pending) < workers * 2:
+                path = next(paths, None)
+                if path is None:
+                    exhausted = True
+                    break
+                source = os.path.relpath(path, source_root)
+                try:
+                    file_hash = manifest.hash_file(path)
+                except OSError as e:
+                    stats.failures.append((path, str(e)))
+                    continue
+                previous = manifest.get_file(source)
+                if is_unchanged(previous, file_hash, security_level):
+                    stats.unchanged += 1
+                    continue
+                pending.append((path, source, file_hash, previous, pool.submit(_chunk_worker, path)))
+            if not pending:
+                break
+
+            path, source, file_hash, previous, future = pending.popleft()
+            try:
+                chunks = future.result()
+            except Exception as e:
+                stats.failures.append((path, str(e)))
+                continue
+            if not chunks:
+                stats.failures.append((path, "no extractable text"))
+                continue
+
+            if previous is None:
+                clear_legacy_chunks(collection, source)
+            seen_ids = set()
+            for cid, chunk in new_chunks(source, chunks, previous, seen_ids):
+                documents.append(chunk)
+                metadatas.append({"source": source, "security": security_level})
+                ids.append(cid)
+                if len(documents) >= batch_size:
+                    flush()
+            finished.append((source, file_hash, security_level, previous, seen_ids))
+            stats.docs += 1
+            if progress:
+                progress(stats)
+        flush()
+
+    log_action("System", "Admin", "Bulk Upload", root, f"{stats.docs} docs, {len(stats.failures)} failed")
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk-ingest a folder of PDF/TXT files.")
+    parser.add_argument("folder", help="Directory to walk recursively")
+    parser.add_argument("--security", choices=["low", "medium", "high"], default="low")
+    parser.add_argument("--workers", type=int, default=INGEST_WORKERS)
+    parser.add_argument("--batch-size", type=int, default=INGEST_BATCH_SIZE)
+    parser.add_argument("--every", type=int, default=50, help="Report progress every N documents")
+    args = parser.parse_args(argv)
+
+    if not os.path.isdir(args.folder):
+        parser.error(f"not a directory: {args.folder}")
+
+    def progress(stats):
+        if stats.docs % args.every == 0:
+            s = stats.summary()
+            print(f"[{s['seconds']}s] {s['docs']} docs ({s['docs_per_sec']}/s), {s['unchanged']} unchanged, "
+                  f"{s['chunks']} chunks ({s['chunks_per_sec']}/s), {s['failures']} failed",
+                  file=sys.stderr)
+
+    stats = ingest_folder(args.folder, args.security, max(1, args.workers), max(1, args.batch_size),
+                          progress=progress)
+    for path, error in stats.failures:
+        print(f"FAILED {path}: {error}", file=sys.stderr)
+    s = stats.summary()
+    print(f"Done: {s['docs']} docs, {s['unchanged']} unchanged, {s['chunks']} chunks in {s['seconds']}s "
+          f"({s['docs_per_sec']} docs/s, {s['chunks_per_sec']} chunks/s), {s['failures']} failed")
+    return 1 if stats.failures and not (stats.docs or stats.unchanged) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,186 @@
+# backend/chunking.py
+import os
+import re
+import time
+from config import CHUNK_TOKENS, CHUNK_OVERLAP_TOKENS
+
+# Markdown headings, numbered clauses ("4.2 Access Reviews") and short ALL-CAPS lines
+_HEADING_RE = re.compile(
+    r"^(?:#{1,6}\s+\S.*"
+    r"|(?:\d+(?:\.\d+)*\.?|[A-Z]\.|[IVXLC]+\.)\s+[A-Z][^.;:]{0,80}"
+    r"|[A-Z][A-Z0-9 ,&/\-()]{3,80})$"
+)
+_PARAGRAPH_RE = re.compile(r"\n\s*\n")
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+(?=[\"'(\[]?[A-Z0-9])")
+_WORD_RE = re.compile(r"\w+|[^\w\s]")
+
+# Paragraph-free text (common in PDF extraction) is still cut at a line break
+_MAX_PENDING_CHARS = 20000
+
+_tokenizer = None
+_tokenizer_loaded = False
+_tokenizer_retry_at = 0.0
+_TOKENIZER_RETRY_SECONDS = 60
+
+
+def _get_tokenizer():
+    """
+    The MiniLM WordPiece tokenizer Chroma downloads alongside the model,
+    without the padding/truncation the embedding path uses. The model is
+    fetched here if needed, so chunk boundaries (and the content-addressed
+    chunk IDs) don't depend on whether anything was embedded before. Only
+    a successful load is remembered (failed downloads are retried after
+    _TOKENIZER_RETRY_SECONDS); returns None while it is unavailable.
+    """
+    global _tokenizer, _tokenizer_loaded, _tokenizer_retry_at
+    if not _tokenizer_loaded and time.monotonic() >= _tokenizer_retry_at:
+        try:
+            from tokenizers import Tokenizer
+            from chromadb.utils.embedding_functions.onnx_mini_lm_l6_v2 import ONNXMiniLM_L6_V2
+        except ImportError:
+            # Permanent: every call in this process uses the estimate
+            _tokenizer_loaded = True
+            return None
+        path = os.path.join(ONNXMiniLM_L6_V2.DOWNLOAD_PATH, ONNXMiniLM_L6_V2.EXTRACTED_FOLDER_NAME, "tokenizer.json")
+        try:
+            if not os.path.exists(path):
+                ONNXMiniLM_L6_V2()._download_model_if_not_exists()
+            tokenizer = Tokenizer.from_file(path)
+        except Exception:
+            # Offline and no model yet: estimate for now, retry in a while
+            _tokenizer_retry_at = time.monotonic() + _TOKENIZER_RETRY_SECONDS
+            return None
+        tokenizer.no_padding()
+        tokenizer.no_truncation()
+        _tokenizer = tokenizer
+        _tokenizer_loaded = True
+    return _tokenizer
+
+
+def count_tokens(texts):
+    tokenizer = _get_tokenizer()
+    if tokenizer is not None:
+        return [len(e.ids) for e in tokenizer.encode_batch(texts, add_special_tokens=False)]
+    # WordPiece splits rarer words further; ~4/3 tokens per word+punctuation
+    return [len(_WORD_RE.findall(t)) * 4 // 3 + 1 for t in texts]
+
+
+def is_heading(line):
+    return len(line) <= 100 and bool(_HEADING_RE.match(line))
+
+
+def split_units(text):
+    """
+    Splits text into (sentence, is_heading) units. Paragraph breaks and
+    heading lines are kept as boundaries; wrapped lines inside a paragraph
+    are re-joined before sentence splitting.
+    """
+    units = []
+    for paragraph in _PARAGRAPH_RE.split(text):
+        lines = []
+        for line in paragraph.split("\n"):
+            line = line.strip()
+            if not line:
+                continue
+            if is_heading(line):
+                if lines:
+                    units.extend((s, False) for s in _SENTENCE_RE.split(" ".join(lines)) if s)
+                    lines = []
+                units.append((line, True))
+            else:
+                lines.append(line)
+        if lines:
+            units.extend((s, False) for s in _SENTENCE_RE.split(" ".join(lines)) if s)
+    return units
+
+
+class ChunkPacker:
+    """
+    Greedily packs sentences into chunks of at most max_tokens tokens,
+    starting a fresh chunk at each heading and repeating up to
+    overlap_tokens of trailing sentences at the start of the next chunk.
+    """
+
+    def __init__(self, max_tokens=CHUNK_TOKENS, overlap_tokens=CHUNK_OVERLAP_TOKENS):
+        self.max_tokens = max_tokens
+        self.overlap_tokens = overlap_tokens
+        self.current = []
+        self.size = 0
+        self.has_body = False
+
+    def _emit(self):
+        text = ""
+        for sentence, heading, _ in self.current:
+            text += sentence + ("\n" if heading else " ")
+        return text.strip()
+
+    def _flush(self, keep_overlap):
+        chunk = self._emit()
+        if keep_overlap:
+            kept, size = [], 0
+            for unit in reversed(self.current):
+                if size + unit[2] > self.overlap_tokens:
+                    break
+                kept.insert(0, unit)
+                size += unit[2]
+            # A chunk made only of overlap would repeat forever
+            if len(kept) == len(self.current):
+                kept, size = [], 0
+            self.current, self.size = kept, size
+        else:
+            self.current, self.size = [], 0
+        self.has_body = any(not heading for _, heading, _ in self.current)
+        return chunk
+
+    def _split_long(self, sentence, tokens):
+        words = sentence.split()
+        per_piece = max(1, len(words) * self.max_tokens // (tokens + 1))
+        pieces = [" ".join(words[i:i + per_piece]) for i in range(0, len(words), per_piece)]
+        return list(zip(pieces, count_tokens(pieces)))
+
+    def feed(self, units):
+        if not units:
+            return
+        counts = count_tokens([u[0] for u in units])
+        for (sentence, heading), tokens in zip(units, counts):
+            pieces = [(sentence, tokens)] if tokens <= self.max_tokens else self._split_long(sentence, tokens)
+            for piece, piece_tokens in pieces:
+                # Consecutive headings stay together with the body that follows
+                if heading and self.has_body:
+                    yield self._flush(keep_overlap=False)
+                elif self.current and self.size + piece_tokens > self.max_tokens:
+                    yield self._flush(keep_overlap=True)
+                self.current.append((piece, heading, piece_tokens))
+                self.size += piece_tokens
+                self.has_body = self.has_body or not heading
+
+    def finish(self):
+        if self.current:
+            yield self._flush(keep_overlap=False)
+
+
+def iter_chunks(text_iter, max_tokens=CHUNK_TOKENS, overlap_tokens=CHUNK_OVERLAP_TOKENS):
+    """
+    Chunks text incrementally as pages/blocks arrive. Only the trailing
+    unfinished paragraph is carried between pieces, so the whole pass is
+    linear in the document length.
+    """
+    packer = ChunkPacker(max_tokens, overlap_tokens)
+    pending = ""
+    for piece in text_iter:
+        if not piece:
+            continue
+        pending += piece
+        cut = pending.rfind("\n\n")
+        # A cut at 0 would hand on nothing and leave pending to grow unbounded
+        if cut <= 0:
+            if len(pending) < _MAX_PENDING_CHARS:
+                continue
+            cut = pending.rfind("\n")
+            if cut <= 0:
+                cut = len(pending)
+        # The separator is dropped: ready already ends at a boundary
+        ready, pending = pending[:cut], pending[cut:].lstrip()
+        yield from packer.feed(split_units(ready))
+    yield from packer.feed(split_units(pending))
+    yield from packer.finish()
@@ -1,97 +1,119 @@
 # backend/database.py
 import os
-import uuid
-import chromadb
-from pypdf import PdfReader
-from config import DB_FOLDER, DATA_FOLDER, CHUNK_SIZE, CHUNK_OVERLAP
+from config import DB_FOLDER, DATA_FOLDER, SECURITY_LEVELS
 from backend.audit_log import log_action  # <--- IMPORT THIS
+from backend import lexical_index, manifest, metrics, vector_store
+from backend.retrieval import search, search_many
+from backend.ingest import ingest_file, reclassify_source, remove_source
 
 def get_vector_collection():
-    client = chromadb.PersistentClient(path=DB_FOLDER)
-    collection = client.get_or_create_collection(name="secure_audit_docs")
-    return collection
+    # Shared, lazily opened collection (see backend/vector_store.py)
+    return vector_store.get_collection()
 
 def process_file_upload(uploaded_file, security_level):
-    # ... (Keep existing code same as before) ...
-    collection = get_vector_collection()
+    os.makedirs(DATA_FOLDER, exist_ok=True)
     file_path = os.path.join(DATA_FOLDER, uploaded_file.name)
     
     with open(file_path, "wb") as f:
         f.write(uploaded_file.getbuffer())
     
-    text_content = ""
+    return index_saved_file(file_path, uploaded_file.name, security_level) is not None
+
+def index_saved_file(file_path, name, security_level):
+    """
+    Indexes a file already written to DATA_FOLDER and logs the upload.
+    Returns the ingest summary dict, or None if nothing could be indexed.
+    """
+    # Pages are extracted in parallel, chunked as they arrive and
+    # pushed to the collection in bounded batches (see backend/ingest.py).
+    # Unchanged re-uploads are skipped via the content-hash manifest.
     try:
-        if uploaded_file.name.endswith(".pdf"):
-            reader = PdfReader(file_path)
-            for page in reader.pages:
-                text = page.extract_text()
-                if text: text_content += text + "\n"
-        elif uploaded_file.name.endswith(".txt"):
-            with open(file_path, "r", encoding="utf-8") as f:
-                text_content = f.read()
+        result = ingest_file(file_path, name, security_level,
+                             collection=get_vector_collection())
     except Exception as e:
-        return False
-
-    if text_content:
-        chunks = []
-        start = 0
-        while start < len(text_content):
-            end = start + CHUNK_SIZE
-            chunks.append(text_content[start:end])
-            start += (CHUNK_SIZE - CHUNK_OVERLAP)
+        return None
 
-        ids = [f"{uploaded_file.name}_{uuid.uuid4()}" for _ in range(len(chunks))]
-        metadatas = [{"source": uploaded_file.name, "security": security_level} for _ in range(len(chunks))]
-        
-        collection.add(documents=chunks, metadatas=metadatas, ids=ids)
-        
+    if result["chunks"]:
         # Log the upload
-        log_action("System", "Admin", "Upload", uploaded_file.name, "Success")
-        return True
-    return False
+        status = "Unchanged" if result["status"] == "unchanged" else "Success"
+        log_action("System", "Admin", "Upload", name, status)
+        return result
+    return None
 
-def query_documents(question, user_role, username):
-    collection = get_vector_collection()
-    
-    # 1. Define Access Levels
+def list_documents():
+    # One row per indexed file: source, security, chunk_count, updated
+    return manifest.list_files()
+
+def delete_document(source, username="System", user_role="Admin"):
+    """
+    Removes one file's chunks from every index, and its saved copy.
+    Returns the number of chunks removed.
+    """
+    chunks = remove_source(get_vector_collection(), source)
+    # Uploads are saved as DATA_FOLDER/<name> under source <name>; bulk-ingested
+    # sources are paths relative to their folder and have no saved copy
+    if source == os.path.basename(source):
+        file_path = os.path.join(DATA_FOLDER, source)
+        if os.path.isfile(file_path):
+            os.remove(file_path)
+    log_action(username, user_role, "Delete", source, "Success" if chunks else "Not Found")
+    return chunks
+
+def reclassify_document(source, security_level, username="System", user_role="Admin"):
+    """
+    Changes one file's security level in place (no re-ingestion).
+    Returns the number of chunks moved, or None if the file is unknown.
+    """
+    if security_level not in SECURITY_LEVELS:
+        raise ValueError(f"security_level must be one of {SECURITY_LEVELS}")
+    chunks = reclassify_source(get_vector_collection(), source, security_level)
+    log_action(username, user_role, "Reclassify", f"{source} -> {security_level}",
+               "Success" if chunks is not None else "Not Found")
+    return chunks
+
+def get_allowed_levels(user_role):
     allowed_levels = ["low"]
     if user_role == "Manager":
         allowed_levels = ["low", "medium"]
     elif user_role == "Admin":
         allowed_levels = ["low", "medium", "high"]
+    return allowed_levels
+
+LOG_STATUS = {"success": "Allowed", "denied": "DENIED_SECURITY", "no_data": "No Data"}
+
+def query_documents(question, user_role, username):
+    # 1. Define Access Levels
+    allowed_levels = get_allowed_levels(user_role)
         
-    # 2. Perform Secure Search
-    results = collection.query(
-        query_texts=[question],
-        n_results=3,
-        where={"security": {"$in": allowed_levels}} 
-    )
+    # 2. Secure Search: only the partitions for allowed levels are searched;
+    # higher levels are just counted to decide between "denied" and "no data".
+    with metrics.span("retrieval"):
+        results, status = search(question, allowed_levels)
+    metrics.increment(f"query_{status}")
     
-    # 3. SMART LOGIC: Did we find anything?
-    found_docs = False
-    if results['documents'] and results['documents'][0]:
-        found_docs = True
-        log_action(username, user_role, "Search", question, "Allowed")
-        return results, "success"
+    # 3. Log the verdict
+    with metrics.span("audit_log"):
+        log_action(username, user_role, "Search", question, LOG_STATUS[status])
+    return results, status
 
-    # 4. "Reasoning" Check: Search AGAIN without security filters
-    # If we find something now, it means data exists but was BLOCKED.
-    blocked_check = collection.query(
-        query_texts=[question],
-        n_results=1
-        # No 'where' clause = search everything
-    )
-    
-    if blocked_check['documents'] and blocked_check['documents'][0]:
-        log_action(username, user_role, "Search", question, "DENIED_SECURITY")
-        return None, "denied"
-    
-    # 5. Nothing found at all
-    log_action(username, user_role, "Search", question, "No Data")
-    return None, "no_data"
+def query_documents_batch(questions, user_role, username):
+    """
+    query_documents() for a whole questionnaire: questions are embedded and
+    searched in vectorized batches; every question is still logged.
+    Returns a list of (results, status) in question order.
+    """
+    allowed_levels = get_allowed_levels(user_role)
+    with metrics.span("batch_retrieval"):
+        verdicts = search_many(questions, allowed_levels)
+    for question, (_, status) in zip(questions, verdicts):
+        metrics.increment(f"query_{status}")
+        log_action(username, user_role, "Batch Search", question, LOG_STATUS[status])
+    return verdicts
 
-def reset_database():
+def reset_database(username="System", user_role="Admin"):
     import shutil
-    if os.path.exists(DB_FOLDER):
-        shutil.rmtree(DB_FOLDER)
-    log_action("System", "Admin", "Reset DB", "N/A", "Success")
\ No newline at end of file
+    # Both stores stay closed while their files disappear; searches and uploads wait
+    with vector_store.closed(), lexical_index.closed():
+        if os.path.exists(DB_FOLDER):
+            shutil.rmtree(DB_FOLDER)
+    log_action(username, user_role, "Reset DB", "N/A", "Success")
\ No newline at end of file
@@ -0,0 +1,201 @@
+# backend/embeddings.py
+import hashlib
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from chromadb.api.types import EmbeddingFunction
+from chromadb.utils.embedding_functions.onnx_mini_lm_l6_v2 import ONNXMiniLM_L6_V2
+from config import (EMBEDDING_MODEL_NAME, EMBEDDING_DIM, EMBEDDING_BATCH_SIZE, EMBEDDING_THREADS,
+                    EMBEDDING_CACHE_FOLDER)
+
+
+class _ThreadedMiniLM(ONNXMiniLM_L6_V2):
+    """
+    Chroma's default MiniLM model with the ONNX intra-op pool sized so that
+    EMBEDDING_THREADS concurrent batches don't oversubscribe the CPU.
+    """
+
+    @property
+    def model(self):
+        if "_session" not in self.__dict__:
+            so = self.ort.SessionOptions()
+            so.log_severity_level = 3
+            so.graph_optimization_level = self.ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+            so.intra_op_num_threads = max(1, (os.cpu_count() or 1) // EMBEDDING_THREADS)
+            self.__dict__["_session"] = self.ort.InferenceSession(
+                os.path.join(self.DOWNLOAD_PATH, self.EXTRACTED_FOLDER_NAME, "model.onnx"),
+                providers=["CPUExecutionProvider"],
+                sess_options=so,
+            )
+        return self.__dict__["_session"]
+
+
+class EmbeddingCache:
+    """
+    Append-only, memory-mapped vector cache. Each record is a 16-byte key
+    followed by a float32 vector; the key index is rebuilt from the file on
+    open, and records are appended with a single write so several processes
+    can share one cache file.
+    """
+
+    def __init__(self, folder, dim):
+        os.makedirs(folder, exist_ok=True)
+        self.path = os.path.join(folder, "vectors.bin")
+        self.dtype = np.dtype([("key", "V16"), ("vector", "<f4", (dim,))])
+        self._index = {}
+        self._rows = 0
+        self._map = None
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            open(self.path, "ab").close()
+        # A torn trailing record (crash mid-write) is cut off, so the next
+        # append starts on a record boundary
+        size = os.path.getsize(self.path)
+        rows = size // self.dtype.itemsize
+        if size != rows * self.dtype.itemsize:
+            os.truncate(self.path, rows * self.dtype.itemsize)
+        if rows:
+            keys = np.memmap(self.path, dtype=self.dtype, mode="r", shape=(rows,))["key"]
+            for row, key in enumerate(keys):
+                self._index[bytes(key)] = row
+        self._rows = rows
+
+    def _vectors(self):
+        if self._map is None or len(self._map) != self._rows:
+            self._map = np.memmap(self.path, dtype=self.dtype, mode="r", shape=(self._rows,))
+        return self._map["vector"]
+
+    def __len__(self):
+        return len(self._index)
+
+    def get_many(self, keys):
+        with self._lock:
+            rows = [self._index.get(key) for key in keys]
+            if not any(row is not None for row in rows):
+                return [None] * len(keys)
+            vectors = self._vectors()
+            return [np.array(vectors[row]) if row is not None else None for row in rows]
+
+    def put_many(self, keys, vectors):
+        records = np.empty(len(keys), dtype=self.dtype)
+        records["key"] = keys
+        records["vector"] = vectors
+        with self._lock:
+            fd = os.open(self.path, os.O_WRONLY | os.O_APPEND)
+            try:
+                os.write(fd, records.tobytes())
+                # Other processes may append too; our records end at the current offset
+                end_bytes = os.lseek(fd, 0, os.SEEK_CUR)
+            finally:
+                os.close(fd)
+            if end_bytes % self.dtype.itemsize:
+                # Written after another process's torn record: not addressable, leave unindexed
+                return
+            end = end_bytes // self.dtype.itemsize
+            for i, key in enumerate(keys):
+                self._index[key] = end - len(keys) + i
+            self._rows = max(self._rows, end)
+
+
+_model = None
+_cache = None
+_pool = None
+_init_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0, "batches": 0, "embed_ms": 0.0}
+
+
+def _get_model():
+    global _model, _cache, _pool
+    if _model is None:
+        with _init_lock:
+            if _model is None:
+                _cache = EmbeddingCache(os.path.join(EMBEDDING_CACHE_FOLDER, EMBEDDING_MODEL_NAME), EMBEDDING_DIM)
+                _pool = ThreadPoolExecutor(max_workers=EMBEDDING_THREADS, thread_name_prefix="embed")
+                _model = _ThreadedMiniLM(preferred_providers=["CPUExecutionProvider"])
+    return _model
+
+
+def text_key(text):
+    return hashlib.sha256(f"{EMBEDDING_MODEL_NAME}\0{text}".encode("utf-8")).digest()[:16]
+
+
+def _embed_batch(texts):
+    return np.asarray(_get_model()(texts), dtype=np.float32)
+
+
+def embed_texts(texts, batch_size=EMBEDDING_BATCH_SIZE):
+    """
+    Returns one float32 vector per text. Cached vectors are read from the
+    memory-mapped store; the rest are embedded once per unique text in
+    batch_size batches spread across the embedding threads.
+    """
+    _get_model()
+    keys = [text_key(t) for t in texts]
+    vectors = _cache.get_many(keys)
+
+    # Unique texts that still need embedding
+    missing = {}
+    for i, vector in enumerate(vectors):
+        if vector is None:
+            missing.setdefault(keys[i], []).append(i)
+    _stats["hits"] += len(texts) - sum(len(rows) for rows in missing.values())
+
+    if missing:
+        todo_keys = list(missing)
+        todo_texts = [texts[missing[key][0]] for key in todo_keys]
+        batches = [todo_texts[i:i + batch_size] for i in range(0, len(todo_texts), batch_size)]
+
+        start = time.perf_counter()
+        if len(batches) == 1:
+            results = [_embed_batch(batches[0])]
+        else:
+            results = list(_pool.map(_embed_batch, batches))
+        _stats["embed_ms"] += (time.perf_counter() - start) * 1000
+        _stats["batches"] += len(batches)
+        _stats["misses"] += len(todo_keys)
+
+        computed = np.concatenate(results)
+        _cache.put_many(todo_keys, computed)
+        for key, vector in zip(todo_keys, computed):
+            for i in missing[key]:
+                vectors[i] = vector
+    return vectors
+
+
+def get_stats():
+    stats = dict(_stats)
+    stats["cached_vectors"] = len(_cache) if _cache is not None else 0
+    return stats
+
+
+class CachedEmbeddingFunction(EmbeddingFunction):
+    """
+    Chroma-compatible wrapper so any text passed straight to the collection
+    also goes through the cache. Produces the same vectors as Chroma's
+    default function, so it keeps the "default" name for persisted configs.
+    """
+
+    def __init__(self):
+        pass
+
+    def __call__(self, input):
+        return embed_texts(list(input))
+
+    @staticmethod
+    def name():
+        return "default"
+
+    def get_config(self):
+        return {}
+
+    @staticmethod
+    def build_from_config(config):
+        return CachedEmbeddingFunction()
+
+    def max_tokens(self):
+        return 256
@@ -0,0 +1,135 @@
+# backend/fake_ollama.py
+"""
+Deterministic stand-in for a local Ollama server, for load tests and
+benchmarks without a GPU or model download.
+
+    python -m backend.fake_ollama --port 11435 --ttft-ms 200 --tokens-per-sec 40 --parallel 1
+
+Point the app at it with OLLAMA_HOST=http://127.0.0.1:11435.
+"""
+import argparse
+import hashlib
+import json
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+_WORDS = ["The", "control", "was", "tested", "and", "no", "exceptions", "were", "noted", "in",
+          "the", "sampled", "period", "according", "to", "the", "audit", "evidence", "provided", "."]
+
+
+def fake_tokens(prompt, count):
+    # Same prompt -> same answer, so runs are comparable
+    seed = int(hashlib.sha256(prompt.encode("utf-8")).hexdigest(), 16)
+    return [_WORDS[(seed + i * 7) % len(_WORDS)] + " " for i in range(count)]
+
+
+class FakeOllamaServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, ttft_ms=200, tokens_per_sec=40.0, answer_tokens=64, parallel=1):
+        super().__init__(address, _Handler)
+        self.ttft_ms = ttft_ms
+        self.tokens_per_sec = tokens_per_sec
+        self.answer_tokens = answer_tokens
+        # Ollama serves OLLAMA_NUM_PARALLEL requests at once and queues the rest
+        self.slots = threading.Semaphore(parallel)
+        self.requests_served = 0
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, chunked streaming like Ollama
+
+    def log_message(self, format, *args):
+        pass
+
+    def _write_chunk(self, payload):
+        data = (json.dumps(payload) + "\n").encode("utf-8")
+        self.wfile.write(f"{len(data):X}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+    def do_GET(self):
+        body = b"Ollama is running" if self.path == "/" else json.dumps({"models": []}).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        if self.path != "/api/chat":
+            self.send_error(404)
+            return
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        prompt = "".join(m.get("content", "") for m in request.get("messages", []))
+        server = self.server
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        with server.slots:
+            started = time.perf_counter()
+            # Prompt evaluation cost grows with prompt length
+            time.sleep(server.ttft_ms / 1000 + len(prompt) / 4 / 2000)
+            prompt_done = time.perf_counter()
+            tokens = fake_tokens(prompt, server.answer_tokens)
+            for token in tokens:
+                self._write_chunk({
+                    "model": request.get("model", "fake"),
+                    "created_at": datetime.now(timezone.utc).isoformat(),
+                    "message": {"role": "assistant", "content": token},
+                    "done": False,
+                })
+                time.sleep(1 / server.tokens_per_sec)
+            finished = time.perf_counter()
+            server.requests_served += 1
+
+        self._write_chunk({
+            "model": request.get("model", "fake"),
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "message": {"role": "assistant", "content": ""},
+            "done": True,
+            "done_reason": "stop",
+            "total_duration": int((finished - started) * 1e9),
+            "prompt_eval_count": len(prompt) // 4,
+            "prompt_eval_duration": int((prompt_done - started) * 1e9),
+            "eval_count": len(tokens),
+            "eval_duration": int((finished - prompt_done) * 1e9),
+        })
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+
+def start_fake_ollama(port=0, **kwargs):
+    """
+    Starts the fake server on a background thread; returns (server, host_url).
+    port=0 picks a free port.
+    """
+    server = FakeOllamaServer(("127.0.0.1", port), **kwargs)
+    threading.Thread(target=server.serve_forever, name="fake-ollama", daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Deterministic fake Ollama server.")
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--ttft-ms", type=float, default=200)
+    parser.add_argument("--tokens-per-sec", type=float, default=40.0)
+    parser.add_argument("--answer-tokens", type=int, default=64)
+    parser.add_argument("--parallel", type=int, default=1)
+    args = parser.parse_args(argv)
+
+    server = FakeOllamaServer(("127.0.0.1", args.port), args.ttft_ms, args.tokens_per_sec,
+                              args.answer_tokens, args.parallel)
+    print(f"Fake Ollama listening on http://127.0.0.1:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
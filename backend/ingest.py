@@ -0,0 +1,200 @@
+# backend/ingest.py
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from config import INGEST_BATCH_SIZE, INGEST_WORKERS, PAGES_PER_TASK
+from backend import lexical_index, manifest, vector_store
+from backend.chunking import iter_chunks
+
+
+def _extract_page_range(file_path, start, end):
+    # Runs in a worker process: each worker opens its own reader
+    from pypdf import PdfReader
+    reader = PdfReader(file_path)
+    texts = []
+    for i in range(start, end):
+        text = reader.pages[i].extract_text()
+        texts.append(text + "\n" if text else "")
+    return texts
+
+
+def iter_pdf_pages(file_path, workers=INGEST_WORKERS):
+    """
+    Yields page texts in order. Large PDFs are split into page ranges that
+    are extracted in a process pool with a bounded number of ranges in flight.
+    """
+    from pypdf import PdfReader
+    page_count = len(PdfReader(file_path).pages)
+    if workers <= 1 or page_count <= PAGES_PER_TASK:
+        yield from _extract_page_range(file_path, 0, page_count)
+        return
+
+    ranges = [(s, min(s + PAGES_PER_TASK, page_count)) for s in range(0, page_count, PAGES_PER_TASK)]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        next_range = 0
+        while next_range < len(ranges) or pending:
+            # Keep at most 2x workers ranges in memory at once
+            while next_range < len(ranges) and len(pending) < workers * 2:
+                start, end = ranges[next_range]
+                pending.append(pool.submit(_extract_page_range, file_path, start, end))
+                next_range += 1
+            yield from pending.popleft().result()
+
+
+def iter_text_blocks(file_path, block_size=1024 * 1024):
+    with open(file_path, "r", encoding="utf-8") as f:
+        while True:
+            block = f.read(block_size)
+            if not block:
+                break
+            yield block
+
+
+def iter_file_text(file_path, workers=INGEST_WORKERS):
+    extension = os.path.splitext(file_path)[1].lower()
+    if extension == ".pdf":
+        return iter_pdf_pages(file_path, workers)
+    if extension == ".txt":
+        return iter_text_blocks(file_path)
+    return iter([])
+
+
+def iter_batches(items, batch_size=INGEST_BATCH_SIZE):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def add_batch(collection, documents, metadatas, ids):
+    vectors = vector_store.embed(documents)
+    start = time.perf_counter()
+    # upsert keeps content-addressed IDs idempotent if the manifest was lost
+    collection.upsert(documents=documents, embeddings=vectors, metadatas=metadatas, ids=ids)
+    lexical_index.add(ids, documents, metadatas)
+    vector_store.mark_changed()
+    vector_store.record_latency("add", (time.perf_counter() - start) * 1000)
+
+
+def chunk_file(file_path):
+    # Single-process variant used when files themselves are spread across workers
+    return list(iter_chunks(iter_file_text(file_path, workers=1)))
+
+
+def is_unchanged(previous, file_hash, security_level):
+    return (previous is not None and previous["file_hash"] == file_hash
+            and previous["security"] == security_level)
+
+
+def new_chunks(source, chunks, previous, seen_ids):
+    """
+    Yields (chunk_id, chunk) for chunks that are not already indexed.
+    Every chunk ID of the current revision is added to seen_ids.
+    """
+    known_ids = previous["chunk_ids"] if previous else set()
+    for chunk in chunks:
+        cid = manifest.chunk_id(source, chunk)
+        if cid in seen_ids:
+            continue
+        seen_ids.add(cid)
+        if cid not in known_ids:
+            yield cid, chunk
+
+
+def clear_legacy_chunks(collection, source):
+    # Chunks indexed before the manifest existed used random IDs
+    collection.delete(where={"source": source})
+    lexical_index.delete_source(source)
+    vector_store.mark_changed()
+
+
+def finalize_file(collection, source, file_hash, security_level, previous, seen_ids,
+                  batch_size=INGEST_BATCH_SIZE):
+    """
+    Brings unchanged chunks to the new security level, deletes chunks that
+    are no longer part of the file and records the revision in the manifest.
+    Returns the number of deleted chunks.
+    """
+    stale = []
+    if previous is not None:
+        kept = sorted(previous["chunk_ids"] & seen_ids)
+        if previous["security"] != security_level:
+            for batch in iter_batches(kept, batch_size):
+                collection.update(ids=batch, metadatas=[{"source": source, "security": security_level}] * len(batch))
+                lexical_index.update_security(batch, security_level)
+        stale = sorted(previous["chunk_ids"] - seen_ids)
+        for batch in iter_batches(stale, batch_size):
+            collection.delete(ids=batch)
+            lexical_index.delete(batch)
+        if stale or previous["security"] != security_level:
+            vector_store.mark_changed()
+
+    manifest.record_file(source, file_hash, security_level, seen_ids)
+    return len(stale)
+
+
+def remove_source(collection, source):
+    """
+    Deletes every chunk of source from the collection, the lexical index and
+    the manifest. Returns the number of chunks found in the collection, which
+    also counts files indexed before the manifest existed.
+    """
+    found = collection.get(where={"source": source}, include=[])["ids"]
+    collection.delete(where={"source": source})
+    lexical_index.delete_source(source)
+    manifest.remove_file(source)
+    vector_store.mark_changed()
+    return len(found)
+
+
+def reclassify_source(collection, source, security_level, batch_size=INGEST_BATCH_SIZE):
+    """
+    Moves an indexed file's chunks to security_level in place; stored
+    embeddings are reused, nothing is re-read or re-embedded. Returns the
+    number of chunks, or None if source is not in the manifest.
+    """
+    previous = manifest.get_file(source)
+    if previous is None:
+        return None
+    if previous["security"] != security_level:
+        finalize_file(collection, source, previous["file_hash"], security_level, previous,
+                      previous["chunk_ids"], batch_size)
+    return len(previous["chunk_ids"])
+
+
+def ingest_file(file_path, source, security_level, collection=None, workers=INGEST_WORKERS,
+                batch_size=INGEST_BATCH_SIZE):
+    """
+    Streams a PDF/TXT file into the collection in bounded batches.
+    Unchanged files are skipped; revisions only embed new chunks and drop
+    stale ones. Returns a summary dict.
+    """
+    if collection is None:
+        collection = vector_store.get_collection()
+
+    file_hash = manifest.hash_file(file_path)
+    previous = manifest.get_file(source)
+    if is_unchanged(previous, file_hash, security_level):
+        return {"status": "unchanged", "chunks": len(previous["chunk_ids"]), "added": 0, "deleted": 0}
+
+    if previous is None:
+        clear_legacy_chunks(collection, source)
+
+    seen_ids = set()
+    added = 0
+    chunks = iter_chunks(iter_file_text(file_path, workers))
+    for batch in iter_batches(new_chunks(source, chunks, previous, seen_ids), batch_size):
+        ids = [cid for cid, _ in batch]
+        documents = [chunk for _, chunk in batch]
+        metadatas = [{"source": source, "security": security_level} for _ in batch]
+        add_batch(collection, documents, metadatas, ids)
+        added += len(batch)
+
+    deleted = finalize_file(collection, source, file_hash, security_level, previous, seen_ids, batch_size)
+    return {"status": "indexed", "chunks": len(seen_ids), "added": added, "deleted": deleted}
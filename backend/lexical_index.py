@@ -0,0 +1,209 @@
+# backend/lexical_index.py
+import os
+import re
+import sqlite3
+import threading
+from contextlib import contextmanager
+from config import DB_FOLDER, LEXICAL_MAX_DF
+
+# Lives inside DB_FOLDER so reset_database() wipes it with the index
+LEXICAL_INDEX_PATH = os.path.join(DB_FOLDER, "lexical_index.sqlite3")
+
+# Keep control IDs ("SOX-404", "AC_2") as single terms
+_TERM_RE = re.compile(r"[\w][\w\-]*")
+
+# Function words that match nearly every chunk; never worth a posting-list scan
+_STOPWORDS = frozenset("""
+    a about above after all also an and any are as at be been before being below between both but by can
+    could did do does doing during each few for from had has have having how i if in into is it its itself
+    me more most my no nor not of off on once only or other our out over own same should so some such than
+    that the their them then there these they this those through to too under until up very was we were
+    what when where which while who whom why will with would you your
+""".split())
+# Below this many chunks document frequencies say little, so only stopwords are dropped
+_MIN_CHUNKS_FOR_DF = 100
+
+_conn = None
+_lock = threading.Lock()
+
+
+def _get_connection():
+    """
+    SQLite FTS5 inverted index over chunk text. Chunk IDs, source and
+    security level live in a plain table keyed by the FTS rowid, so RBAC
+    partitioning and deletes by chunk ID or source are indexed lookups.
+    """
+    global _conn
+    if _conn is None:
+        os.makedirs(DB_FOLDER, exist_ok=True)
+        conn = sqlite3.connect(LEXICAL_INDEX_PATH, timeout=30, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS chunks (
+                id INTEGER PRIMARY KEY,
+                chunk_id TEXT UNIQUE NOT NULL,
+                source TEXT NOT NULL,
+                security TEXT NOT NULL
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_chunks_source ON chunks (source)")
+        conn.execute("""
+            CREATE VIRTUAL TABLE IF NOT EXISTS chunks_fts USING fts5(
+                text, tokenize = "unicode61 tokenchars '-_'"
+            )
+        """)
+        # Per-term document counts, used to drop very common query terms
+        conn.execute("CREATE VIRTUAL TABLE IF NOT EXISTS chunks_vocab USING fts5vocab(chunks_fts, 'row')")
+        conn.commit()
+        _conn = conn
+    return _conn
+
+
+def close():
+    """
+    Closes the shared connection; call before DB_FOLDER is removed.
+    """
+    with _lock:
+        _close()
+
+
+def _close():
+    global _conn
+    if _conn is not None:
+        _conn.close()
+        _conn = None
+
+
+@contextmanager
+def closed():
+    """
+    Keeps the index closed for the duration; other calls wait. Used while
+    DB_FOLDER is copied, replaced or removed.
+    """
+    with _lock:
+        _close()
+        yield
+
+
+def _delete_rows(conn, rowids):
+    conn.executemany("DELETE FROM chunks_fts WHERE rowid = ?", [(r,) for r in rowids])
+    conn.executemany("DELETE FROM chunks WHERE id = ?", [(r,) for r in rowids])
+
+
+def add(ids, documents, metadatas):
+    """
+    Indexes chunks; re-adding an existing chunk ID replaces it.
+    """
+    with _lock:
+        conn = _get_connection()
+        with conn:
+            existing = [r[0] for r in conn.execute(
+                f"SELECT id FROM chunks WHERE chunk_id IN ({','.join('?' * len(ids))})", ids
+            )]
+            _delete_rows(conn, existing)
+            for cid, text, meta in zip(ids, documents, metadatas):
+                cur = conn.execute(
+                    "INSERT INTO chunks (chunk_id, source, security) VALUES (?, ?, ?)",
+                    # Unlabelled chunks are treated as the highest level
+                    (cid, meta.get("source", ""), meta.get("security", "high"))
+                )
+                conn.execute("INSERT INTO chunks_fts (rowid, text) VALUES (?, ?)", (cur.lastrowid, text))
+
+
+def delete(ids):
+    with _lock:
+        conn = _get_connection()
+        with conn:
+            rowids = [r[0] for r in conn.execute(
+                f"SELECT id FROM chunks WHERE chunk_id IN ({','.join('?' * len(ids))})", ids
+            )]
+            _delete_rows(conn, rowids)
+
+
+def delete_source(source):
+    with _lock:
+        conn = _get_connection()
+        with conn:
+            rowids = [r[0] for r in conn.execute("SELECT id FROM chunks WHERE source = ?", (source,))]
+            _delete_rows(conn, rowids)
+
+
+def update_security(ids, security_level):
+    with _lock:
+        conn = _get_connection()
+        with conn:
+            conn.executemany("UPDATE chunks SET security = ? WHERE chunk_id = ?",
+                             [(security_level, cid) for cid in ids])
+
+
+def count():
+    with _lock:
+        return _get_connection().execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+
+
+def _drop_common(conn, terms):
+    total = conn.execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+    if total < _MIN_CHUNKS_FOR_DF:
+        return terms
+    doc_freq = {}
+    for term in terms:
+        row = conn.execute("SELECT doc FROM chunks_vocab WHERE term = ?", (term,)).fetchone()
+        doc_freq[term] = row[0] if row else 0
+    kept = [t for t in terms if doc_freq[t] <= LEXICAL_MAX_DF * total]
+    # A question made only of common terms still searches by its rarest one
+    return kept or [min(terms, key=doc_freq.get)]
+
+
+def build_query(question, conn=None):
+    """
+    FTS5 MATCH expression ORing the question's terms, or "" if none are
+    left. Stopwords are dropped and, given the index connection, so are
+    terms found in more than LEXICAL_MAX_DF of the chunks: they hardly
+    change the BM25 ranking but each one scans a long posting list.
+    """
+    terms = [t for t in dict.fromkeys(t.lower() for t in _TERM_RE.findall(question)) if t not in _STOPWORDS]
+    if conn is not None and len(terms) > 1:
+        terms = _drop_common(conn, terms)
+    # Every term is quoted so FTS5 operators in user input are treated as text
+    return " OR ".join(f'"{t}"' for t in terms)
+
+
+def search(question, limit):
+    """
+    BM25-ranked chunks for the question across all security levels, in the
+    same shape as collection.query() so retrieval can partition it by RBAC.
+    """
+    results = {"ids": [[]], "documents": [[]], "metadatas": [[]], "distances": [[]]}
+    with _lock:
+        conn = _get_connection()
+        match = build_query(question, conn)
+        if not match:
+            return results
+        rows = conn.execute(
+            "SELECT c.chunk_id, c.source, c.security, f.text, bm25(chunks_fts) AS score "
+            "FROM chunks_fts f JOIN chunks c ON c.id = f.rowid "
+            "WHERE chunks_fts MATCH ? ORDER BY score LIMIT ?",
+            (match, limit)
+        ).fetchall()
+    for cid, source, security, text, score in rows:
+        results["ids"][0].append(cid)
+        results["documents"][0].append(text)
+        results["metadatas"][0].append({"source": source, "security": security})
+        results["distances"][0].append(score)
+    return results
+
+
+def rebuild_from_collection(collection, page_size=1000):
+    """
+    Re-indexes every chunk already stored in the Chroma collection
+    (used once for indexes created before the lexical index existed).
+    """
+    offset = 0
+    while True:
+        page = collection.get(include=["documents", "metadatas"], limit=page_size, offset=offset)
+        if not page["ids"]:
+            break
+        add(page["ids"], page["documents"], [m or {} for m in page["metadatas"]])
+        offset += len(page["ids"])
+    return offset
@@ -1,37 +1,94 @@
 # backend/llm.py
-import ollama
-from config import LLM_MODEL
+import time
+from config import LLM_MODEL, LLM_NUM_CTX
+from backend.prompt import build_prompt
+from backend.llm_gateway import get_gateway
+from backend.metrics import registry
 
-def generate_rag_response(question, retrieval_results):
+def generate_rag_response(question, retrieval_results, prompt_stats=None, user=None):
     # Safety check
     if not retrieval_results:
         return "Error: No results to process.", []
 
-    context_text = ""
-    sources = set()
-    
-    if retrieval_results['documents'] and retrieval_results['documents'][0]:
-        for i, doc in enumerate(retrieval_results['documents'][0]):
-            context_text += f"--- Snippet {i+1} ---\n{doc}\n\n"
-            if retrieval_results['metadatas'][0][i]:
-                sources.add(retrieval_results['metadatas'][0][i]['source'])
-    
-    prompt = f"""
-    You are a Secure AI Audit Assistant. Answer strictly based on the context.
-    
-    Context:
-    {context_text}
-    
-    Question: 
-    {question}
-    """
+    # Deduplicated, budget-trimmed context (see backend/prompt.py)
+    with registry.span("prompt_build"):
+        prompt, sources, stats = build_prompt(question, retrieval_results)
+    if prompt_stats is not None:
+        prompt_stats.update(stats)
+
+    return submit_prompt(prompt, user), sources
 
+def submit_prompt(prompt, user=None):
+    """
+    Returns a chat stream for prompt, or an "Error: ..." string.
+    """
     try:
-        stream = ollama.chat(
-            model=LLM_MODEL, 
-            messages=[{'role': 'user', 'content': prompt}],
-            stream=True
+        # Queued behind the shared gateway (bounded concurrency, per-user fairness)
+        return get_gateway().submit(
+            user,
+            LLM_MODEL,
+            [{'role': 'user', 'content': prompt}],
+            options={'num_ctx': LLM_NUM_CTX}
         )
-        return stream, list(sources)
     except Exception as e:
-        return f"Error: {str(e)}", []
\ No newline at end of file
+        return f"Error: {str(e)}"
+
+def stream_text(stream, started, metrics):
+    """
+    Yields the text of each Ollama stream chunk as it arrives and fills
+    metrics with time-to-first-token, token count and tokens/sec.
+    started is the perf_counter() taken before generate_rag_response().
+    A failure mid-stream is yielded as "Error: ..." text and recorded in
+    metrics['error'], so callers can tell it from an answer (and not cache it).
+    """
+    tokens = 0
+    first_token_at = None
+    try:
+        for chunk in stream:
+            if chunk.get('done'):
+                # Ollama reports exact generation counts on the final chunk
+                if chunk.get('eval_count'):
+                    metrics['tokens'] = chunk['eval_count']
+                if chunk.get('eval_duration'):
+                    metrics['tokens_per_sec'] = chunk['eval_count'] / (chunk['eval_duration'] / 1e9)
+                if chunk.get('prompt_eval_count'):
+                    metrics['prompt_tokens'] = chunk['prompt_eval_count']
+            if 'message' in chunk and chunk['message'].get('content'):
+                if first_token_at is None:
+                    first_token_at = time.perf_counter()
+                    metrics['ttft_ms'] = (first_token_at - started) * 1000
+                    registry.observe("ttft", metrics['ttft_ms'])
+                tokens += 1
+                yield chunk['message']['content']
+    except Exception as e:
+        # Connection errors and gateway timeouts surface while iterating
+        registry.increment("generation_errors")
+        metrics['error'] = str(e)
+        yield f"Error: {str(e)}"
+
+    finished = time.perf_counter()
+    metrics['total_ms'] = (finished - started) * 1000
+    if first_token_at is not None:
+        registry.observe("generation", (finished - first_token_at) * 1000)
+    registry.observe("answer_total", metrics['total_ms'])
+    metrics.setdefault('tokens', tokens)
+    if 'tokens_per_sec' not in metrics and first_token_at is not None and finished > first_token_at:
+        metrics['tokens_per_sec'] = tokens / (finished - first_token_at)
+
+
+SOURCES_HEADING = "\n\n**Sources:**\n"
+
+def format_sources(sources):
+    # Markdown appended under an answer (and stored with it in the answer cache)
+    if not sources:
+        return ""
+    return SOURCES_HEADING + "  \n".join(f"- *{s}*" for s in sources)
+
+def format_metrics(metrics):
+    if 'ttft_ms' not in metrics:
+        return ""
+    prompt_tokens = metrics.get('prompt_tokens', metrics.get('prompt_tokens_est'))
+    prompt_part = f" · prompt {prompt_tokens} tokens" if prompt_tokens else ""
+    return (f"⏱️ First token {metrics['ttft_ms']:.0f} ms · "
+            f"{metrics.get('tokens_per_sec', 0):.1f} tok/s · "
+            f"{metrics['tokens']} tokens · {metrics['total_ms'] / 1000:.1f} s total{prompt_part}")
@@ -0,0 +1,184 @@
+# backend/llm_gateway.py
+import queue
+import threading
+import time
+from collections import OrderedDict, deque
+from backend import metrics
+from config import (OLLAMA_HOST, LLM_MAX_CONCURRENT, LLM_MAX_QUEUED_PER_USER, LLM_QUEUE_TIMEOUT,
+                    LLM_REQUEST_TIMEOUT)
+
+_DONE = object()
+
+
+class GatewayBusy(Exception):
+    pass
+
+
+class GatewayRequest:
+    """
+    One queued chat request. Iterating it yields Ollama stream chunks as the
+    worker receives them, so it can be used anywhere an ollama.chat stream is.
+    """
+
+    def __init__(self, user, model, messages, options):
+        self.user = user
+        self.model = model
+        self.messages = messages
+        self.options = options
+        self.submitted = time.perf_counter()
+        self.started = None
+        self.cancelled = threading.Event()
+        self._chunks = queue.Queue()
+
+    def cancel(self):
+        self.cancelled.set()
+
+    def __iter__(self):
+        deadline = self.submitted + LLM_QUEUE_TIMEOUT
+        finished = False
+        try:
+            while True:
+                if self.started is None:
+                    # Still waiting for a worker: give up after LLM_QUEUE_TIMEOUT
+                    timeout = deadline - time.perf_counter()
+                    if timeout <= 0:
+                        raise TimeoutError(f"LLM queue wait exceeded {LLM_QUEUE_TIMEOUT}s")
+                else:
+                    timeout = self.started + LLM_REQUEST_TIMEOUT - time.perf_counter()
+                    if timeout <= 0:
+                        raise TimeoutError(f"LLM generation exceeded {LLM_REQUEST_TIMEOUT}s")
+                try:
+                    item = self._chunks.get(timeout=min(timeout, 0.5))
+                except queue.Empty:
+                    continue
+                if item is _DONE:
+                    finished = True
+                    return
+                if isinstance(item, Exception):
+                    finished = True
+                    raise item
+                yield item
+        finally:
+            # Timeouts and consumers that stop early (e.g. a Streamlit rerun)
+            # free the worker instead of generating into the void
+            if not finished:
+                self.cancel()
+
+
+class LLMGateway:
+    """
+    Bounded pool of worker threads in front of one keep-alive Ollama client.
+    Waiting requests are grouped per user and served round-robin, so one
+    auditor's burst cannot starve everyone else.
+    """
+
+    def __init__(self, host=OLLAMA_HOST, max_concurrent=LLM_MAX_CONCURRENT,
+                 max_queued_per_user=LLM_MAX_QUEUED_PER_USER):
+        import httpx
+        import ollama
+        # One httpx connection pool shared by every worker
+        self.client = ollama.Client(
+            host=host,
+            timeout=httpx.Timeout(LLM_REQUEST_TIMEOUT, connect=10.0),
+            limits=httpx.Limits(max_connections=max_concurrent, max_keepalive_connections=max_concurrent),
+        )
+        self.max_queued_per_user = max_queued_per_user
+        self._waiting = OrderedDict()  # user -> deque of requests, in round-robin order
+        self._cond = threading.Condition()
+        self._active = 0
+        self.stats = {"submitted": 0, "completed": 0, "failed": 0, "cancelled": 0, "rejected": 0,
+                      "queue_ms_total": 0.0, "queue_ms_max": 0.0}
+        self._workers = [
+            threading.Thread(target=self._work, name=f"llm-worker-{i}", daemon=True)
+            for i in range(max_concurrent)
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    def submit(self, user, model, messages, options=None):
+        request = GatewayRequest(user or "anonymous", model, messages, options or {})
+        with self._cond:
+            waiting = self._waiting.setdefault(request.user, deque())
+            if len(waiting) >= self.max_queued_per_user:
+                self.stats["rejected"] += 1
+                raise GatewayBusy(f"{request.user} already has {len(waiting)} requests waiting")
+            waiting.append(request)
+            self.stats["submitted"] += 1
+            self._cond.notify()
+        return request
+
+    def _next_request(self):
+        # Round-robin: take the head of the first user's queue, then move that user to the back
+        while True:
+            user, waiting = next(iter(self._waiting.items()))
+            request = waiting.popleft()
+            if waiting:
+                self._waiting.move_to_end(user)
+            else:
+                del self._waiting[user]
+            if not request.cancelled.is_set():
+                return request
+            self.stats["cancelled"] += 1
+            if not self._waiting:
+                return None
+
+    def _work(self):
+        while True:
+            with self._cond:
+                request = None
+                while request is None:
+                    while not self._waiting:
+                        self._cond.wait()
+                    request = self._next_request()
+                self._active += 1
+            self._run(request)
+            with self._cond:
+                self._active -= 1
+
+    def _run(self, request):
+        request.started = time.perf_counter()
+        waited = (request.started - request.submitted) * 1000
+        self.stats["queue_ms_total"] += waited
+        self.stats["queue_ms_max"] = max(self.stats["queue_ms_max"], waited)
+        metrics.observe("llm_queue_wait", waited)
+        stream = None
+        try:
+            stream = self.client.chat(model=request.model, messages=request.messages,
+                                      stream=True, options=request.options)
+            for chunk in stream:
+                if request.cancelled.is_set():
+                    self.stats["cancelled"] += 1
+                    return
+                request._chunks.put(chunk)
+            self.stats["completed"] += 1
+        except Exception as e:
+            self.stats["failed"] += 1
+            request._chunks.put(e)
+        finally:
+            if stream is not None:
+                # Closing the generator releases the HTTP response back to the pool
+                stream.close()
+            request._chunks.put(_DONE)
+
+    def get_stats(self):
+        with self._cond:
+            stats = dict(self.stats)
+            stats["active"] = self._active
+            stats["queued"] = sum(len(w) for w in self._waiting.values())
+            stats["queued_users"] = len(self._waiting)
+        started = stats["completed"] + stats["failed"]
+        stats["queue_ms_avg"] = stats["queue_ms_total"] / started if started else 0.0
+        return stats
+
+
+_gateway = None
+_gateway_lock = threading.Lock()
+
+
+def get_gateway():
+    global _gateway
+    if _gateway is None:
+        with _gateway_lock:
+            if _gateway is None:
+                _gateway = LLMGateway()
+    return _gateway
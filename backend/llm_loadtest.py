@@ -0,0 +1,108 @@
+# backend/llm_loadtest.py
+"""
+Concurrent-auditor load test for the LLM gateway against the fake Ollama.
+
+    python -m backend.llm_loadtest --users 20 --requests 3
+    python -m backend.llm_loadtest --users 20 --requests 3 --direct   # old per-session ollama.chat
+"""
+import argparse
+import json
+import threading
+import time
+import ollama
+from config import LLM_MAX_CONCURRENT
+from backend.fake_ollama import start_fake_ollama
+from backend.llm_gateway import LLMGateway
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def _consume(stream, started):
+    ttft = None
+    for chunk in stream:
+        if ttft is None and chunk['message'].get('content'):
+            ttft = time.perf_counter() - started
+    return ttft, time.perf_counter() - started
+
+
+def run_load(host, users, requests_per_user, direct=False, max_concurrent=LLM_MAX_CONCURRENT):
+    gateway = None if direct else LLMGateway(host=host, max_concurrent=max_concurrent,
+                                             max_queued_per_user=requests_per_user)
+    results = []
+    errors = []
+    lock = threading.Lock()
+
+    def auditor(user_index):
+        user = f"auditor{user_index}"
+        client = ollama.Client(host=host) if direct else None
+        for i in range(requests_per_user):
+            messages = [{'role': 'user', 'content': f"{user} question {i} about control AC-{i}"}]
+            started = time.perf_counter()
+            try:
+                if direct:
+                    stream = client.chat(model="fake", messages=messages, stream=True)
+                else:
+                    stream = gateway.submit(user, "fake", messages)
+                ttft, total = _consume(stream, started)
+                with lock:
+                    results.append((ttft, total))
+            except Exception as e:
+                with lock:
+                    errors.append(str(e))
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=auditor, args=(u,)) for u in range(users)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    ttfts = [r[0] for r in results if r[0] is not None]
+    totals = [r[1] for r in results]
+    report = {
+        "mode": "direct" if direct else "gateway",
+        "users": users,
+        "requests": len(results),
+        "errors": len(errors),
+        "seconds": round(elapsed, 2),
+        "ttft_p50_ms": round(percentile(ttfts, 50) * 1000, 1),
+        "ttft_p99_ms": round(percentile(ttfts, 99) * 1000, 1),
+        "latency_p50_ms": round(percentile(totals, 50) * 1000, 1),
+        "latency_p95_ms": round(percentile(totals, 95) * 1000, 1),
+        "latency_p99_ms": round(percentile(totals, 99) * 1000, 1),
+    }
+    if gateway is not None:
+        report["gateway"] = gateway.get_stats()
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load-test the LLM gateway.")
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--requests", type=int, default=3, help="Requests per user")
+    parser.add_argument("--host", help="Existing Ollama/fake server; default starts a fake one")
+    parser.add_argument("--direct", action="store_true", help="Bypass the gateway")
+    parser.add_argument("--max-concurrent", type=int, default=LLM_MAX_CONCURRENT)
+    parser.add_argument("--ttft-ms", type=float, default=200)
+    parser.add_argument("--tokens-per-sec", type=float, default=200.0)
+    parser.add_argument("--answer-tokens", type=int, default=32)
+    parser.add_argument("--parallel", type=int, default=2, help="Fake server parallel slots")
+    args = parser.parse_args(argv)
+
+    host = args.host
+    if host is None:
+        _, host = start_fake_ollama(ttft_ms=args.ttft_ms, tokens_per_sec=args.tokens_per_sec,
+                                    answer_tokens=args.answer_tokens, parallel=args.parallel)
+    report = run_load(host, args.users, args.requests, args.direct, args.max_concurrent)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
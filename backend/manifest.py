@@ -0,0 +1,92 @@
+# backend/manifest.py
+import hashlib
+import json
+import os
+import sqlite3
+from datetime import datetime
+from config import DB_FOLDER
+
+# Lives inside DB_FOLDER so reset_database() wipes it with the index
+MANIFEST_PATH = os.path.join(DB_FOLDER, "ingest_manifest.sqlite3")
+
+
+def _connect():
+    os.makedirs(DB_FOLDER, exist_ok=True)
+    conn = sqlite3.connect(MANIFEST_PATH, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS files (
+            source TEXT PRIMARY KEY,
+            file_hash TEXT NOT NULL,
+            security TEXT NOT NULL,
+            chunk_ids TEXT NOT NULL,
+            updated TEXT NOT NULL
+        )
+    """)
+    return conn
+
+
+def hash_file(file_path, block_size=1024 * 1024):
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def chunk_id(source, text):
+    """
+    Content-addressed chunk ID: identical text from the same source always
+    maps to the same ID, so re-ingesting it is a no-op.
+    """
+    digest = hashlib.sha256(f"{source}\0{text}".encode("utf-8")).hexdigest()
+    return f"{source}_{digest[:32]}"
+
+
+def get_file(source):
+    conn = _connect()
+    try:
+        row = conn.execute(
+            "SELECT file_hash, security, chunk_ids FROM files WHERE source = ?", (source,)
+        ).fetchone()
+    finally:
+        conn.close()
+    if row is None:
+        return None
+    return {"source": source, "file_hash": row[0], "security": row[1], "chunk_ids": set(json.loads(row[2]))}
+
+
+def record_file(source, file_hash, security_level, chunk_ids):
+    conn = _connect()
+    try:
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO files (source, file_hash, security, chunk_ids, updated) VALUES (?, ?, ?, ?, ?)",
+                (source, file_hash, security_level, json.dumps(sorted(chunk_ids)),
+                 datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+            )
+    finally:
+        conn.close()
+
+
+def remove_file(source):
+    conn = _connect()
+    try:
+        with conn:
+            conn.execute("DELETE FROM files WHERE source = ?", (source,))
+    finally:
+        conn.close()
+
+
+def list_files():
+    conn = _connect()
+    try:
+        rows = conn.execute(
+            "SELECT source, file_hash, security, chunk_ids, updated FROM files ORDER BY source"
+        ).fetchall()
+    finally:
+        conn.close()
+    return [
+        {"source": r[0], "file_hash": r[1], "security": r[2], "chunk_count": len(json.loads(r[3])), "updated": r[4]}
+        for r in rows
+    ]
@@ -0,0 +1,122 @@
+# backend/metrics.py
+import json
+import math
+import threading
+import time
+from contextlib import contextmanager
+
+# Millisecond bucket bounds shared by every stage histogram
+BUCKETS_MS = [1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000, math.inf]
+
+
+class Histogram:
+    def __init__(self):
+        self.counts = [0] * len(BUCKETS_MS)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        for i, bound in enumerate(BUCKETS_MS):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    def percentile(self, pct):
+        """
+        Upper bound of the bucket holding the pct-th observation (the usual
+        Prometheus-style estimate), capped at the observed max.
+        """
+        if not self.count:
+            return 0.0
+        target = pct / 100 * self.count
+        seen = 0
+        for bound, n in zip(BUCKETS_MS, self.counts):
+            seen += n
+            if seen >= target:
+                return min(bound, self.max)
+        return self.max
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "avg_ms": self.total / self.count if self.count else 0.0,
+            "p50_ms": self.percentile(50),
+            "p95_ms": self.percentile(95),
+            "p99_ms": self.percentile(99),
+            "max_ms": self.max,
+        }
+
+
+class MetricsRegistry:
+    """
+    In-process registry of per-stage latency histograms and event counters.
+    """
+
+    def __init__(self):
+        self._histograms = {}
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def observe(self, stage, elapsed_ms):
+        with self._lock:
+            histogram = self._histograms.get(stage)
+            if histogram is None:
+                histogram = self._histograms[stage] = Histogram()
+            histogram.observe(elapsed_ms)
+
+    def increment(self, name, amount=1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + amount
+
+    @contextmanager
+    def span(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, (time.perf_counter() - start) * 1000)
+
+    def summary(self):
+        with self._lock:
+            return {stage: h.summary() for stage, h in sorted(self._histograms.items())}
+
+    def to_json(self):
+        with self._lock:
+            counters = dict(self._counters)
+        return json.dumps({"stages": self.summary(), "counters": counters}, indent=2)
+
+    def to_prometheus(self):
+        lines = [
+            "# HELP rag_stage_latency_ms Latency of each RAG pipeline stage in milliseconds.",
+            "# TYPE rag_stage_latency_ms histogram",
+        ]
+        with self._lock:
+            for stage, h in sorted(self._histograms.items()):
+                cumulative = 0
+                for bound, n in zip(BUCKETS_MS, h.counts):
+                    cumulative += n
+                    le = "+Inf" if bound == math.inf else f"{bound:g}"
+                    lines.append(f'rag_stage_latency_ms_bucket{{stage="{stage}",le="{le}"}} {cumulative}')
+                lines.append(f'rag_stage_latency_ms_sum{{stage="{stage}"}} {h.total:.3f}')
+                lines.append(f'rag_stage_latency_ms_count{{stage="{stage}"}} {h.count}')
+            lines.append("# HELP rag_events_total Pipeline event counters.")
+            lines.append("# TYPE rag_events_total counter")
+            for name, value in sorted(self._counters.items()):
+                lines.append(f'rag_events_total{{event="{name}"}} {value}')
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+
+registry = MetricsRegistry()
+
+observe = registry.observe
+increment = registry.increment
+span = registry.span
@@ -0,0 +1,181 @@
+# backend/partitions.py
+from concurrent.futures import ThreadPoolExecutor
+from config import SECURITY_LEVELS
+
+# Chunks without a security label are treated as the most restricted level
+DEFAULT_LEVEL = SECURITY_LEVELS[-1]
+
+_pool = ThreadPoolExecutor(max_workers=len(SECURITY_LEVELS), thread_name_prefix="partition-query")
+
+
+def partition_name(base_name, level):
+    return f"{base_name}_{level}"
+
+
+def level_of(metadata):
+    level = (metadata or {}).get("security")
+    return level if level in SECURITY_LEVELS else DEFAULT_LEVEL
+
+
+class PartitionedCollection:
+    """
+    One Chroma collection per security level behind the subset of the
+    collection API used by ingestion and retrieval. Writes are routed by
+    the "security" metadata; query() searches only the requested levels,
+    in parallel, and merges the hits by distance.
+    """
+
+    def __init__(self, partitions):
+        self.partitions = partitions  # level -> chromadb Collection
+
+    def _group(self, metadatas):
+        groups = {}
+        for i, metadata in enumerate(metadatas):
+            groups.setdefault(level_of(metadata), []).append(i)
+        return groups
+
+    def upsert(self, documents, embeddings, metadatas, ids):
+        for level, rows in self._group(metadatas).items():
+            batch_ids = [ids[i] for i in rows]
+            # A chunk lives in exactly one partition: drop copies left at another level
+            for other, partition in self.partitions.items():
+                if other != level:
+                    partition.delete(ids=batch_ids)
+            self.partitions[level].upsert(
+                ids=batch_ids,
+                documents=[documents[i] for i in rows],
+                embeddings=[embeddings[i] for i in rows],
+                metadatas=[metadatas[i] for i in rows],
+            )
+
+    def update(self, ids, metadatas):
+        """
+        Updates metadata in place; chunks whose security level changes are
+        moved (with their stored embedding) to the matching partition.
+        """
+        new_metadata = dict(zip(ids, metadatas))
+        for level, partition in self.partitions.items():
+            current = partition.get(ids=list(ids), include=["documents", "embeddings", "metadatas"])
+            if not current["ids"]:
+                continue
+            stay_ids, stay_metadatas, moves = [], [], {}
+            for i, cid in enumerate(current["ids"]):
+                metadata = new_metadata[cid]
+                target = level_of(metadata)
+                if target == level:
+                    stay_ids.append(cid)
+                    stay_metadatas.append(metadata)
+                else:
+                    move = moves.setdefault(target, {"ids": [], "documents": [], "embeddings": [], "metadatas": []})
+                    move["ids"].append(cid)
+                    move["documents"].append(current["documents"][i])
+                    move["embeddings"].append(current["embeddings"][i])
+                    move["metadatas"].append(metadata)
+            if stay_ids:
+                partition.update(ids=stay_ids, metadatas=stay_metadatas)
+            for target, move in moves.items():
+                self.partitions[target].upsert(**move)
+                partition.delete(ids=move["ids"])
+
+    def delete(self, ids=None, where=None):
+        for partition in self.partitions.values():
+            partition.delete(ids=ids, where=where)
+
+    def close(self):
+        # Chroma collections have nothing to close; shard stores release files
+        for partition in self.partitions.values():
+            if hasattr(partition, "close"):
+                partition.close()
+
+    def count(self, levels=None):
+        return sum(self.counts(levels).values())
+
+    def counts(self, levels=None):
+        return {level: partition.count() for level, partition in self.partitions.items()
+                if levels is None or level in levels}
+
+    def get(self, ids=None, where=None, include=("documents", "metadatas"), limit=None, offset=0):
+        """
+        By ids and/or where: the matching chunks from every partition.
+        Otherwise pages through the partitions in level order, limit/offset
+        spanning them.
+        """
+        include = list(include)
+        page = {"ids": [], **{key: [] for key in include}}
+        for partition in self.partitions.values():
+            if ids is None and where is None:
+                if limit is not None and len(page["ids"]) >= limit:
+                    break
+                size = partition.count()
+                if offset >= size:
+                    offset -= size
+                    continue
+                remaining = None if limit is None else limit - len(page["ids"])
+                part = partition.get(include=include, limit=remaining, offset=offset)
+                offset = 0
+            else:
+                part = partition.get(ids=None if ids is None else list(ids), where=where, include=include)
+            page["ids"].extend(part["ids"])
+            for key in include:
+                page[key].extend(part[key] if part[key] is not None else [])
+        return page
+
+    def query(self, query_embeddings, n_results=10, levels=None, where=None):
+        """
+        Searches the partitions for levels (default: all) concurrently and
+        returns the n_results nearest hits per query embedding, in the same
+        shape as Collection.query().
+        """
+        partitions = [p for level, p in self.partitions.items() if levels is None or level in levels]
+        merged = {"ids": [], "documents": [], "metadatas": [], "distances": []}
+        if not partitions:
+            for _ in query_embeddings:
+                for key in merged:
+                    merged[key].append([])
+            return merged
+
+        def run(partition):
+            return partition.query(query_embeddings=query_embeddings, n_results=n_results, where=where)
+
+        if len(partitions) == 1:
+            results = [run(partitions[0])]
+        else:
+            results = list(_pool.map(run, partitions))
+
+        for q in range(len(query_embeddings)):
+            hits = []
+            for result in results:
+                for i, cid in enumerate(result["ids"][q]):
+                    hits.append((result["distances"][q][i], cid,
+                                 result["documents"][q][i], result["metadatas"][q][i]))
+            hits.sort(key=lambda hit: hit[0])
+            hits = hits[:n_results]
+            merged["ids"].append([hit[1] for hit in hits])
+            merged["documents"].append([hit[2] for hit in hits])
+            merged["metadatas"].append([hit[3] for hit in hits])
+            merged["distances"].append([hit[0] for hit in hits])
+        return merged
+
+
+def migrate_legacy(client, legacy_name, collection, page_size=1000):
+    """
+    Moves chunks from the old single collection into the partitions, page by
+    page (stored embeddings are copied, nothing is re-embedded), and drops
+    it once empty. Safe to resume after an interruption. Returns the number
+    of chunks moved.
+    """
+    names = [getattr(c, "name", c) for c in client.list_collections()]
+    if legacy_name not in names:
+        return 0
+    legacy = client.get_collection(name=legacy_name)
+    moved = 0
+    while True:
+        page = legacy.get(include=["documents", "embeddings", "metadatas"], limit=page_size)
+        if not page["ids"]:
+            break
+        collection.upsert(documents=page["documents"], embeddings=page["embeddings"],
+                          metadatas=page["metadatas"], ids=page["ids"])
+        legacy.delete(ids=page["ids"])
+        moved += len(page["ids"])
+    client.delete_collection(name=legacy_name)
+    return moved
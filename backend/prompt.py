@@ -0,0 +1,134 @@
+# backend/prompt.py
+import re
+from config import PROMPT_CONTEXT_TOKENS, PROMPT_MIN_SNIPPET_TOKENS
+
+PROMPT_TEMPLATE = """
+    You are a Secure AI Audit Assistant. Answer strictly based on the context.
+
+    Context:
+    {context}
+
+    Question:
+    {question}
+    """
+
+BATCH_PROMPT_TEMPLATE = """
+    You are a Secure AI Audit Assistant. Answer each question strictly based on the context.
+    Reply with one paragraph per question, each starting with "Answer <number>:".
+
+    Context:
+    {context}
+
+    Questions:
+    {questions}
+    """
+
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+")
+_ANSWER_RE = re.compile(r"^\W*Answer\s+(\d+)\W*?:\**\s*(.*?)(?=^\W*Answer\s+\d+\W*?:|\Z)",
+                        re.MULTILINE | re.DOTALL | re.IGNORECASE)
+
+
+def estimate_tokens(text):
+    # Llama-family tokenizers average roughly 4 characters per token on English prose
+    return (len(text) + 3) // 4
+
+
+def _normalize(sentence):
+    return " ".join(sentence.lower().split())
+
+
+def _trim_to_budget(sentences, budget):
+    kept, used = [], 0
+    for sentence in sentences:
+        cost = estimate_tokens(sentence) + 1
+        if used + cost > budget:
+            break
+        kept.append(sentence)
+        used += cost
+    return kept
+
+
+def build_context(retrieval_results, context_tokens=PROMPT_CONTEXT_TOKENS):
+    """
+    Packs retrieved snippets into the context block in retrieval order. Sentences
+    already included by an earlier snippet (chunk overlaps, duplicate
+    chunks) are dropped, and the context stops at context_tokens: the
+    snippet that crosses the budget is cut at a sentence boundary, or
+    skipped if less than PROMPT_MIN_SNIPPET_TOKENS would remain.
+    Returns (context, sources, stats).
+    """
+    seen = set()
+    blocks = []
+    sources = []
+    used = 0
+    stats = {"snippets": 0, "deduplicated_sentences": 0, "trimmed": 0, "dropped": 0}
+
+    documents = retrieval_results['documents'][0] if retrieval_results['documents'] else []
+    metadatas = retrieval_results['metadatas'][0] if retrieval_results.get('metadatas') else [None] * len(documents)
+
+    for doc, meta in zip(documents, metadatas):
+        sentences = []
+        for sentence in _SENTENCE_RE.split(doc):
+            key = _normalize(sentence)
+            if not key:
+                continue
+            if key in seen:
+                stats["deduplicated_sentences"] += 1
+                continue
+            sentences.append(sentence.strip())
+        if not sentences:
+            continue
+
+        remaining = context_tokens - used
+        kept = _trim_to_budget(sentences, remaining)
+        if len(kept) < len(sentences):
+            if estimate_tokens(" ".join(kept)) < PROMPT_MIN_SNIPPET_TOKENS:
+                stats["dropped"] += 1
+                continue
+            stats["trimmed"] += 1
+
+        text = " ".join(kept)
+        seen.update(_normalize(s) for s in kept)
+        used += estimate_tokens(text)
+        blocks.append(f"--- Snippet {len(blocks) + 1} ---\n{text}\n\n")
+        if meta and meta.get('source') and meta['source'] not in sources:
+            sources.append(meta['source'])
+
+    stats["snippets"] = len(blocks)
+    stats["context_tokens"] = used
+    return "".join(blocks), sources, stats
+
+
+def build_prompt(question, retrieval_results, context_tokens=PROMPT_CONTEXT_TOKENS):
+    """
+    Returns (prompt, sources, stats) for one question; see build_context().
+    """
+    context, sources, stats = build_context(retrieval_results, context_tokens)
+    prompt = PROMPT_TEMPLATE.format(context=context, question=question)
+    stats["prompt_tokens_est"] = estimate_tokens(prompt)
+    return prompt, sources, stats
+
+
+def build_batch_prompt(questions, retrieval_results, context_tokens=PROMPT_CONTEXT_TOKENS):
+    """
+    One prompt answering several questions over the same retrieved context;
+    answers come back as "Answer <n>:" paragraphs (see split_batch_answer).
+    """
+    context, sources, stats = build_context(retrieval_results, context_tokens)
+    numbered = "\n".join(f"{n}. {q}" for n, q in enumerate(questions, start=1))
+    prompt = BATCH_PROMPT_TEMPLATE.format(context=context, questions=numbered)
+    stats["prompt_tokens_est"] = estimate_tokens(prompt)
+    return prompt, sources, stats
+
+
+def split_batch_answer(text, count):
+    """
+    Splits a batch reply into count answers. Returns None unless every
+    "Answer <n>:" from 1 to count is present.
+    """
+    answers = {}
+    for match in _ANSWER_RE.finditer(text):
+        answers[int(match.group(1))] = match.group(2).strip()
+    if any(not answers.get(n) for n in range(1, count + 1)):
+        return None
+    return [answers[n] for n in range(1, count + 1)]
@@ -0,0 +1,175 @@
+# backend/questionnaire.py
+import csv
+import io
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from config import BATCH_GROUP_SIZE, BATCH_MAX_QUESTIONS, LLM_MAX_CONCURRENT, LLM_MAX_QUEUED_PER_USER
+from backend import metrics
+from backend.answer_cache import lookup_answer, store_answer
+from backend.database import get_allowed_levels, query_documents_batch
+from backend.llm import SOURCES_HEADING, format_sources, stream_text, submit_prompt
+from backend.prompt import build_batch_prompt, build_prompt, split_batch_answer
+
+REPORT_COLUMNS = ["id", "question", "status", "answer", "sources", "cached", "group_size",
+                  "retrieval_ms", "ttft_ms", "generation_ms", "total_ms"]
+
+STATUS_ANSWERS = {
+    "denied": "ACCESS BLOCKED: documents exist, but they are classified above your level.",
+    "no_data": "No relevant information found in the indexed documents.",
+}
+
+
+def parse_questions(data):
+    """
+    Reads a questionnaire CSV (bytes or str). Uses the "question" column if
+    there is a header with one, otherwise the first column; an "id" column
+    is carried into the report. Returns [(id, question)].
+    """
+    text = data.decode("utf-8-sig") if isinstance(data, bytes) else data
+    rows = list(csv.reader(io.StringIO(text)))
+    if not rows:
+        return []
+    header = [h.strip().lower() for h in rows[0]]
+    if "question" in header:
+        q_col = header.index("question")
+        id_col = header.index("id") if "id" in header else None
+        rows = rows[1:]
+    else:
+        q_col, id_col = 0, None
+
+    questions = []
+    for n, row in enumerate(rows, start=1):
+        if len(row) <= q_col or not row[q_col].strip():
+            continue
+        item_id = row[id_col].strip() if id_col is not None and len(row) > id_col else str(n)
+        questions.append((item_id, row[q_col].strip()))
+    if len(questions) > BATCH_MAX_QUESTIONS:
+        raise ValueError(f"Questionnaire has {len(questions)} questions; the limit is {BATCH_MAX_QUESTIONS}")
+    return questions
+
+
+def group_by_context(pending, group_size=BATCH_GROUP_SIZE):
+    """
+    Groups (item, results) pairs whose retrieved chunk IDs are identical,
+    at most group_size per group, so each group needs one prompt.
+    """
+    groups = {}
+    for item, results in pending:
+        groups.setdefault(frozenset(results["ids"][0]), []).append((item, results))
+    return [members[i:i + group_size] for members in groups.values()
+            for i in range(0, len(members), group_size)]
+
+
+def _generate(group, user):
+    """
+    Answers one group with a single prompt (one question: the chat prompt).
+    Groups whose reply can't be split per question are retried one by one.
+    """
+    questions = [item["question"] for item, _ in group]
+    results = group[0][1]
+    generation = {}
+    started = time.perf_counter()
+    with metrics.span("prompt_build"):
+        if len(group) == 1:
+            prompt, sources, _ = build_prompt(questions[0], results)
+        else:
+            prompt, sources, _ = build_batch_prompt(questions, results)
+
+    stream = submit_prompt(prompt, user)
+    if isinstance(stream, str):
+        # submit_prompt() returns "Error: ..." when the request can't be made
+        generation["error"] = stream.removeprefix("Error: ")
+    else:
+        text = "".join(stream_text(stream, started, generation))
+    if "error" in generation:
+        # A stream that failed part-way still has the partial answer in text
+        for item, _ in group:
+            item.update(status="error", answer=f"Error: {generation['error']}")
+        return group
+
+    answers = [text] if len(group) == 1 else split_batch_answer(text, len(group))
+    if answers is None:
+        metrics.increment("batch_split_fallbacks")
+        return [done for member in group for done in _generate([member], user)]
+
+    for (item, _), answer in zip(group, answers):
+        item.update(answer=answer.strip(), sources="; ".join(sources), group_size=len(group),
+                    ttft_ms=round(generation.get("ttft_ms", 0.0), 1),
+                    generation_ms=round(generation.get("total_ms", 0.0), 1))
+        item["_sources_block"] = format_sources(sources)
+    return group
+
+
+def run_questionnaire(questions, user_role, username, workers=None):
+    """
+    Answers [(id, question)] for one user and yields each item dict (see
+    REPORT_COLUMNS) as soon as it is final: denials, empty results and
+    cached answers first, then generations in completion order. All
+    questions are embedded and searched in vectorized batches; generations
+    run concurrently through the LLM gateway, at most workers at a time.
+    """
+    run_started = time.perf_counter()
+    texts = [question for _, question in questions]
+    verdicts = query_documents_batch(texts, user_role, username)
+    retrieval_ms = (time.perf_counter() - run_started) * 1000 / max(1, len(texts))
+    allowed_levels = get_allowed_levels(user_role)
+
+    def finish(item):
+        item["total_ms"] = round((time.perf_counter() - run_started) * 1000, 1)
+        return item
+
+    pending = []
+    for (item_id, question), (results, status) in zip(questions, verdicts):
+        item = {column: "" for column in REPORT_COLUMNS}
+        item.update(id=item_id, question=question, status=status, cached=False, group_size=0,
+                    retrieval_ms=round(retrieval_ms, 1))
+        if status != "success":
+            item["answer"] = STATUS_ANSWERS[status]
+            yield finish(item)
+            continue
+        cached = lookup_answer(question, allowed_levels, results)
+        if cached is not None:
+            answer, _, sources = cached.partition(SOURCES_HEADING)
+            names = [line.strip().removeprefix("- *").removesuffix("*") for line in sources.split("  \n")]
+            item.update(answer=answer, sources="; ".join(n for n in names if n), cached=True)
+            yield finish(item)
+            continue
+        pending.append((item, results))
+
+    # Each worker has one request in the gateway at a time, which keeps the
+    # batch inside the per-user queue limit and leaves room for other users
+    workers = workers or max(1, min(LLM_MAX_CONCURRENT, LLM_MAX_QUEUED_PER_USER))
+    pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="questionnaire")
+    try:
+        futures = [pool.submit(_generate, group, username) for group in group_by_context(pending)]
+        for future in as_completed(futures):
+            for item, results in future.result():
+                sources_block = item.pop("_sources_block", None)
+                if item["status"] == "success":
+                    store_answer(item["question"], allowed_levels, results, item["answer"] + sources_block)
+                yield finish(item)
+    finally:
+        # A stopped consumer (e.g. a Streamlit rerun) drops the groups not yet started
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def report_csv(items):
+    out = io.StringIO()
+    writer = csv.DictWriter(out, fieldnames=REPORT_COLUMNS, extrasaction="ignore")
+    writer.writeheader()
+    writer.writerows(items)
+    return out.getvalue()
+
+
+def summarize(items):
+    statuses = {}
+    for item in items:
+        statuses[item["status"]] = statuses.get(item["status"], 0) + 1
+    generated = [item for item in items if item.get("generation_ms")]
+    return {
+        "questions": len(items),
+        "statuses": statuses,
+        "cached": sum(1 for item in items if item["cached"]),
+        "prompts": round(sum(1 / item["group_size"] for item in generated)),
+        "total_ms": max((item["total_ms"] for item in items), default=0.0),
+    }
@@ -0,0 +1,129 @@
+# backend/retrieval.py
+from config import (SECURITY_LEVELS, RETRIEVAL_TOP_K, RETRIEVAL_CANDIDATES, HYBRID_SEARCH, RRF_K,
+                    BATCH_QUERY_SIZE)
+from backend import lexical_index, metrics, vector_store
+
+_lexical_checked = False
+
+
+def empty_results():
+    return {"ids": [[]], "documents": [[]], "metadatas": [[]], "distances": [[]]}
+
+
+def partition_hits(results, allowed_levels, top_k=RETRIEVAL_TOP_K):
+    """
+    Splits one unfiltered result set into allowed hits and a denied count.
+    Returns (allowed_results, denied_count) with allowed_results in the
+    same shape as collection.query() so the LLM layer can consume it.
+    """
+    allowed = empty_results()
+    denied = 0
+    if not results or not results.get("ids") or not results["ids"][0]:
+        return allowed, denied
+
+    ids = results["ids"][0]
+    documents = results["documents"][0]
+    metadatas = results["metadatas"][0]
+    distances = results["distances"][0] if results.get("distances") else [None] * len(ids)
+
+    for i in range(len(ids)):
+        level = (metadatas[i] or {}).get("security")
+        if level in allowed_levels:
+            if len(allowed["ids"][0]) < top_k:
+                allowed["ids"][0].append(ids[i])
+                allowed["documents"][0].append(documents[i])
+                allowed["metadatas"][0].append(metadatas[i])
+                allowed["distances"][0].append(distances[i])
+        else:
+            denied += 1
+    return allowed, denied
+
+
+def fuse_results(result_sets, limit, k=RRF_K):
+    """
+    Reciprocal-rank fusion of several collection.query()-shaped result sets.
+    """
+    scores = {}
+    hits = {}
+    for results in result_sets:
+        for rank, cid in enumerate(results["ids"][0]):
+            scores[cid] = scores.get(cid, 0.0) + 1.0 / (k + rank + 1)
+            if cid not in hits:
+                hits[cid] = (results["documents"][0][rank], results["metadatas"][0][rank],
+                             results["distances"][0][rank] if results.get("distances") else None)
+
+    fused = empty_results()
+    for cid in sorted(scores, key=scores.get, reverse=True)[:limit]:
+        document, metadata, distance = hits[cid]
+        fused["ids"][0].append(cid)
+        fused["documents"][0].append(document)
+        fused["metadatas"][0].append(metadata)
+        fused["distances"][0].append(distance)
+    return fused
+
+
+def _ensure_lexical_index(collection):
+    # Collections built before the lexical index existed are indexed once
+    global _lexical_checked
+    if not _lexical_checked:
+        if lexical_index.count() == 0 and collection.count() > 0:
+            lexical_index.rebuild_from_collection(collection)
+        _lexical_checked = True
+
+
+def search(question, allowed_levels, top_k=RETRIEVAL_TOP_K, candidates=RETRIEVAL_CANDIDATES):
+    """
+    Embeds the question once and searches only the partitions the role may
+    read, in parallel. Higher levels are never searched; they are counted
+    only to tell a denial apart from an empty index.
+    Returns (results, status) where status is "success", "denied" or "no_data".
+    """
+    return search_many([question], allowed_levels, top_k, candidates)[0]
+
+
+def search_many(questions, allowed_levels, top_k=RETRIEVAL_TOP_K, candidates=RETRIEVAL_CANDIDATES,
+                query_batch_size=BATCH_QUERY_SIZE):
+    """
+    search() for many questions: one batched embedding call and one ANN
+    query per query_batch_size questions. Returns a (results, status) pair
+    per question, in order.
+    """
+    collection = vector_store.get_collection()
+    query_embeddings = vector_store.embed(list(questions))
+    n_results = max(top_k, candidates)
+
+    # 1. ANN search over the allowed partitions, merged by distance
+    vector_hits = []
+    for i in range(0, len(questions), query_batch_size):
+        with metrics.span("vector_search"):
+            results = collection.query(
+                query_embeddings=query_embeddings[i:i + query_batch_size],
+                n_results=n_results,
+                levels=allowed_levels
+            )
+        for q in range(len(results["ids"])):
+            vector_hits.append({key: [results[key][q]] for key in ("ids", "documents", "metadatas", "distances")})
+
+    if HYBRID_SEARCH:
+        _ensure_lexical_index(collection)
+    restricted = None
+    verdicts = []
+    for question, results in zip(questions, vector_hits):
+        # 1b. Exact terms (control IDs, clause numbers) from the lexical index, fused by rank
+        if HYBRID_SEARCH:
+            with metrics.span("lexical_search"):
+                lexical = lexical_index.search(question, n_results)
+            results = fuse_results([results, lexical], n_results)
+
+        # The lexical index spans every level, so its hits are still partitioned
+        with metrics.span("blocked_check"):
+            allowed, denied = partition_hits(results, allowed_levels, top_k)
+            if allowed["ids"][0]:
+                verdicts.append((allowed, "success"))
+                continue
+
+            # 2. Nothing readable: documents above clearance make this a denial
+            if restricted is None:
+                restricted = collection.count(levels=[l for l in SECURITY_LEVELS if l not in allowed_levels])
+            verdicts.append((None, "denied" if denied or restricted else "no_data"))
+    return verdicts
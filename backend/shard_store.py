@@ -0,0 +1,486 @@
+# backend/shard_store.py
+"""
+Compact vector store: quantized embeddings in memory-mapped shard files.
+
+Each partition folder holds append-only shard files of SHARD_ROWS vectors:
+"shard-<gen>-<n>.q" with int8 (or float16) vectors plus a per-vector scale
+and squared norm, and "shard-<gen>-<n>.f32" with the original float32
+vectors. Searches scan only the quantized files and re-score the best
+SHARD_RERANK_FACTOR * n_results candidates with their float32 vectors, so
+only those pages of the float files are ever read. IDs, documents and
+metadata live in SQLite, keyed by slot (the row's position in the shards).
+
+    python -m backend.shard_store --queries 200     # footprint & recall vs Chroma
+"""
+import argparse
+import json
+import os
+import re
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+import numpy as np
+from config import EMBEDDING_DIM, SHARD_QUANTIZATION, SHARD_RERANK_FACTOR, SHARD_ROWS
+
+QUANTIZATIONS = ("int8", "float16")
+
+_SHARD_RE = re.compile(r"shard-(\d+)-(\d+)\.(q|f32)$")
+
+
+def quantize(vectors, quantization):
+    """
+    Returns (quantized vectors, per-vector scale). int8 uses a symmetric
+    per-vector scale; float16 is a plain cast with scale 1.
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if quantization == "float16":
+        return vectors.astype(np.float16), np.ones(len(vectors), dtype=np.float32)
+    scale = np.abs(vectors).max(axis=1) / 127.0
+    scale[scale == 0] = 1.0
+    return np.round(vectors / scale[:, None]).astype(np.int8), scale.astype(np.float32)
+
+
+class ShardCollection:
+    """
+    One partition, behind the subset of the Chroma Collection API used by
+    PartitionedCollection. Distances are squared L2, as in Chroma's
+    default "l2" space. Single process only, like the embedded Chroma store.
+    """
+
+    def __init__(self, folder, dim=EMBEDDING_DIM, quantization=SHARD_QUANTIZATION, shard_rows=SHARD_ROWS,
+                 rerank_factor=SHARD_RERANK_FACTOR):
+        if quantization not in QUANTIZATIONS:
+            raise ValueError(f"quantization must be one of {QUANTIZATIONS}")
+        os.makedirs(folder, exist_ok=True)
+        self.folder = folder
+        self.rerank_factor = rerank_factor
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(os.path.join(folder, "rows.sqlite3"), timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS rows (
+                slot INTEGER PRIMARY KEY,
+                id TEXT UNIQUE NOT NULL,
+                document TEXT,
+                metadata TEXT NOT NULL
+            )
+        """)
+        # Layout settings are fixed when the store is created
+        with self._conn:
+            for key, value in (("dim", dim), ("quantization", quantization), ("shard_rows", shard_rows),
+                               ("generation", 0)):
+                self._conn.execute("INSERT OR IGNORE INTO meta (key, value) VALUES (?, ?)", (key, str(value)))
+        settings = dict(self._conn.execute("SELECT key, value FROM meta"))
+        self.dim = int(settings["dim"])
+        self.quantization = settings["quantization"]
+        self.shard_rows = int(settings["shard_rows"])
+        self._generation = int(settings["generation"])
+        self.dtype = np.dtype([("vector", "i1" if self.quantization == "int8" else "<f2", (self.dim,)),
+                               ("scale", "<f4"), ("norm", "<f4")])
+        self._load()
+
+    # --- Files ------------------------------------------------------------
+
+    def _path(self, shard, kind, generation=None):
+        generation = self._generation if generation is None else generation
+        return os.path.join(self.folder, f"shard-{generation:04d}-{shard:05d}.{kind}")
+
+    def _load(self):
+        """
+        Drops files of other generations (an interrupted compaction), trims
+        a torn trailing record and rebuilds the alive mask from SQLite.
+        """
+        for name in os.listdir(self.folder):
+            match = _SHARD_RE.match(name)
+            if match and int(match.group(1)) != self._generation:
+                os.remove(os.path.join(self.folder, name))
+        slots = 0
+        shard = 0
+        while os.path.exists(self._path(shard, "q")):
+            rows = min(os.path.getsize(self._path(shard, "q")) // self.dtype.itemsize,
+                       os.path.getsize(self._path(shard, "f32")) // (self.dim * 4)
+                       if os.path.exists(self._path(shard, "f32")) else 0)
+            os.truncate(self._path(shard, "q"), rows * self.dtype.itemsize)
+            with open(self._path(shard, "f32"), "ab") as f:
+                f.truncate(rows * self.dim * 4)
+            slots += rows
+            if rows < self.shard_rows:
+                break
+            shard += 1
+        self._slots = slots
+        self._maps = {}
+        alive = np.zeros(slots, dtype=bool)
+        # Rows written to SQLite whose vectors never reached the shards are dropped
+        with self._conn:
+            self._conn.execute("DELETE FROM rows WHERE slot >= ?", (slots,))
+        live = np.fromiter((r[0] for r in self._conn.execute("SELECT slot FROM rows")), dtype=np.int64)
+        alive[live] = True
+        self._alive = alive
+
+    def _maps_for(self, shard):
+        # Re-mapped after appends; a mapping stays valid while a query holds it
+        cached = self._maps.get(shard)
+        if cached is None:
+            rows = min(self.shard_rows, self._slots - shard * self.shard_rows)
+            cached = (np.memmap(self._path(shard, "q"), dtype=self.dtype, mode="r", shape=(rows,)),
+                      np.memmap(self._path(shard, "f32"), dtype="<f4", mode="r", shape=(rows, self.dim)))
+            self._maps[shard] = cached
+        return cached
+
+    def _append(self, vectors):
+        vectors = np.asarray(vectors, dtype=np.float32)
+        quantized, scale = quantize(vectors, self.quantization)
+        records = np.empty(len(vectors), dtype=self.dtype)
+        records["vector"] = quantized
+        records["scale"] = scale
+        records["norm"] = np.einsum("ij,ij->i", vectors, vectors)
+
+        first = self._slots
+        done = 0
+        while done < len(vectors):
+            shard, offset = divmod(self._slots, self.shard_rows)
+            take = min(self.shard_rows - offset, len(vectors) - done)
+            with open(self._path(shard, "q"), "ab") as f:
+                f.write(records[done:done + take].tobytes())
+            with open(self._path(shard, "f32"), "ab") as f:
+                f.write(vectors[done:done + take].tobytes())
+            self._maps.pop(shard, None)
+            self._slots += take
+            done += take
+        # Replaced, not resized, so a running query keeps a consistent mask.
+        # The new slots go live once their rows are committed.
+        self._alive = np.concatenate([self._alive, np.zeros(len(vectors), dtype=bool)])
+        return list(range(first, self._slots))
+
+    def _floats(self, slots, maps=None):
+        vectors = np.empty((len(slots), self.dim), dtype=np.float32)
+        shards = slots // self.shard_rows
+        for shard in np.unique(shards):
+            selected = shards == shard
+            float_map = maps[shard][1] if maps is not None else self._maps_for(int(shard))[1]
+            vectors[selected] = float_map[slots[selected] % self.shard_rows]
+        return vectors
+
+    # --- Rows -------------------------------------------------------------
+
+    def _where_sql(self, ids=None, where=None):
+        clauses, params = [], []
+        if ids is not None:
+            clauses.append(f"id IN ({','.join('?' * len(ids))})")
+            params.extend(ids)
+        for key, value in (where or {}).items():
+            if isinstance(value, dict):
+                if set(value) != {"$eq"}:
+                    raise ValueError("ShardCollection only supports equality filters")
+                value = value["$eq"]
+            clauses.append("json_extract(metadata, ?) = ?")
+            params.extend([f"$.{key}", value])
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+    def _remove(self, sql, params):
+        slots = [r[0] for r in self._conn.execute(f"SELECT slot FROM rows{sql}", params)]
+        if slots:
+            self._conn.executemany("DELETE FROM rows WHERE slot = ?", [(s,) for s in slots])
+            self._alive[slots] = False
+        return len(slots)
+
+    def upsert(self, ids, embeddings, metadatas=None, documents=None):
+        metadatas = metadatas or [{}] * len(ids)
+        documents = documents or [None] * len(ids)
+        with self._lock:
+            with self._conn:
+                self._remove(*self._where_sql(ids=list(ids)))
+                slots = self._append(embeddings)
+                self._conn.executemany(
+                    "INSERT INTO rows (slot, id, document, metadata) VALUES (?, ?, ?, ?)",
+                    [(slot, cid, doc, json.dumps(meta or {}))
+                     for slot, cid, doc, meta in zip(slots, ids, documents, metadatas)]
+                )
+            self._alive[slots] = True
+
+    def add(self, ids, embeddings, metadatas=None, documents=None):
+        self.upsert(ids=ids, embeddings=embeddings, metadatas=metadatas, documents=documents)
+
+    def update(self, ids, metadatas=None, documents=None, embeddings=None):
+        """
+        Metadata and documents are updated in place (metadata keys are
+        merged, as in Chroma); new embeddings are appended as new rows.
+        """
+        current = self.get(ids=ids, include=["documents", "metadatas"])
+        found = {cid: (current["documents"][i], current["metadatas"][i]) for i, cid in enumerate(current["ids"])}
+        keep = [i for i, cid in enumerate(ids) if cid in found]
+        new_documents = [documents[i] if documents else found[ids[i]][0] for i in keep]
+        new_metadatas = [{**found[ids[i]][1], **(metadatas[i] or {})} if metadatas else found[ids[i]][1]
+                         for i in keep]
+        if embeddings is not None:
+            self.upsert(ids=[ids[i] for i in keep], embeddings=[embeddings[i] for i in keep],
+                        metadatas=new_metadatas, documents=new_documents)
+            return
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "UPDATE rows SET document = ?, metadata = ? WHERE id = ?",
+                [(doc, json.dumps(meta), ids[i]) for i, doc, meta in zip(keep, new_documents, new_metadatas)]
+            )
+
+    def delete(self, ids=None, where=None):
+        if ids is None and not where:
+            raise ValueError("delete() needs ids or where")
+        with self._lock:
+            with self._conn:
+                self._remove(*self._where_sql(ids=None if ids is None else list(ids), where=where))
+            dead = self._slots - int(self._alive.sum())
+            # Deleted rows only cost scan time; rewrite once they outweigh the live ones
+            if dead >= self.shard_rows and dead > self._slots // 2:
+                self._compact()
+
+    def count(self):
+        return int(self._alive.sum())
+
+    def get(self, ids=None, where=None, include=("documents", "metadatas"), limit=None, offset=0):
+        include = list(include)
+        sql, params = self._where_sql(ids=None if ids is None else list(ids), where=where)
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT slot, id, document, metadata FROM rows{sql} ORDER BY slot LIMIT ? OFFSET ?",
+                params + [-1 if limit is None else limit, offset or 0]
+            ).fetchall()
+            vectors = self._floats(np.array([r[0] for r in rows], dtype=np.int64)) if "embeddings" in include else None
+        result = {"ids": [r[1] for r in rows]}
+        if "documents" in include:
+            result["documents"] = [r[2] for r in rows]
+        if "metadatas" in include:
+            result["metadatas"] = [json.loads(r[3]) for r in rows]
+        if "embeddings" in include:
+            result["embeddings"] = list(vectors)
+        return result
+
+    # --- Search -----------------------------------------------------------
+
+    def query(self, query_embeddings, n_results=10, where=None):
+        """
+        Approximate pass over the quantized shards (only rows matching
+        where), then exact float32 re-scoring of the best candidates.
+        Returns Chroma-shaped results, nearest first.
+        """
+        queries = np.asarray(query_embeddings, dtype=np.float32).reshape(-1, self.dim)
+        with self._lock:
+            generation, alive, slots = self._generation, self._alive, self._slots
+            maps = [self._maps_for(shard) for shard in range(-(-slots // self.shard_rows))]
+            if where:
+                sql, params = self._where_sql(where=where)
+                mask = np.zeros(len(alive), dtype=bool)
+                mask[[r[0] for r in self._conn.execute(f"SELECT slot FROM rows{sql}", params)]] = True
+                alive = alive & mask
+
+        k = max(1, n_results * self.rerank_factor)
+        best_scores = np.empty((len(queries), 0), dtype=np.float32)
+        best_slots = np.empty((len(queries), 0), dtype=np.int64)
+        for shard, (records, _) in enumerate(maps):
+            base = shard * self.shard_rows
+            rows = np.flatnonzero(alive[base:base + len(records)])
+            if not len(rows):
+                continue
+            part = records[rows] if len(rows) < len(records) else records[:]
+            # ||q||^2 is the same for every row, so it is left out of the ranking
+            scores = part["norm"] - 2 * (queries @ part["vector"].astype(np.float32).T) * part["scale"]
+            best_scores = np.concatenate([best_scores, scores], axis=1)
+            best_slots = np.concatenate([best_slots, np.broadcast_to(rows + base, scores.shape)], axis=1)
+            if best_scores.shape[1] > k:
+                top = np.argpartition(best_scores, k - 1, axis=1)[:, :k]
+                best_scores = np.take_along_axis(best_scores, top, axis=1)
+                best_slots = np.take_along_axis(best_slots, top, axis=1)
+
+        ranked = []
+        for q, candidates in zip(queries, best_slots):
+            vectors = self._floats(candidates, maps)
+            distances = np.einsum("ij,ij->i", vectors - q, vectors - q)
+            order = np.argsort(distances)[:n_results]
+            ranked.append((candidates[order], distances[order]))
+
+        wanted = sorted({int(s) for slots_, _ in ranked for s in slots_})
+        with self._lock:
+            if self._generation != generation:
+                # Compacted mid-query: slots were renumbered
+                return self.query(query_embeddings, n_results, where)
+            rows = {r[0]: r[1:] for r in self._conn.execute(
+                f"SELECT slot, id, document, metadata FROM rows WHERE slot IN ({','.join('?' * len(wanted))})",
+                wanted)} if wanted else {}
+
+        results = {"ids": [], "documents": [], "metadatas": [], "distances": []}
+        for slots_, distances in ranked:
+            # Rows deleted while the query ran are dropped
+            hits = [(rows[int(s)], float(d)) for s, d in zip(slots_, distances) if int(s) in rows]
+            results["ids"].append([row[0] for row, _ in hits])
+            results["documents"].append([row[1] for row, _ in hits])
+            results["metadatas"].append([json.loads(row[2]) for row, _ in hits])
+            results["distances"].append([d for _, d in hits])
+        return results
+
+    # --- Maintenance ------------------------------------------------------
+
+    def _compact(self):
+        """
+        Rewrites the live rows into new-generation shard files and renumbers
+        their slots; the SQLite commit switches generations atomically.
+        """
+        live = np.flatnonzero(self._alive)
+        generation = self._generation + 1
+        for start in range(0, len(live), self.shard_rows):
+            slots = live[start:start + self.shard_rows]
+            shard = start // self.shard_rows
+            records = np.empty(len(slots), dtype=self.dtype)
+            shards = slots // self.shard_rows
+            for old in np.unique(shards):
+                selected = shards == old
+                records[selected] = self._maps_for(int(old))[0][slots[selected] % self.shard_rows]
+            with open(self._path(shard, "q", generation), "wb") as f:
+                f.write(records.tobytes())
+            with open(self._path(shard, "f32", generation), "wb") as f:
+                f.write(self._floats(slots).tobytes())
+
+        old_generation = self._generation
+        with self._conn:
+            # Ascending order: each row moves to a lower, already vacated slot
+            self._conn.executemany("UPDATE rows SET slot = ? WHERE slot = ?",
+                                   [(new, int(old)) for new, old in enumerate(live)])
+            self._conn.execute("UPDATE meta SET value = ? WHERE key = 'generation'", (str(generation),))
+        self._generation = generation
+        self._load()
+        for name in os.listdir(self.folder):
+            match = _SHARD_RE.match(name)
+            if match and int(match.group(1)) == old_generation:
+                os.remove(os.path.join(self.folder, name))
+
+    def footprint(self):
+        """
+        Bytes scanned per search (quantized shards, the memory that stays
+        hot) and bytes of float32 vectors read only for re-scoring.
+        """
+        return {
+            "rows": self.count(),
+            "slots": self._slots,
+            "quantization": self.quantization,
+            "scan_bytes": self._slots * self.dtype.itemsize,
+            "rescore_bytes": self._slots * self.dim * 4,
+        }
+
+    def close(self):
+        with self._lock:
+            self._maps = {}
+            self._conn.close()
+
+
+def is_sealed(path):
+    """
+    True for a shard file followed by a later shard: it is full and never
+    written again (compaction writes new files), so it can be hard-linked.
+    """
+    match = _SHARD_RE.match(os.path.basename(path))
+    if match is None:
+        return False
+    generation, shard, kind = match.groups()
+    following = f"shard-{generation}-{int(shard) + 1:05d}.{kind}"
+    return os.path.exists(os.path.join(os.path.dirname(path), following))
+
+
+def copy_collection(source, target, page_size=1000):
+    """
+    Copies every chunk with its stored embedding (nothing is re-embedded).
+    Returns the number of chunks copied.
+    """
+    copied = 0
+    while True:
+        page = source.get(include=["documents", "embeddings", "metadatas"], limit=page_size, offset=copied)
+        if not page["ids"]:
+            return copied
+        target.upsert(documents=page["documents"], embeddings=page["embeddings"],
+                      metadatas=page["metadatas"], ids=page["ids"])
+        copied += len(page["ids"])
+
+
+# --- Comparison against Chroma ----------------------------------------------
+
+def _hnsw_bytes(folder):
+    # Chroma's HNSW segment files, which are loaded into memory on open
+    total = 0
+    for root, _, files in os.walk(folder):
+        for name in files:
+            if name in ("data_level0.bin", "link_lists.bin", "header.bin", "length.bin"):
+                total += os.path.getsize(os.path.join(root, name))
+    return total
+
+
+def compare_backends(queries=200, k=5, folder=None, quantization=SHARD_QUANTIZATION, seed=7):
+    """
+    Copies the Chroma index into a shard store and compares memory footprint,
+    recall@k against exact float32 search and per-query latency.
+    """
+    from backend import vector_store
+    from backend.llm_loadtest import percentile
+    from backend.partitions import PartitionedCollection
+    from config import DB_FOLDER, SECURITY_LEVELS
+
+    chroma = vector_store.open_chroma()
+    folder = folder or tempfile.mkdtemp(prefix="audit-shards-")
+    shards = PartitionedCollection({level: ShardCollection(os.path.join(folder, level), quantization=quantization)
+                                    for level in SECURITY_LEVELS})
+    started = time.perf_counter()
+    chunks = copy_collection(chroma, shards)
+    copy_seconds = time.perf_counter() - started
+    if not chunks:
+        raise ValueError("The Chroma index is empty; upload documents first")
+
+    everything = chroma.get(include=["documents", "embeddings"])
+    matrix = np.asarray(everything["embeddings"], dtype=np.float32)
+    rng = np.random.default_rng(seed)
+    # Questions: the opening words of random chunks
+    picks = rng.choice(len(everything["ids"]), size=min(queries, len(everything["ids"])), replace=False)
+    questions = [" ".join(everything["documents"][i].split()[:12]) for i in picks]
+    query_vectors = np.asarray(vector_store.embed(questions), dtype=np.float32)
+    exact = [set(np.asarray(everything["ids"])[np.argsort(((matrix - q) ** 2).sum(axis=1))[:k]])
+             for q in query_vectors]
+
+    report = {"chunks": chunks, "queries": len(questions), "k": k, "copy_seconds": round(copy_seconds, 2)}
+    for name, collection in (("chroma", chroma), ("shards", shards)):
+        timings, found = [], 0
+        for q, truth in zip(query_vectors, exact):
+            t = time.perf_counter()
+            hits = collection.query(query_embeddings=[q], n_results=k)
+            timings.append((time.perf_counter() - t) * 1000)
+            found += len(truth & set(hits["ids"][0]))
+        report[name] = {
+            "recall_at_k": round(found / (k * len(questions)), 4),
+            "latency_p50_ms": round(percentile(timings, 50), 2),
+            "latency_p95_ms": round(percentile(timings, 95), 2),
+        }
+    report["chroma"]["hnsw_bytes"] = _hnsw_bytes(DB_FOLDER)
+    report["chroma"]["float32_vector_bytes"] = chunks * matrix.shape[1] * 4
+    for key in ("scan_bytes", "rescore_bytes"):
+        report["shards"][key] = sum(p.footprint()[key] for p in shards.partitions.values())
+    report["shards"]["quantization"] = quantization
+    report["shards"]["folder"] = folder
+    shards.close()
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare the shard store with the Chroma index.")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--quantization", choices=QUANTIZATIONS, default=SHARD_QUANTIZATION)
+    parser.add_argument("--folder", help="Where to build the shard copy (default: a new temp dir)")
+    args = parser.parse_args(argv)
+    try:
+        report = compare_backends(args.queries, args.k, args.folder, args.quantization)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        sys.exit(1)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+# backend/snapshots.py
+"""
+Point-in-time copies of DB_FOLDER (vector store, lexical index, manifest).
+
+    python -m backend.snapshots create --label before-reclassify
+    python -m backend.snapshots list
+    python -m backend.snapshots restore 20261018-142501-before-reclassify
+
+Both operations keep the stores closed while files are copied, so searches
+and uploads wait for a few seconds instead of seeing a half-written index.
+Sealed shard files (AUDIT_VECTOR_BACKEND=shards) are hard-linked rather than
+copied. A remote Chroma server (CHROMA_HOST) has to be backed up on its own,
+and so do DATA_FOLDER (saved uploads) and the audit log: neither is part of
+a snapshot.
+"""
+import argparse
+import json
+import os
+import re
+import shutil
+import sys
+from datetime import datetime
+from config import CHROMA_HOST, DB_FOLDER, SNAPSHOT_FOLDER, SNAPSHOT_KEEP, VECTOR_BACKEND
+from backend import lexical_index, manifest, vector_store
+from backend.audit_log import flush_logs, log_action
+from backend.shard_store import is_sealed
+
+_LABEL_RE = re.compile(r"[^A-Za-z0-9_-]+")
+
+
+def _copy_file(src, dst):
+    if is_sealed(src):
+        try:
+            os.link(src, dst)
+            return dst
+        except OSError:
+            pass  # e.g. another filesystem: fall back to a copy
+    return shutil.copy2(src, dst)
+
+
+def _check_embedded():
+    if CHROMA_HOST and VECTOR_BACKEND == "chroma":
+        raise ValueError("Snapshots cover the embedded store only; back up the Chroma server instead")
+
+
+def _path(name):
+    path = os.path.join(SNAPSHOT_FOLDER, os.path.basename(name))
+    if not os.path.isfile(os.path.join(path, "snapshot.json")):
+        raise ValueError(f"Unknown snapshot {name!r}")
+    return path
+
+
+def _folder_bytes(folder):
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, files in os.walk(folder) for name in files)
+
+
+def create_snapshot(label=None):
+    """
+    Copies DB_FOLDER into SNAPSHOT_FOLDER/<timestamp>[-label], prunes the
+    oldest beyond SNAPSHOT_KEEP and returns the snapshot's info dict.
+    """
+    _check_embedded()
+    name = datetime.now().strftime("%Y%m%d-%H%M%S")
+    if label:
+        name += "-" + _LABEL_RE.sub("-", label).strip("-")[:40]
+    path = os.path.join(SNAPSHOT_FOLDER, name)
+    if os.path.exists(path):
+        raise ValueError(f"Snapshot {name!r} already exists")
+
+    with vector_store.closed(), lexical_index.closed():
+        documents = manifest.list_files()
+        if os.path.exists(DB_FOLDER):
+            shutil.copytree(DB_FOLDER, os.path.join(path, "index"), copy_function=_copy_file)
+        else:
+            os.makedirs(os.path.join(path, "index"))
+
+    info = {
+        "name": name,
+        "created": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "backend": VECTOR_BACKEND,
+        "documents": len(documents),
+        "chunks": sum(d["chunk_count"] for d in documents),
+        "bytes": _folder_bytes(os.path.join(path, "index")),
+    }
+    with open(os.path.join(path, "snapshot.json"), "w", encoding="utf-8") as f:
+        json.dump(info, f, indent=2)
+    log_action("System", "Admin", "Snapshot", name, "Success")
+
+    for old in list_snapshots()[SNAPSHOT_KEEP:]:
+        delete_snapshot(old["name"])
+    return info
+
+
+def list_snapshots():
+    """
+    Returns the info dicts of all snapshots, newest first.
+    """
+    if not os.path.isdir(SNAPSHOT_FOLDER):
+        return []
+    snapshots = []
+    for name in os.listdir(SNAPSHOT_FOLDER):
+        try:
+            with open(os.path.join(SNAPSHOT_FOLDER, name, "snapshot.json"), encoding="utf-8") as f:
+                snapshots.append(json.load(f))
+        except (OSError, ValueError):
+            continue  # not a snapshot, or one still being written
+    return sorted(snapshots, key=lambda s: s["name"], reverse=True)
+
+
+def delete_snapshot(name):
+    shutil.rmtree(_path(name))
+
+
+def restore_snapshot(name):
+    """
+    Replaces DB_FOLDER with the snapshot. The copy is staged next to
+    DB_FOLDER and swapped in with renames, so an interrupted restore leaves
+    the current index in place. DATA_FOLDER is left as it is.
+    """
+    _check_embedded()
+    source = os.path.join(_path(name), "index")
+    staging = DB_FOLDER + ".restoring"
+    replaced = DB_FOLDER + ".replaced"
+    with vector_store.closed(), lexical_index.closed():
+        for leftover in (staging, replaced):
+            if os.path.exists(leftover):
+                shutil.rmtree(leftover)
+        shutil.copytree(source, staging, copy_function=_copy_file)
+        if os.path.exists(DB_FOLDER):
+            os.replace(DB_FOLDER, replaced)
+        os.replace(staging, DB_FOLDER)
+        shutil.rmtree(replaced, ignore_errors=True)
+    log_action("System", "Admin", "Restore Snapshot", name, "Success")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Create, list and restore index snapshots.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    create = commands.add_parser("create")
+    create.add_argument("--label")
+    commands.add_parser("list")
+    restore = commands.add_parser("restore")
+    restore.add_argument("name")
+    args = parser.parse_args(argv)
+
+    try:
+        if args.command == "create":
+            print(json.dumps(create_snapshot(args.label), indent=2))
+        elif args.command == "list":
+            for info in list_snapshots():
+                print(f"{info['name']}  {info['documents']} documents  {info['chunks']} chunks  "
+                      f"{info['bytes'] / 1e6:.1f} MB")
+        else:
+            restore_snapshot(args.name)
+            print(f"Restored {args.name}")
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        sys.exit(1)
+    finally:
+        flush_logs()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+# backend/vector_store.py
+import os
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import urlparse
+from config import CHROMA_HOST, DB_FOLDER, SECURITY_LEVELS, SHARD_FOLDER, VECTOR_BACKEND
+from backend import metrics
+from backend.partitions import PartitionedCollection, migrate_legacy, partition_name
+
+# Pre-partitioning single collection; its chunks are migrated on first open
+COLLECTION_NAME = "secure_audit_docs"
+
+# One client per process, shared by every Streamlit session
+_client = None
+_collection = None
+_embedding_function = None
+_lock = threading.Lock()
+
+_stats = {
+    "opens": 0,
+    "hits": 0,
+    "invalidations": 0,
+    "open_ms": 0.0,
+    "migrated": 0,
+    "last_error": None,
+}
+# Bumped whenever indexed content changes; caches compare against it
+_generation = 0
+
+
+def get_collection():
+    """
+    Returns the shared PartitionedCollection (one Chroma collection or
+    shard store per security level, see VECTOR_BACKEND), opening it on
+    first use.
+    """
+    global _client, _collection
+
+    # Fast path: no locking once the collection is open
+    collection = _collection
+    if collection is not None:
+        _stats["hits"] += 1
+        return collection
+
+    with _lock:
+        if _collection is None:
+            start = time.perf_counter()
+            try:
+                if VECTOR_BACKEND == "shards":
+                    client = None
+                    collection = open_shards()
+                    migrated = _import_chroma(collection)
+                elif VECTOR_BACKEND == "chroma":
+                    client = _open_client()
+                    collection = _chroma_partitions(client)
+                    migrated = migrate_legacy(client, COLLECTION_NAME, collection)
+                else:
+                    raise ValueError(f"Unknown VECTOR_BACKEND {VECTOR_BACKEND!r}")
+            except Exception as e:
+                _stats["last_error"] = str(e)
+                raise
+            _client, _collection = client, collection
+            if migrated:
+                _stats["migrated"] += migrated
+                mark_changed()
+            _stats["opens"] += 1
+            _stats["open_ms"] = (time.perf_counter() - start) * 1000
+            _stats["last_error"] = None
+        else:
+            _stats["hits"] += 1
+        return _collection
+
+
+def _open_client():
+    # chromadb takes ~1s to import; deferred so pages that never search don't pay it
+    import chromadb
+    if CHROMA_HOST:
+        # Shared Chroma server: lets several API workers/hosts use one index
+        url = urlparse(CHROMA_HOST)
+        return chromadb.HttpClient(host=url.hostname, port=url.port or 8000, ssl=url.scheme == "https")
+    return chromadb.PersistentClient(path=DB_FOLDER)
+
+
+def _chroma_partitions(client):
+    return PartitionedCollection({
+        level: client.get_or_create_collection(
+            name=partition_name(COLLECTION_NAME, level),
+            embedding_function=get_embedding_function()
+        )
+        for level in SECURITY_LEVELS
+    })
+
+
+def open_chroma():
+    """
+    Opens the Chroma partitions on a separate client, whatever the backend
+    (used to copy or compare against the shard store).
+    """
+    return _chroma_partitions(_open_client())
+
+
+def open_shards(folder=SHARD_FOLDER):
+    from backend.shard_store import ShardCollection
+    return PartitionedCollection({
+        level: ShardCollection(os.path.join(folder, partition_name(COLLECTION_NAME, level)))
+        for level in SECURITY_LEVELS
+    })
+
+
+def _import_chroma(collection):
+    # First open of an empty shard store next to an embedded Chroma index: copy it once
+    if collection.count() or CHROMA_HOST or not os.path.exists(os.path.join(DB_FOLDER, "chroma.sqlite3")):
+        return 0
+    from backend.shard_store import copy_collection
+    client = _open_client()
+    try:
+        return copy_collection(_chroma_partitions(client), collection)
+    finally:
+        client.clear_system_cache()
+
+
+def get_embedding_function():
+    """
+    Returns the embedding function shared by ingestion and retrieval.
+    """
+    global _embedding_function
+    if _embedding_function is None:
+        from backend.embeddings import CachedEmbeddingFunction
+        _embedding_function = CachedEmbeddingFunction()
+    return _embedding_function
+
+
+def embed(texts):
+    # Batched, cached embeddings (see backend/embeddings.py)
+    start = time.perf_counter()
+    vectors = get_embedding_function()(texts)
+    record_latency("embed", (time.perf_counter() - start) * 1000)
+    return vectors
+
+
+def invalidate():
+    """
+    Drops the cached client so the next call re-opens DB_FOLDER.
+    Must be called before the storage folder is deleted or replaced.
+    """
+    with _lock:
+        _close()
+    mark_changed()
+
+
+def _close():
+    global _client, _collection
+    if _client is not None:
+        try:
+            # Chroma keeps one system per path; release it so the files are closed
+            _client.clear_system_cache()
+        except Exception:
+            pass
+    if _collection is not None:
+        _collection.close()
+    _client = None
+    _collection = None
+    _stats["invalidations"] += 1
+
+
+@contextmanager
+def closed():
+    """
+    Closes the store and keeps it closed for the duration: get_collection()
+    waits, so DB_FOLDER can be copied, replaced or removed safely.
+    """
+    try:
+        with _lock:
+            _close()
+            yield
+    finally:
+        mark_changed()
+
+
+def mark_changed():
+    global _generation
+    _generation += 1
+
+
+def get_generation():
+    return _generation
+
+
+def record_latency(operation, elapsed_ms):
+    # Kept for callers outside the request path; lands in the shared registry
+    metrics.observe(operation, elapsed_ms)
+
+
+def get_health():
+    """
+    Returns client status plus per-stage latency summaries.
+    """
+    health = dict(_stats)
+    health["backend"] = VECTOR_BACKEND
+    health["open"] = _collection is not None
+    from backend import embeddings
+    health["embeddings"] = embeddings.get_stats()
+    health["latency"] = metrics.registry.summary()
+    if _collection is not None:
+        try:
+            if _client is not None:
+                start = time.perf_counter()
+                _client.heartbeat()
+                health["heartbeat_ms"] = (time.perf_counter() - start) * 1000
+            else:
+                health["shards"] = {level: p.footprint() for level, p in _collection.partitions.items()}
+            health["partitions"] = _collection.counts()
+            health["documents"] = sum(health["partitions"].values())
+        except Exception as e:
+            health["last_error"] = str(e)
+    return health
@@ -5,12 +5,67 @@ WORKING_DIR = os.getcwd()
 DATA_FOLDER = os.path.join(WORKING_DIR, "data")
 DB_FOLDER = os.path.join(WORKING_DIR, "audit_db_storage")
 
-# Create folders if they don't exist
-if not os.path.exists(DATA_FOLDER):
-    os.makedirs(DATA_FOLDER)
-
 # Model Settings
 EMBEDDING_MODEL_NAME = "all-MiniLM-L6-v2"  # Local default for ChromaDB
+EMBEDDING_DIM = 384
+EMBEDDING_BATCH_SIZE = 64                  # Texts per ONNX inference call
+EMBEDDING_THREADS = max(1, min(4, (os.cpu_count() or 1)))
+EMBEDDING_CACHE_FOLDER = os.path.join(WORKING_DIR, "embedding_cache")
 LLM_MODEL = "llama3.2"                     # Ollama Model
-CHUNK_SIZE = 3000
-CHUNK_OVERLAP = 500
\ No newline at end of file
+LLM_NUM_CTX = 4096                         # Ollama context window (num_ctx)
+OLLAMA_HOST = os.environ.get("OLLAMA_HOST", "http://127.0.0.1:11434")
+CHROMA_HOST = os.environ.get("CHROMA_HOST")  # e.g. http://chroma:8000; unset = embedded store in DB_FOLDER
+LLM_MAX_CONCURRENT = 2                     # Requests sent to Ollama at once (match OLLAMA_NUM_PARALLEL)
+LLM_MAX_QUEUED_PER_USER = 3                # Further requests from one user are rejected
+LLM_QUEUE_TIMEOUT = 60                     # Seconds a request may wait for a worker
+LLM_REQUEST_TIMEOUT = 180                  # Seconds a generation may run once started
+PROMPT_CONTEXT_TOKENS = 1500               # Budget for retrieved snippets in the prompt
+PROMPT_MIN_SNIPPET_TOKENS = 48             # Skip a trimmed snippet shorter than this
+CHUNK_TOKENS = 240           # MiniLM window is 256 incl. [CLS]/[SEP]
+CHUNK_OVERLAP_TOKENS = 32    # Trailing sentences repeated in the next chunk
+
+# Ingestion Settings
+INGEST_WORKERS = max(1, min(4, (os.cpu_count() or 1)))  # PDF page-extraction processes
+INGEST_BATCH_SIZE = 64       # Chunks per collection.add call
+PAGES_PER_TASK = 16          # PDF pages extracted per worker task
+
+# Retrieval Settings
+SECURITY_LEVELS = ["low", "medium", "high"]  # One vector partition per level, lowest first
+RETRIEVAL_TOP_K = 5          # Snippets passed to the prompt builder
+RETRIEVAL_CANDIDATES = 12    # Unfiltered hits fetched before RBAC partitioning
+HYBRID_SEARCH = True         # Fuse BM25 (lexical_index) with vector hits
+LEXICAL_MAX_DF = 0.5         # BM25 query terms found in more than this share of chunks are dropped
+RRF_K = 60                   # Reciprocal-rank fusion constant
+
+# Vector Store Settings
+VECTOR_BACKEND = os.environ.get("AUDIT_VECTOR_BACKEND", "chroma")  # "chroma" or "shards" (backend/shard_store.py)
+SHARD_FOLDER = os.path.join(DB_FOLDER, "shards")
+SHARD_QUANTIZATION = "int8"  # or "float16"; fixed when a shard store is created
+SHARD_ROWS = 8192            # Vectors per memory-mapped shard file
+SHARD_RERANK_FACTOR = 4      # Approximate candidates per result re-scored in float32
+
+# Snapshot Settings
+SNAPSHOT_FOLDER = os.path.join(WORKING_DIR, "snapshots")  # Outside DB_FOLDER, so resets keep them
+SNAPSHOT_KEEP = 10           # Oldest snapshots beyond this are pruned
+
+# Answer Cache Settings
+ANSWER_CACHE_SIZE = 256          # Cached answers kept (LRU)
+ANSWER_CACHE_TTL = 3600          # Seconds before a cached answer expires
+ANSWER_CACHE_SIMILARITY = 0.95   # Cosine similarity for near-duplicate questions
+
+# Audit Log Settings
+LOG_FLUSH_SIZE = 200         # Entries per background insert
+LOG_FLUSH_INTERVAL = 1.0     # Max seconds an entry waits in the queue
+LOG_FLUSH_TIMEOUT = 5.0      # Max seconds a log read waits for queued entries
+
+# Batch Questionnaire Settings
+BATCH_MAX_QUESTIONS = 500    # Rows accepted per questionnaire
+BATCH_QUERY_SIZE = 64        # Questions per vectorized ANN query
+BATCH_GROUP_SIZE = 4         # Questions with the same retrieved chunks answered in one prompt
+
+# Query Service Settings
+API_PORT = 8000              # backend/api.py listen port
+API_WORKERS = 2              # uvicorn worker processes (needs CHROMA_HOST when > 1)
+API_TOKEN = os.environ.get("AUDIT_API_TOKEN")  # Bearer token required by every API call
+API_INSECURE = os.environ.get("AUDIT_API_INSECURE") == "1"  # Serve without a token (localhost only, for testing)
+API_URL = os.environ.get("AUDIT_API_URL")      # Dashboard uses the API instead of in-process calls when set
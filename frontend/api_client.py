@@ -0,0 +1,202 @@
+# frontend/api_client.py
+import json
+from urllib.parse import quote
+from config import API_URL, API_TOKEN, LLM_REQUEST_TIMEOUT
+
+# One keep-alive connection pool per Streamlit process
+_client = None
+
+
+def _get_client():
+    global _client
+    if _client is None:
+        import httpx
+        headers = {"Authorization": f"Bearer {API_TOKEN}"} if API_TOKEN else {}
+        _client = httpx.Client(base_url=API_URL, headers=headers,
+                               timeout=httpx.Timeout(LLM_REQUEST_TIMEOUT, connect=10.0))
+    return _client
+
+
+class APIError(ValueError):
+    """
+    An admin call that failed; the message is the "Error: ..." text. A
+    ValueError, like the in-process snapshot errors the dashboard shows.
+    """
+
+
+def _identity(username, role):
+    return {"X-User": username, "X-Role": role}
+
+
+def _error_text(error):
+    # "Error: ..." like the in-process answers, with the API's detail when it sent one
+    import httpx
+    if isinstance(error, httpx.HTTPStatusError):
+        try:
+            detail = error.response.json()["detail"]
+        except (ValueError, KeyError, TypeError):
+            detail = error.response.reason_phrase
+        return f"Error: API returned {error.response.status_code}: {detail}"
+    return f"Error: {type(error).__name__}: {error}"
+
+
+def upload_file(uploaded_file, security_level, username, role):
+    import httpx
+    try:
+        response = _get_client().post("/documents", params={"filename": uploaded_file.name, "security": security_level},
+                                      content=uploaded_file.getvalue(), headers=_identity(username, role))
+    except httpx.HTTPError:
+        return False
+    return response.status_code == 200
+
+
+def _send(method, path, username, role, missing=False, **kwargs):
+    """
+    Sends one request and returns the JSON body. Connection errors and error
+    statuses raise APIError with the "Error: ..." text; with missing=True a
+    404 returns None instead.
+    """
+    import httpx
+    try:
+        response = _get_client().request(method, path, headers=_identity(username, role), **kwargs)
+        if missing and response.status_code == 404:
+            return None
+        response.raise_for_status()
+    except httpx.HTTPError as e:
+        raise APIError(_error_text(e)) from e
+    return response.json()
+
+
+def get_health():
+    import httpx
+    try:
+        response = _get_client().get("/health")
+        response.raise_for_status()
+    except httpx.HTTPError as e:
+        raise APIError(_error_text(e)) from e
+    return response.json()
+
+
+def list_documents(username, role):
+    return _send("GET", "/documents", username, role)["documents"]
+
+
+def delete_document(source, username, role):
+    result = _send("DELETE", f"/documents/{quote(source, safe='')}", username, role, missing=True)
+    return result["deleted"] if result else 0
+
+
+def reclassify_document(source, security_level, username, role):
+    result = _send("PATCH", f"/documents/{quote(source, safe='')}", username, role, missing=True,
+                   params={"security": security_level})
+    return result["chunks"] if result else None
+
+
+def list_snapshots(username, role):
+    return _send("GET", "/snapshots", username, role)["snapshots"]
+
+
+def create_snapshot(label, username, role):
+    return _send("POST", "/snapshots", username, role, params={"label": label} if label else {})
+
+
+def restore_snapshot(name, username, role):
+    _send("POST", f"/snapshots/{quote(name, safe='')}/restore", username, role)
+
+
+def reset_database(username, role):
+    _send("POST", "/reset", username, role)
+
+
+def _iter_events(response):
+    # Minimal server-sent events reader: yields (event, data) pairs
+    event = None
+    try:
+        for line in response.iter_lines():
+            if line.startswith("event: "):
+                event = line[len("event: "):]
+            elif line.startswith("data: "):
+                yield event, json.loads(line[len("data: "):])
+    finally:
+        response.close()
+
+
+def _stream(path, payload, username, role):
+    client = _get_client()
+    response = client.send(client.build_request("POST", path, json=payload, headers=_identity(username, role)),
+                           stream=True)
+    if response.is_error:
+        response.read()
+        response.raise_for_status()
+    return _iter_events(response)
+
+
+def stream_questionnaire(questions, username, role):
+    """
+    Runs [(id, question)] through /batch and yields report items as they
+    complete. If the request fails, the questions not yet answered are
+    yielded as "error" items carrying the message.
+    """
+    import httpx
+    payload = {"ids": [item_id for item_id, _ in questions], "questions": [q for _, q in questions]}
+    answered = set()
+    try:
+        for event, data in _stream("/batch", payload, username, role):
+            if event == "item":
+                answered.add(data["id"])
+                yield data
+    except httpx.HTTPError as e:
+        message = _error_text(e)
+        for item_id, question in questions:
+            if item_id not in answered:
+                yield {"id": item_id, "question": question, "status": "error", "answer": message,
+                       "cached": False, "group_size": 0, "total_ms": 0.0}
+
+
+class RemoteAnswer:
+    """
+    Reads the /answer event stream. The status is available as soon as the
+    object is created; iterating yields answer text, after which sources,
+    metrics and cached are filled from the "done" event. A failed request
+    gives status "error" with the "Error: ..." text in error; a failure
+    mid-stream is yielded as text and recorded in metrics["error"].
+    """
+
+    def __init__(self, question, username, role):
+        import httpx
+        self._events = iter(())
+        self.sources = []
+        self.metrics = {}
+        self.cached = False
+        self.error = None
+        try:
+            self._events = _stream("/answer", {"question": question}, username, role)
+            event, data = next(self._events)
+        except (httpx.HTTPError, StopIteration) as e:
+            self.status = "error"
+            self.error = _error_text(e) if isinstance(e, httpx.HTTPError) else "Error: empty response from the API"
+            return
+        self.status = data["status"] if event == "status" else "error"
+        if self.status == "error":
+            self.error = data.get("message", "Error: unexpected response from the API")
+
+    def close(self):
+        if hasattr(self._events, "close"):
+            self._events.close()
+
+    def __iter__(self):
+        import httpx
+        try:
+            for event, data in self._events:
+                if event == "token":
+                    yield data["text"]
+                elif event == "error":
+                    self.metrics["error"] = data["message"]
+                    yield data["message"]
+                elif event == "done":
+                    self.sources = data["sources"]
+                    self.metrics = data["metrics"]
+                    self.cached = data["cached"]
+        except httpx.HTTPError as e:
+            self.metrics["error"] = _error_text(e)
+            yield self.metrics["error"]
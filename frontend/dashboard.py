@@ -1,10 +1,223 @@
 # frontend/dashboard.py
+import time
 import streamlit as st
 from frontend.styles import load_css
-from backend.database import process_file_upload, query_documents, reset_database
-from backend.llm import generate_rag_response
-from backend.audit_log import get_audit_logs
+from backend.database import (process_file_upload, query_documents, reset_database, get_allowed_levels,
+                              list_documents, delete_document, reclassify_document)
+from backend.answer_cache import lookup_answer, store_answer, get_stats as get_answer_cache_stats
+from backend.llm import generate_rag_response, stream_text, format_metrics, format_sources
+from backend.audit_log import (get_audit_logs, count_audit_logs, get_latest_log_id, get_log_filter_values,
+                               get_log_stats, get_status_summary)
+from backend.vector_store import get_health
+from backend.metrics import registry as metrics_registry
+from backend.warmup import get_warmup_status
+from backend.questionnaire import parse_questions, report_csv, run_questionnaire, summarize
+from backend.snapshots import create_snapshot, list_snapshots, restore_snapshot
 from frontend.graph_viz import render_rbac_graph
+from frontend import api_client
+from config import API_URL, SECURITY_LEVELS
+
+LOG_PAGE_SIZE = 100
+LEVEL_LABELS = {"low": "🟢 Public", "medium": "🟡 Internal", "high": "🔴 Secret"}
+VIEWS = ["💬 Chat Assistant", "🕸️ RBAC Graph", "📜 Audit Logs", "📈 Performance", "🗂️ Questionnaire"]
+
+def status_message(status):
+    if status == "denied":
+        return f"⛔ **ACCESS BLOCKED:** Documents exist, but they are classified above your level (**{st.session_state['user_role']}**)."
+    return "I searched the documents but found no relevant information."
+
+def render_sources(sources):
+    source_block = format_sources(sources)
+    if source_block:
+        st.markdown(source_block)
+    return source_block
+
+def render_remote_answer(prompt, metrics):
+    answer = api_client.RemoteAnswer(prompt, st.session_state['username'], st.session_state['user_role'])
+    if answer.status != "success":
+        answer.close()
+        full_response = answer.error if answer.status == "error" else status_message(answer.status)
+        st.write(full_response)
+        return full_response
+    full_response = st.write_stream(answer)
+    full_response += render_sources(answer.sources)
+    metrics.update(answer.metrics)
+    if metrics:
+        st.caption(format_metrics(metrics))
+    return full_response
+
+def color_status(val):
+    color = '#ffcdd2' if 'DENIED' in str(val) else '#c8e6c9'
+    return f'background-color: {color}'
+
+def render_log_summary(start_date, end_date):
+    summary = get_status_summary(start_date, end_date)
+    if summary.empty:
+        return
+    denied = summary[summary["Status"].str.contains("DENIED")]
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Entries", int(summary["Count"].sum()))
+    col2.metric("Denied", int(denied["Count"].sum()))
+    col3.metric("Users with denials", denied["User"].nunique())
+    if not denied.empty:
+        st.caption("Denied searches per user and day")
+        st.bar_chart(denied.pivot_table(index="Day", columns="User", values="Count", aggfunc="sum", fill_value=0))
+
+def render_audit_logs():
+    """
+    Log view cached per session: pages are read from a snapshot (max_id)
+    and reused across reruns; only rows written since then are counted
+    on each visit, and pages are re-read only when some of them match.
+    """
+    st.markdown("### System Activity Log")
+    log_stats = get_log_stats()
+    if log_stats["failing"]:
+        st.warning(f"⚠️ {log_stats['pending']} entries are not written yet: {log_stats['last_error']}")
+    users, statuses = get_log_filter_values()
+    col1, col2, col3 = st.columns(3)
+    user_filter = col1.selectbox("User", ["All"] + users)
+    status_filter = col2.selectbox("Status", ["All"] + statuses)
+    date_range = col3.date_input("Date range", value=())
+    filters = {
+        "user": None if user_filter == "All" else user_filter,
+        "status": None if status_filter == "All" else status_filter,
+        "start_date": date_range[0] if len(date_range) > 0 else None,
+        "end_date": date_range[1] if len(date_range) > 1 else None,
+    }
+
+    with st.expander("📊 Summary", expanded=True):
+        render_log_summary(filters["start_date"], filters["end_date"])
+
+    key = tuple(filters.values())
+    cache = st.session_state.get("log_view")
+    latest = get_latest_log_id()
+    if cache is None or cache["key"] != key:
+        cache = {"key": key, "max_id": latest, "total": count_audit_logs(**filters, max_id=latest), "pages": {}}
+        st.session_state["log_view"] = cache
+    elif latest > cache["max_id"]:
+        # Tail: only rows written since the last read are counted
+        new = count_audit_logs(**filters, after_id=cache["max_id"], max_id=latest)
+        cache["max_id"] = latest
+        if new:
+            cache["total"] += new
+            cache["pages"].clear()
+
+    total = cache["total"]
+    pages = max(1, -(-total // LOG_PAGE_SIZE))
+    page = st.number_input(f"Page (of {pages})", min_value=1, max_value=pages, value=1)
+    if page not in cache["pages"]:
+        logs = get_audit_logs(**filters, limit=LOG_PAGE_SIZE, offset=(page - 1) * LOG_PAGE_SIZE,
+                              max_id=cache["max_id"])
+        cache["pages"][page] = None if logs.empty else logs.style.map(color_status, subset=['Status'])
+    styled = cache["pages"][page]
+    if styled is not None:
+        st.dataframe(styled, use_container_width=True)
+        st.caption(f"{total} matching entries")
+    else:
+        st.info("No activity recorded yet.")
+
+def render_questionnaire():
+    """
+    Answers a CSV of questions in one run; items appear as they complete
+    and the finished report is kept in the session for download.
+    """
+    st.markdown("### Batch Questionnaire")
+    st.caption("CSV with a `question` column (and optionally `id`), or one question per line.")
+    uploaded = st.file_uploader("Questionnaire CSV", type=["csv", "txt"], key="questionnaire_file")
+    if uploaded and st.button("Run Questionnaire"):
+        try:
+            questions = parse_questions(uploaded.getvalue())
+        except ValueError as e:
+            st.error(str(e))
+            return
+        if not questions:
+            st.warning("No questions found in the file.")
+            return
+
+        username, role = st.session_state['username'], st.session_state['user_role']
+        if API_URL:
+            items_stream = api_client.stream_questionnaire(questions, username, role)
+        else:
+            items_stream = run_questionnaire(questions, role, username)
+        progress = st.progress(0.0)
+        table = st.empty()
+        items = []
+        for item in items_stream:
+            items.append(item)
+            progress.progress(len(items) / len(questions), text=f"{len(items)} of {len(questions)} answered")
+            table.dataframe([{k: item[k] for k in ("id", "status", "question", "answer")} for item in items],
+                            use_container_width=True)
+        st.session_state["questionnaire_report"] = {"csv": report_csv(items), "summary": summarize(items)}
+
+    report = st.session_state.get("questionnaire_report")
+    if report:
+        summary = report["summary"]
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Questions", summary["questions"])
+        col2.metric("LLM prompts", summary["prompts"])
+        col3.metric("Total", f"{summary['total_ms'] / 1000:.1f} s")
+        st.download_button("Download report (CSV)", report["csv"], file_name="questionnaire_report.csv",
+                           mime="text/csv")
+
+def render_document_admin():
+    """
+    Admin-only corrections: reclassify or delete one file in place, and
+    snapshot or restore the whole index.
+    """
+    username, role = st.session_state['username'], st.session_state['user_role']
+    # In thin-client mode API failures raise api_client.APIError (a ValueError)
+    for render in (render_document_actions, render_snapshot_actions):
+        try:
+            render(username, role)
+        except ValueError as e:
+            st.error(str(e))
+
+def render_document_actions(username, role):
+    documents = api_client.list_documents(username, role) if API_URL else list_documents()
+    if documents:
+        by_source = {d["source"]: d for d in documents}
+        source = st.selectbox("Document", list(by_source))
+        current = by_source[source]
+        st.caption(f"{current['chunk_count']} chunks, {LEVEL_LABELS.get(current['security'], current['security'])}")
+        new_level = st.selectbox("Reclassify to", SECURITY_LEVELS, index=SECURITY_LEVELS.index(current["security"]),
+                                 format_func=LEVEL_LABELS.get)
+        col1, col2 = st.columns(2)
+        if col1.button("Reclassify", disabled=new_level == current["security"]):
+            if API_URL:
+                chunks = api_client.reclassify_document(source, new_level, username, role)
+            else:
+                chunks = reclassify_document(source, new_level, username, role)
+            st.toast(f"{source}: {chunks} chunks moved to {new_level}")
+            st.rerun()
+        if col2.button("Delete"):
+            if API_URL:
+                chunks = api_client.delete_document(source, username, role)
+            else:
+                chunks = delete_document(source, username, role)
+            st.toast(f"{source}: {chunks} chunks deleted")
+            st.rerun()
+    else:
+        st.caption("No documents indexed yet.")
+
+def render_snapshot_actions(username, role):
+    st.markdown("---")
+    label = st.text_input("Snapshot label", placeholder="optional")
+    if st.button("Create Snapshot"):
+        try:
+            info = api_client.create_snapshot(label, username, role) if API_URL else create_snapshot(label)
+            st.toast(f"Snapshot {info['name']} created")
+        except ValueError as e:
+            st.error(str(e))
+    snapshots = api_client.list_snapshots(username, role) if API_URL else list_snapshots()
+    if snapshots:
+        name = st.selectbox("Snapshot", [s["name"] for s in snapshots])
+        if st.button("Restore Snapshot"):
+            if API_URL:
+                api_client.restore_snapshot(name, username, role)
+            else:
+                restore_snapshot(name)
+            st.cache_resource.clear()
+            st.toast(f"Restored {name}")
 
 def render_dashboard():
     load_css()
@@ -18,20 +231,40 @@ def render_dashboard():
         with st.expander("📂 **Upload Documents**", expanded=True):
             uploaded_file = st.file_uploader("Select PDF/TXT", type=["pdf", "txt"], label_visibility="collapsed")
             security_level = st.selectbox("Security Level", ["low", "medium", "high"], 
-                                          format_func=lambda x: {"low": "🟢 Public", "medium": "🟡 Internal", "high": "🔴 Secret"}[x])
+                                          format_func=LEVEL_LABELS.get)
             
             if uploaded_file:
                 if st.button("Encrypt & Upload"):
                     with st.spinner("Processing..."):
-                        if process_file_upload(uploaded_file, security_level):
+                        if API_URL:
+                            uploaded = api_client.upload_file(uploaded_file, security_level,
+                                                              st.session_state['username'], st.session_state['user_role'])
+                        else:
+                            uploaded = process_file_upload(uploaded_file, security_level)
+                        if uploaded:
                             st.success("Uploaded!")
 
+        if st.session_state['user_role'] == "Admin":
+            with st.expander("🗃️ **Documents & Snapshots**"):
+                render_document_admin()
+
         with st.expander("⚙️ **System**"):
             if st.button("Clear Database"):
-                reset_database()
-                st.cache_resource.clear()
-                st.toast("Database Cleared")
+                try:
+                    if API_URL:
+                        # The API server owns the store; wiping it from here would pull it from under it
+                        api_client.reset_database(st.session_state['username'], st.session_state['user_role'])
+                    else:
+                        reset_database()
+                    st.cache_resource.clear()
+                    st.toast("Database Cleared")
+                except api_client.APIError as e:
+                    st.error(str(e))
             
+            if st.checkbox("Show Index Health"):
+                st.json({**get_health(), "answer_cache": get_answer_cache_stats(), "audit_log": get_log_stats(),
+                         "warmup": get_warmup_status()})
+
             if st.button("Log Out"):
                 st.session_state['logged_in'] = False
                 st.session_state['messages'] = []
@@ -40,10 +273,11 @@ def render_dashboard():
     # --- MAIN CONTENT ---
     st.title("🛡️ Secure Audit AI")
     
-    tab1, tab2, tab3 = st.tabs(["💬 Chat Assistant", "🕸️ RBAC Graph", "📜 Audit Logs"])
+    # Only the selected view runs on a rerun (st.tabs would execute all of them)
+    view = st.radio("View", VIEWS, horizontal=True, key="view", label_visibility="collapsed")
 
-    # --- TAB 1: CHAT ---
-    with tab1:
+    # --- VIEW 1: CHAT ---
+    if view == VIEWS[0]:
         # 1. DISPLAY HISTORY (Always moves messages to top)
         if "messages" not in st.session_state:
             st.session_state.messages = [{"role": "assistant", "content": "Ready. Access limited by your role."}]
@@ -51,58 +285,84 @@ def render_dashboard():
         for msg in st.session_state.messages:
             with st.chat_message(msg["role"]):
                 st.write(msg["content"])
+                if msg.get("metrics"):
+                    st.caption(format_metrics(msg["metrics"]))
 
         # 2. HANDLE INPUT
         if prompt := st.chat_input("Type your audit query here..."):
             
-            # A. Add User Message to State
+            # A. Add User Message to State and show it right away
             st.session_state.messages.append({"role": "user", "content": prompt})
+            with st.chat_message("user"):
+                st.write(prompt)
             
-            # B. Generate Response (Logic only, no UI printing yet)
-            results, status = query_documents(prompt, st.session_state['user_role'], st.session_state['username'])
+            # B. Generate Response, streaming tokens into the bubble as they arrive
             full_response = ""
+            metrics = {}
             
-            if status == "success":
-                stream_or_error, sources = generate_rag_response(prompt, results)
-                # Handle stream vs string
-                if isinstance(stream_or_error, str):
-                    full_response = stream_or_error
+            with st.chat_message("assistant"):
+                if API_URL:
+                    # Thin-client mode: retrieval and generation run in backend/api.py
+                    full_response = render_remote_answer(prompt, metrics)
                 else:
-                    # Collect the stream into a single string
-                    for chunk in stream_or_error:
-                        if 'message' in chunk and 'content' in chunk['message']:
-                            full_response += chunk['message']['content']
-                    
-                    if sources:
-                        source_str = "  \n".join([f"- *{s}*" for s in sources])
-                        full_response += "\n\n**Sources:**\n" + source_str
-            
-            elif status == "denied":
-                full_response = f"⛔ **ACCESS BLOCKED:** Documents exist, but they are classified above your level (**{st.session_state['user_role']}**)."
-            
-            else:
-                full_response = "I searched the documents but found no relevant information."
+                    results, status = query_documents(prompt, st.session_state['user_role'], st.session_state['username'])
+                    if status == "success":
+                        allowed_levels = get_allowed_levels(st.session_state['user_role'])
+                        # Same clearance + same retrieved chunks + same question: skip the LLM
+                        cached = lookup_answer(prompt, allowed_levels, results)
+                        if cached is not None:
+                            full_response = cached
+                            st.write(full_response)
+                        else:
+                            started = time.perf_counter()
+                            stream_or_error, sources = generate_rag_response(prompt, results, prompt_stats=metrics,
+                                                                            user=st.session_state['username'])
+                            # Handle stream vs string
+                            if isinstance(stream_or_error, str):
+                                full_response = stream_or_error
+                                st.write(full_response)
+                            else:
+                                full_response = st.write_stream(stream_text(stream_or_error, started, metrics))
+                                full_response += render_sources(sources)
+                                st.caption(format_metrics(metrics))
+                                # A failed generation must not be served from the cache
+                                if not metrics.get('error'):
+                                    store_answer(prompt, allowed_levels, results, full_response)
+                    else:
+                        full_response = status_message(status)
+                        st.write(full_response)
 
             # C. Add Assistant Message to State
-            st.session_state.messages.append({"role": "assistant", "content": full_response})
+            st.session_state.messages.append({"role": "assistant", "content": full_response, "metrics": metrics})
 
             # D. THE FIX: Force Reload
             # This restarts the script, so the new messages are printed in Step 1 (above the input bar)
             st.rerun()
 
-    # --- TAB 2: GRAPH ---
-    with tab2:
+    # --- VIEW 2: GRAPH ---
+    elif view == VIEWS[1]:
         st.markdown("### Access Control Architecture")
         render_rbac_graph()
 
-    # --- TAB 3: LOGS ---
-    with tab3:
-        st.markdown("### System Activity Log")
-        logs = get_audit_logs()
-        if not logs.empty:
-            def color_status(val):
-                color = '#ffcdd2' if 'DENIED' in val else '#c8e6c9'
-                return f'background-color: {color}'
-            st.dataframe(logs.style.applymap(color_status, subset=['Status']), use_container_width=True)
+    # --- VIEW 3: LOGS ---
+    elif view == VIEWS[2]:
+        render_audit_logs()
+
+    # --- VIEW 4: PERFORMANCE ---
+    elif view == VIEWS[3]:
+        st.markdown("### Pipeline Latency")
+        summary = metrics_registry.summary()
+        if summary:
+            rows = [{"Stage": stage, **{k: round(v, 1) for k, v in stats.items()}} for stage, stats in summary.items()]
+            st.dataframe(rows, use_container_width=True)
+            col1, col2 = st.columns(2)
+            col1.download_button("Prometheus text", metrics_registry.to_prometheus(),
+                                 file_name="metrics.prom", mime="text/plain")
+            col2.download_button("JSON", metrics_registry.to_json(),
+                                 file_name="metrics.json", mime="application/json")
         else:
-            st.info("No activity recorded yet.")
\ No newline at end of file
+            st.info("No requests measured yet in this process.")
+
+    # --- VIEW 5: QUESTIONNAIRE ---
+    elif view == VIEWS[4]:
+        render_questionnaire()
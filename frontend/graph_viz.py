@@ -1,11 +1,11 @@
 # frontend/graph_viz.py
 import streamlit as st
-import graphviz
 
 def render_rbac_graph():
     """
     Visualizes the relationship between Roles and Data Classification.
     """
+    import graphviz
     graph = graphviz.Digraph()
     graph.attr(rankdir='LR') # Left to Right layout
 
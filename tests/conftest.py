@@ -0,0 +1,43 @@
+# tests/conftest.py
+import hashlib
+import os
+import sys
+import tempfile
+import numpy as np
+import pytest
+
+# config resolves data/, audit_db_storage/, ... from the working directory at
+# import time, so the whole session runs in a scratch directory
+os.chdir(tempfile.mkdtemp(prefix="audit-tests-"))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class HashEmbedder:
+    """
+    Stand-in for MiniLM: a normalised, hashed bag of words (384 dims), so
+    texts sharing words are near each other and no model download is needed.
+    """
+
+    def __call__(self, texts):
+        vectors = []
+        for text in texts:
+            vector = np.zeros(384, dtype=np.float32)
+            for word in text.lower().split():
+                vector[int(hashlib.md5(word.encode()).hexdigest(), 16) % 384] += 1
+            vectors.append(vector / (np.linalg.norm(vector) or 1))
+        return vectors
+
+
+@pytest.fixture
+def fake_embedder(monkeypatch):
+    from backend import embeddings
+    monkeypatch.setattr(embeddings, "_ThreadedMiniLM", lambda **kw: HashEmbedder())
+    monkeypatch.setattr(embeddings, "_model", None)
+
+
+@pytest.fixture
+def word_estimate(monkeypatch):
+    # Deterministic token counts without the downloaded MiniLM tokenizer
+    from backend import chunking
+    monkeypatch.setattr(chunking, "_tokenizer", None)
+    monkeypatch.setattr(chunking, "_tokenizer_loaded", True)
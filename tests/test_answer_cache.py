@@ -0,0 +1,46 @@
+# tests/test_answer_cache.py
+import pytest
+from backend import vector_store
+from backend.answer_cache import AnswerCache
+
+LEVELS = ["low", "medium"]
+RESULTS = {"ids": [["c1", "c2"]]}
+
+
+@pytest.fixture
+def cache(fake_embedder):
+    return AnswerCache(max_entries=2, ttl=3600, similarity=0.95)
+
+
+def test_same_clearance_and_chunks_hit(cache):
+    cache.store("Who approved change CR-7?", LEVELS, RESULTS, "The CAB.")
+    assert cache.lookup("who approved change cr-7", LEVELS, RESULTS) == "The CAB."
+    assert cache.lookup("Who approved change CR-7?", ["low"], RESULTS) is None
+    assert cache.lookup("Who approved change CR-7?", LEVELS, {"ids": [["c1"]]}) is None
+    assert cache.get_stats()["hits"] == 1
+
+
+def test_near_duplicate_question_hits(cache):
+    cache.store("Who approved change CR-7?", LEVELS, RESULTS, "The CAB.")
+    # Same words in another order embed identically under the hashed bag of words
+    assert cache.lookup("Change CR-7? Who approved", LEVELS, RESULTS) == "The CAB."
+    assert cache.lookup("Who tested backups?", LEVELS, RESULTS) is None
+    assert cache.get_stats()["semantic_hits"] == 1
+
+
+def test_index_change_invalidates(cache):
+    cache.store("Who approved change CR-7?", LEVELS, RESULTS, "The CAB.")
+    vector_store.mark_changed()
+    assert cache.lookup("Who approved change CR-7?", LEVELS, RESULTS) is None
+    assert cache.get_stats()["invalidations"] == 1
+    assert cache.get_stats()["entries"] == 0
+
+
+def test_lru_and_ttl(cache, monkeypatch):
+    for n in range(3):
+        cache.store(f"question {n}", LEVELS, RESULTS, f"answer {n}")
+    assert cache.lookup("question 0", LEVELS, RESULTS) is None
+    assert cache.get_stats()["evictions"] == 1
+
+    monkeypatch.setattr(cache, "ttl", -1)
+    assert cache.lookup("question 2", LEVELS, RESULTS) is None
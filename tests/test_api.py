@@ -0,0 +1,63 @@
+# tests/test_api.py
+from urllib.parse import quote
+import pytest
+from fastapi.testclient import TestClient
+import backend.api as api
+from backend.ingest import ingest_file
+
+ADMIN = {"X-User": "tester", "X-Role": "Admin", "Authorization": "Bearer test-token"}
+
+
+@pytest.fixture
+def client(fake_embedder, monkeypatch):
+    monkeypatch.setattr(api, "API_TOKEN", "test-token")
+    return TestClient(api.app)
+
+
+def test_requests_need_the_token(client, monkeypatch):
+    assert client.get("/documents", headers={**ADMIN, "Authorization": "Bearer wrong"}).status_code == 401
+    monkeypatch.setattr(api, "API_TOKEN", None)
+    assert client.get("/documents", headers=ADMIN).status_code == 503
+    monkeypatch.setattr(api, "API_INSECURE", True)
+    assert client.get("/documents", headers=ADMIN).status_code == 200
+
+
+def _failing_generation(*args, **kwargs):
+    def stream():
+        yield {"message": {"content": "Partial"}}
+        raise ConnectionError("reset by peer")
+    return stream(), ["api_fail.txt"]
+
+
+def test_failed_answer_is_reported_and_not_cached(client, monkeypatch):
+    client.post("/documents", params={"filename": "api_fail.txt", "security": "low"},
+                content=b"Control ZX-9 was tested without exceptions.", headers=ADMIN)
+    monkeypatch.setattr(api, "generate_rag_response", _failing_generation)
+    for _ in range(2):
+        body = client.post("/answer", json={"question": "ZX-9 tested"}, headers=ADMIN).text
+        assert "event: error" in body
+        assert '"cached": true' not in body
+
+
+def test_nested_sources_can_be_reclassified_and_deleted(client, word_estimate, tmp_path):
+    # Bulk-ingested sources are paths relative to the ingested folder
+    (tmp_path / "q3").mkdir()
+    path = tmp_path / "q3" / "controls.txt"
+    path.write_text("Nested bulk source about firewall rule reviews.", encoding="utf-8")
+    ingest_file(str(path), "q3/controls.txt", "low")
+
+    for url in ("/documents/q3/controls.txt", f"/documents/{quote('q3/controls.txt', safe='')}"):
+        response = client.patch(url, params={"security": "medium"}, headers=ADMIN)
+        assert response.status_code == 200 and response.json()["source"] == "q3/controls.txt"
+    response = client.delete(f"/documents/{quote('q3/controls.txt', safe='')}", headers=ADMIN)
+    assert response.status_code == 200 and response.json()["deleted"] == 1
+    assert client.delete("/documents/q3/controls.txt", headers=ADMIN).status_code == 404
+
+
+def test_reset_is_admin_only(client):
+    manager = {**ADMIN, "X-Role": "Manager"}
+    assert client.post("/reset", headers=manager).status_code == 403
+    client.post("/documents", params={"filename": "reset_me.txt", "security": "low"},
+                content=b"Temporary document for the reset test.", headers=ADMIN)
+    assert client.post("/reset", headers=ADMIN).json() == {"reset": True}
+    assert client.get("/documents", headers=ADMIN).json()["documents"] == []
@@ -0,0 +1,71 @@
+# tests/test_api_client.py
+import httpx
+import pytest
+from frontend import api_client
+
+
+def _use(monkeypatch, handler):
+    client = httpx.Client(base_url="http://api", transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(api_client, "_client", client)
+
+
+def _refused(request):
+    raise httpx.ConnectError("connection refused", request=request)
+
+
+class Upload:
+    name = "policy.txt"
+
+    def getvalue(self):
+        return b"text"
+
+
+def test_unreachable_api_is_an_error_not_a_crash(monkeypatch):
+    _use(monkeypatch, _refused)
+    answer = api_client.RemoteAnswer("q", "tester", "Admin")
+    assert answer.status == "error"
+    assert answer.error.startswith("Error: ConnectError")
+    assert list(answer) == []
+    assert api_client.upload_file(Upload(), "low", "tester", "Admin") is False
+
+    items = list(api_client.stream_questionnaire([("1", "a?"), ("2", "b?")], "tester", "Admin"))
+    assert [(i["id"], i["status"]) for i in items] == [("1", "error"), ("2", "error")]
+
+
+def test_error_status_carries_the_api_detail(monkeypatch):
+    _use(monkeypatch, lambda request: httpx.Response(401, json={"detail": "Invalid or missing API token"}))
+    answer = api_client.RemoteAnswer("q", "tester", "Admin")
+    assert answer.status == "error"
+    assert answer.error == "Error: API returned 401: Invalid or missing API token"
+
+
+def test_stream_failure_is_recorded(monkeypatch):
+    class Dropped(httpx.SyncByteStream):
+        def __iter__(self):
+            yield b'event: status\ndata: {"status": "success"}\n\n'
+            yield b'event: token\ndata: {"text": "Partial"}\n\n'
+            raise httpx.ReadError("connection reset")
+
+    _use(monkeypatch, lambda request: httpx.Response(200, stream=Dropped()))
+    answer = api_client.RemoteAnswer("q", "tester", "Admin")
+    assert answer.status == "success"
+    assert "".join(answer) == "PartialError: ReadError: connection reset"
+    assert answer.metrics["error"]
+
+
+def test_admin_calls_raise_api_errors(monkeypatch):
+    _use(monkeypatch, _refused)
+    with pytest.raises(api_client.APIError, match="^Error: ConnectError"):
+        api_client.list_documents("tester", "Admin")
+    with pytest.raises(ValueError):
+        api_client.restore_snapshot("snap", "tester", "Admin")
+
+    _use(monkeypatch, lambda request: httpx.Response(404, json={"detail": "'x' is not indexed"}))
+    assert api_client.delete_document("q3/x.txt", "tester", "Admin") == 0
+    assert api_client.reclassify_document("q3/x.txt", "high", "tester", "Admin") is None
+    with pytest.raises(api_client.APIError, match="404"):
+        api_client.list_snapshots("tester", "Admin")
+
+    _use(monkeypatch, lambda request: httpx.Response(403, json={"detail": "Admin role required"}))
+    with pytest.raises(api_client.APIError, match="Error: API returned 403: Admin role required"):
+        api_client.reset_database("tester", "Manager")
@@ -0,0 +1,63 @@
+# tests/test_audit_log.py
+import sqlite3
+import time
+import pytest
+from backend import audit_log
+
+write_entries = audit_log.write_entries
+
+
+@pytest.fixture
+def fast_writer(monkeypatch):
+    monkeypatch.setattr(audit_log, "LOG_FLUSH_INTERVAL", 0.05)
+    audit_log.flush_logs()
+    yield
+    audit_log.flush_logs()
+
+
+def _fail(entries):
+    raise sqlite3.OperationalError("disk I/O error")
+
+
+def test_entries_are_written_by_flush(fast_writer):
+    before = audit_log.count_audit_logs(user="alice")
+    audit_log.log_action("alice", "Admin", "Query", "q", "ALLOWED")
+    assert audit_log.flush_logs()
+    assert audit_log.count_audit_logs(user="alice") == before + 1
+
+
+def test_reads_do_not_hang_while_writes_fail(fast_writer, monkeypatch):
+    monkeypatch.setattr(audit_log, "write_entries", _fail)
+    before = audit_log.count_audit_logs(user="bob")
+    audit_log.log_action("bob", "Admin", "Query", "q", "ALLOWED")
+
+    start = time.monotonic()
+    assert not audit_log.flush_logs(timeout=2)
+    assert audit_log.count_audit_logs(user="bob") == before
+    assert time.monotonic() - start < 2.5
+    stats = audit_log.get_log_stats()
+    assert stats["failing"] and stats["pending"] == 1
+    assert "disk I/O error" in stats["last_error"]
+
+    # The writer keeps the batch and writes it once the database recovers
+    monkeypatch.setattr(audit_log, "write_entries", write_entries)
+    deadline = time.monotonic() + 2
+    while audit_log.get_log_stats()["failing"] and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert audit_log.flush_logs()
+    assert audit_log.count_audit_logs(user="bob") == before + 1
+
+
+def test_shutdown_writes_the_in_flight_batch(fast_writer, monkeypatch):
+    monkeypatch.setattr(audit_log, "write_entries", _fail)
+    before = audit_log.count_audit_logs(user="carol")
+    audit_log.log_action("carol", "Admin", "Query", "q", "ALLOWED")
+    while not audit_log.get_log_stats()["failing"]:
+        time.sleep(0.01)
+
+    # The writer gives up once stopped; its batch is left for shutdown_logs()
+    monkeypatch.setattr(audit_log, "write_entries", write_entries)
+    audit_log.shutdown_logs()
+    assert not audit_log._writer.is_alive()
+    assert audit_log.count_audit_logs(user="carol") == before + 1
+    assert audit_log.get_log_stats()["pending"] == 0
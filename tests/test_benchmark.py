@@ -0,0 +1,23 @@
+# tests/test_benchmark.py
+from backend import database, llm
+from backend.benchmark import bench_generation, compare
+
+
+def _chat(fail):
+    yield {"message": {"content": "Partial"}}
+    if fail:
+        raise ConnectionError("reset by peer")
+    yield {"done": True, "eval_count": 1}
+
+
+def test_partial_stream_failures_count_as_errors(monkeypatch):
+    monkeypatch.setattr(database, "query_documents", lambda question, role, user: ({"ids": [[]]}, "success"))
+    monkeypatch.setattr(llm, "generate_rag_response",
+                        lambda question, results, prompt_stats, user: (_chat(question == "fails"), []))
+    report = bench_generation([{"question": "works"}, {"question": "fails"}], 2)
+    assert report["errors"] == 1
+
+
+def test_compare_reports_numeric_changes():
+    changes = compare({"a": {"ms": 12.0, "name": "x"}, "b": 3}, {"a": {"ms": 10.0}})
+    assert changes == {"a.ms": {"baseline": 10.0, "current": 12.0, "change_pct": 20.0}}
@@ -0,0 +1,69 @@
+# tests/test_chunking.py
+import pytest
+from backend import chunking
+from backend.chunking import ChunkPacker, count_tokens, iter_chunks, split_units
+
+
+pytestmark = pytest.mark.usefixtures("word_estimate")
+
+
+def _page(n, lines=60):
+    return "\n".join(f"Line {n}.{i} of the scanned report text" for i in range(lines)) + "\n"
+
+
+def test_single_newline_pages_stream_before_eof(monkeypatch):
+    consumed = []
+    handed_on = []
+    real_split = chunking.split_units
+    monkeypatch.setattr(chunking, "split_units", lambda text: handed_on.append(len(text)) or real_split(text))
+
+    def pages():
+        # One paragraph break up front, then single newlines only
+        yield "AUDIT REPORT\n\n"
+        for n in range(200):
+            consumed.append(n)
+            yield _page(n)
+
+    chunks = iter_chunks(pages())
+    next(chunks)
+    assert len(consumed) < 200
+    list(chunks)
+    assert max(handed_on) < chunking._MAX_PENDING_CHARS + len(_page(0))
+
+
+def test_paragraph_breaks_are_not_carried_over():
+    pieces = ["First paragraph.\n\nSecond paragraph", " continues here.\n\n", "Third."]
+    text = " ".join(iter_chunks(iter(pieces), max_tokens=5, overlap_tokens=0))
+    assert "First paragraph." in text
+    assert "Second paragraph continues here." in text
+    assert "Third." in text
+
+
+def test_chunks_respect_token_budget():
+    text = " ".join(f"Sentence number {i} describes a control." for i in range(200))
+    chunks = list(iter_chunks(iter([text]), max_tokens=40, overlap_tokens=8))
+    assert len(chunks) > 1
+    assert all(tokens <= 40 for tokens in count_tokens(chunks))
+
+
+def test_heading_starts_a_new_chunk():
+    units = split_units("Intro sentence here.\n\n4.2 Access Reviews\nReviews are quarterly.")
+    assert ("4.2 Access Reviews", True) in units
+    packer = ChunkPacker(max_tokens=200, overlap_tokens=0)
+    chunks = list(packer.feed(units)) + list(packer.finish())
+    assert chunks[0] == "Intro sentence here."
+    assert chunks[1].startswith("4.2 Access Reviews")
+
+
+def test_failed_tokenizer_load_is_retried(monkeypatch):
+    monkeypatch.setattr(chunking, "_tokenizer_loaded", False)
+    monkeypatch.setattr(chunking, "_tokenizer_retry_at", 0.0)
+    monkeypatch.setattr(chunking.os.path, "exists", lambda path: False)
+    from chromadb.utils.embedding_functions.onnx_mini_lm_l6_v2 import ONNXMiniLM_L6_V2
+
+    def offline(self):
+        raise OSError("offline")
+    monkeypatch.setattr(ONNXMiniLM_L6_V2, "_download_model_if_not_exists", offline)
+    assert chunking._get_tokenizer() is None
+    assert chunking._tokenizer_loaded is False
+    assert chunking._tokenizer_retry_at > 0
@@ -0,0 +1,43 @@
+# tests/test_embeddings.py
+import os
+import numpy as np
+from backend.embeddings import EmbeddingCache
+
+
+def _key(n):
+    return n.to_bytes(16, "big")
+
+
+def test_round_trip_and_reopen(tmp_path):
+    cache = EmbeddingCache(str(tmp_path), 4)
+    vectors = np.arange(8, dtype=np.float32).reshape(2, 4)
+    cache.put_many([_key(1), _key(2)], vectors)
+    assert np.array_equal(cache.get_many([_key(2)])[0], vectors[1])
+    assert cache.get_many([_key(3)]) == [None]
+
+    reopened = EmbeddingCache(str(tmp_path), 4)
+    assert len(reopened) == 2
+    assert np.array_equal(reopened.get_many([_key(1)])[0], vectors[0])
+
+
+def test_torn_tail_is_truncated_before_appending(tmp_path):
+    cache = EmbeddingCache(str(tmp_path), 4)
+    cache.put_many([_key(1)], np.ones((1, 4), dtype=np.float32))
+    with open(cache.path, "ab") as f:
+        f.write(b"\x01" * 5)
+
+    reopened = EmbeddingCache(str(tmp_path), 4)
+    assert os.path.getsize(reopened.path) % reopened.dtype.itemsize == 0
+    fresh = np.array([[0.5, -1.0, 2.0, 3.5]], dtype=np.float32)
+    reopened.put_many([_key(2)], fresh)
+    assert np.array_equal(reopened.get_many([_key(2)])[0], fresh[0])
+    assert np.array_equal(EmbeddingCache(str(tmp_path), 4).get_many([_key(2)])[0], fresh[0])
+
+
+def test_append_after_foreign_torn_record_is_not_indexed(tmp_path):
+    cache = EmbeddingCache(str(tmp_path), 4)
+    # Another process leaves a partial record after this one opened the file
+    with open(cache.path, "ab") as f:
+        f.write(b"\x01" * 5)
+    cache.put_many([_key(1)], np.ones((1, 4), dtype=np.float32))
+    assert cache.get_many([_key(1)]) == [None]
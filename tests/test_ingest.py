@@ -0,0 +1,45 @@
+# tests/test_ingest.py
+from backend.ingest import iter_file_text
+
+
+def test_extensions_are_case_insensitive(tmp_path):
+    path = tmp_path / "POLICY.TXT"
+    path.write_text("Access reviews are quarterly.", encoding="utf-8")
+    assert "".join(iter_file_text(str(path))) == "Access reviews are quarterly."
+    assert list(iter_file_text(str(tmp_path / "notes.md"))) == []
+
+
+def test_deleting_a_legacy_file_counts_its_chunks(fake_embedder):
+    from backend import lexical_index, vector_store
+    from backend.database import delete_document
+    from backend.ingest import add_batch
+
+    # Indexed before the manifest existed: random IDs, no manifest entry
+    documents = ["Legacy finding one.", "Legacy finding two."]
+    add_batch(vector_store.get_collection(), documents,
+              [{"source": "legacy.txt", "security": "medium"}] * 2, ["legacy-a91f", "legacy-03bc"])
+    assert delete_document("legacy.txt") == 2
+    assert vector_store.get_collection().get(where={"source": "legacy.txt"}, include=[])["ids"] == []
+    assert lexical_index.search("legacy finding", 5)["ids"][0] == []
+    assert delete_document("legacy.txt") == 0
+
+
+def test_deleting_a_nested_bulk_source_keeps_the_upload_of_the_same_name(fake_embedder, word_estimate, tmp_path):
+    import os
+    from backend.bulk_ingest import ingest_folder
+    from backend.database import delete_document, index_saved_file
+    from config import DATA_FOLDER
+
+    os.makedirs(DATA_FOLDER, exist_ok=True)
+    upload = os.path.join(DATA_FOLDER, "report.txt")
+    with open(upload, "w", encoding="utf-8") as f:
+        f.write("Uploaded report on vendor onboarding.")
+    assert index_saved_file(upload, "report.txt", "low") is not None
+    (tmp_path / "sub").mkdir()
+    (tmp_path / "sub" / "report.txt").write_text("Bulk report on change tickets.", encoding="utf-8")
+    assert ingest_folder(str(tmp_path), "low", workers=1).docs == 1
+
+    assert delete_document(os.path.join("sub", "report.txt")) == 1
+    assert os.path.exists(upload)
+    assert delete_document("report.txt") == 1
+    assert not os.path.exists(upload)
@@ -0,0 +1,24 @@
+# tests/test_lexical_index.py
+from backend import lexical_index
+
+
+def test_stopwords_are_dropped():
+    assert lexical_index.build_query("What is the status of SOX-404?") == '"status" OR "sox-404"'
+    assert lexical_index.build_query("what was it") == ""
+    assert lexical_index.build_query('AC-2" OR NEAR(x') == '"ac-2" OR "near" OR "x"'
+
+
+def test_common_terms_are_dropped_once_the_index_is_large():
+    ids = [f"lex-{i}" for i in range(150)]
+    texts = [f"lexfinding raised for lexcontrol LX-{i}" for i in range(150)]
+    lexical_index.add(ids, texts, [{"source": "lex.txt", "security": "low"}] * len(ids))
+    try:
+        with lexical_index._lock:
+            conn = lexical_index._get_connection()
+            assert lexical_index.build_query("lexfinding for lexcontrol LX-7?", conn) == '"lx-7"'
+            # Nothing rare left: the rarest common term is still searched
+            assert lexical_index.build_query("lexfinding lexcontrol", conn) in ('"lexfinding"', '"lexcontrol"')
+        hits = lexical_index.search("Which lexfinding was raised for lexcontrol LX-7?", 5)
+        assert hits["ids"][0] == ["lex-7"]
+    finally:
+        lexical_index.delete(ids)
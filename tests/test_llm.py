@@ -0,0 +1,25 @@
+# tests/test_llm.py
+import time
+from backend.llm import stream_text
+
+
+def _chunks(*texts, fail=None):
+    for text in texts:
+        yield {"message": {"content": text}}
+    if fail:
+        raise fail
+    yield {"done": True, "eval_count": len(texts), "message": {"content": ""}}
+
+
+def test_stream_text_records_metrics():
+    metrics = {}
+    assert "".join(stream_text(_chunks("Hello", " world"), time.perf_counter(), metrics)) == "Hello world"
+    assert metrics["tokens"] == 2
+    assert "ttft_ms" in metrics and "error" not in metrics
+
+
+def test_stream_error_is_flagged():
+    metrics = {}
+    text = "".join(stream_text(_chunks("Partial", fail=ConnectionError("reset")), time.perf_counter(), metrics))
+    assert text == "PartialError: reset"
+    assert metrics["error"] == "reset"
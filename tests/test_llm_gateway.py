@@ -0,0 +1,82 @@
+# tests/test_llm_gateway.py
+import threading
+import pytest
+from backend.llm_gateway import GatewayBusy, LLMGateway
+
+
+class FakeClient:
+    """
+    Stands in for ollama.Client: records the order requests reach it and
+    streams each one's chunks only as the test releases them.
+    """
+
+    def __init__(self):
+        self.started = []
+        self.closed = []
+        self.release = threading.Semaphore(0)
+        self.first_started = threading.Event()
+
+    def chat(self, model, messages, stream, options):
+        name = messages[0]["content"]
+        self.started.append(name)
+        self.first_started.set()
+
+        def chunks():
+            try:
+                for i in range(3):
+                    assert self.release.acquire(timeout=5)
+                    yield {"message": {"content": f"{name}:{i}"}}
+                yield {"done": True}
+            finally:
+                self.closed.append(name)
+        return chunks()
+
+
+@pytest.fixture
+def gateway():
+    gateway = LLMGateway(host="http://127.0.0.1:9", max_concurrent=1, max_queued_per_user=3)
+    gateway.client = FakeClient()
+    return gateway
+
+
+def _submit(gateway, user, name):
+    return gateway.submit(user, "model", [{"role": "user", "content": name}])
+
+
+def _text(request):
+    return [chunk["message"]["content"] for chunk in request if "message" in chunk]
+
+
+def test_waiting_users_are_served_round_robin(gateway):
+    first = _submit(gateway, "alice", "a0")
+    assert gateway.client.first_started.wait(5)
+    # alice queues a burst before bob asks once; bob still goes second
+    requests = [first] + [_submit(gateway, "alice", f"a{i}") for i in (1, 2, 3)] + [_submit(gateway, "bob", "b0")]
+    with pytest.raises(GatewayBusy):
+        _submit(gateway, "alice", "a4")
+    gateway.client.release.release(3 * len(requests))
+    assert [_text(request)[-1] for request in requests] == ["a0:2", "a1:2", "a2:2", "a3:2", "b0:2"]
+    assert gateway.client.started == ["a0", "a1", "b0", "a2", "a3"]
+    stats = gateway.get_stats()
+    assert stats["completed"] == 5 and stats["rejected"] == 1 and stats["queued"] == 0
+
+
+def test_cancelled_requests_free_the_worker(gateway):
+    first = _submit(gateway, "alice", "a0")
+    assert gateway.client.first_started.wait(5)
+    waiting = _submit(gateway, "bob", "b0")
+    waiting.cancel()
+    after = _submit(gateway, "carol", "c0")
+
+    # A consumer that stops after one chunk cancels the running generation
+    gateway.client.release.release()
+    stream = iter(first)
+    assert next(stream)["message"]["content"] == "a0:0"
+    stream.close()
+    assert first.cancelled.is_set()
+
+    gateway.client.release.release(4)  # one for the worker to see the cancellation
+    assert _text(after) == ["c0:0", "c0:1", "c0:2"]
+    assert gateway.client.started == ["a0", "c0"]
+    assert "a0" in gateway.client.closed
+    assert gateway.get_stats()["cancelled"] == 2
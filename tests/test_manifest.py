@@ -0,0 +1,60 @@
+# tests/test_manifest.py
+from backend import manifest
+
+
+def test_chunk_ids_are_content_addressed():
+    assert manifest.chunk_id("a.txt", "text") == manifest.chunk_id("a.txt", "text")
+    assert manifest.chunk_id("a.txt", "text") != manifest.chunk_id("b.txt", "text")
+    assert manifest.chunk_id("a.txt", "text").startswith("a.txt_")
+
+
+def test_record_get_and_remove(tmp_path):
+    path = tmp_path / "f.txt"
+    path.write_bytes(b"abc")
+    manifest.record_file("manifest-f.txt", manifest.hash_file(str(path)), "medium", {"x", "y"})
+    entry = manifest.get_file("manifest-f.txt")
+    assert entry["security"] == "medium" and entry["chunk_ids"] == {"x", "y"}
+    assert "manifest-f.txt" in [f["source"] for f in manifest.list_files()]
+    manifest.remove_file("manifest-f.txt")
+    assert manifest.get_file("manifest-f.txt") is None
+
+
+def _paragraph(topic, n=150):
+    return " ".join(f"{topic} control evidence item {i} was reviewed." for i in range(n // 7))
+
+
+def test_reingest_only_embeds_changed_chunks(fake_embedder, word_estimate, tmp_path, monkeypatch):
+    from backend import vector_store
+    from backend.ingest import ingest_file, reclassify_source
+
+    path = tmp_path / "revisions.txt"
+    topics = ["Payroll", "Treasury", "Procurement", "Inventory"]
+    path.write_text("\n\n".join(_paragraph(t) for t in topics), encoding="utf-8")
+    first = ingest_file(str(path), "revisions.txt", "low")
+    assert first["status"] == "indexed" and first["added"] == first["chunks"] >= len(topics)
+
+    embedded = []
+    real_embed = vector_store.embed
+    monkeypatch.setattr(vector_store, "embed", lambda texts: embedded.extend(texts) or real_embed(texts))
+    assert ingest_file(str(path), "revisions.txt", "low")["status"] == "unchanged"
+    assert embedded == []
+
+    # One paragraph revised: its chunks are embedded, the replaced ones deleted
+    topics[-1] = "Warehouse"
+    path.write_text("\n\n".join(_paragraph(t) for t in topics), encoding="utf-8")
+    second = ingest_file(str(path), "revisions.txt", "low")
+    assert 0 < second["added"] < second["chunks"]
+    assert second["deleted"] == second["added"]
+    assert all("Warehouse" in text for text in embedded)
+    collection = vector_store.get_collection()
+    stored = collection.get(where={"source": "revisions.txt"})
+    assert sorted(stored["ids"]) == sorted(manifest.get_file("revisions.txt")["chunk_ids"])
+    assert not any("Inventory" in text for text in stored["documents"])
+
+    # A new level moves the stored chunks without re-embedding them
+    embedded.clear()
+    assert reclassify_source(collection, "revisions.txt", "high") == second["chunks"]
+    assert embedded == []
+    assert collection.partitions["low"].get(where={"source": "revisions.txt"}, include=[])["ids"] == []
+    moved = collection.get(where={"source": "revisions.txt"}, include=["metadatas"])["metadatas"]
+    assert {m["security"] for m in moved} == {"high"}
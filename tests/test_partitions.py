@@ -0,0 +1,90 @@
+# tests/test_partitions.py
+import numpy as np
+from backend.partitions import PartitionedCollection, level_of, migrate_legacy
+from backend.shard_store import ShardCollection
+from config import SECURITY_LEVELS
+
+DIM = 8
+
+
+def _collection(folder):
+    return PartitionedCollection({level: ShardCollection(str(folder / level), dim=DIM, shard_rows=16)
+                                  for level in SECURITY_LEVELS})
+
+
+def _vectors(n):
+    return np.random.default_rng(1).normal(size=(n, DIM)).astype(np.float32)
+
+
+def _where(collection, cid):
+    return [level for level, partition in collection.partitions.items() if partition.get(ids=[cid])["ids"]]
+
+
+def test_unlabelled_chunks_are_most_restricted():
+    assert level_of(None) == level_of({"security": "secret"}) == SECURITY_LEVELS[-1]
+    assert level_of({"security": "low"}) == "low"
+
+
+def test_upsert_routes_and_moves_between_levels(tmp_path):
+    collection = _collection(tmp_path)
+    vectors = _vectors(3)
+    collection.upsert(documents=["a", "b", "c"], embeddings=vectors, ids=["a", "b", "c"],
+                      metadatas=[{"security": "low"}, {"security": "high"}, {}])
+    assert collection.counts() == {"low": 1, "medium": 0, "high": 2}
+
+    # Re-upserting at another level leaves exactly one copy
+    collection.upsert(documents=["a"], embeddings=vectors[:1], ids=["a"], metadatas=[{"security": "medium"}])
+    assert _where(collection, "a") == ["medium"]
+    assert collection.count() == 3
+
+
+def test_update_moves_stored_embeddings(tmp_path):
+    collection = _collection(tmp_path)
+    vectors = _vectors(2)
+    collection.upsert(documents=["a", "b"], embeddings=vectors, ids=["a", "b"],
+                      metadatas=[{"security": "low", "source": "x"}, {"security": "low", "source": "x"}])
+    collection.update(ids=["a", "b"], metadatas=[{"security": "high", "source": "x"},
+                                                 {"security": "low", "source": "y"}])
+    assert _where(collection, "a") == ["high"] and _where(collection, "b") == ["low"]
+    moved = collection.get(ids=["a"], include=["documents", "embeddings", "metadatas"])
+    assert moved["documents"] == ["a"] and moved["metadatas"] == [{"security": "high", "source": "x"}]
+    assert np.allclose(moved["embeddings"][0], vectors[0])
+    assert collection.get(ids=["b"])["metadatas"] == [{"security": "low", "source": "y"}]
+
+
+def test_query_searches_only_allowed_levels(tmp_path):
+    collection = _collection(tmp_path)
+    vectors = _vectors(3)
+    collection.upsert(documents=["a", "b", "c"], embeddings=vectors, ids=["a", "b", "c"],
+                      metadatas=[{"security": level} for level in SECURITY_LEVELS])
+    everything = collection.query(vectors[[2]], n_results=3)
+    assert everything["ids"][0][0] == "c" and sorted(everything["ids"][0]) == ["a", "b", "c"]
+    assert sorted(collection.query(vectors[[2]], n_results=3, levels=["low", "medium"])["ids"][0]) == ["a", "b"]
+    assert collection.query(vectors[[2]], n_results=3, levels=[])["ids"] == [[]]
+
+
+def test_get_pages_across_partitions(tmp_path):
+    collection = _collection(tmp_path)
+    ids = [f"c{i}" for i in range(7)]
+    collection.upsert(documents=ids, embeddings=_vectors(7), ids=ids,
+                      metadatas=[{"security": SECURITY_LEVELS[i % 3], "source": f"s{i % 2}"} for i in range(7)])
+    pages = [collection.get(include=[], limit=3, offset=offset)["ids"] for offset in (0, 3, 6)]
+    assert [len(page) for page in pages] == [3, 3, 1]
+    assert sorted(sum(pages, [])) == sorted(ids)
+    assert sorted(collection.get(where={"source": "s1"}, include=[])["ids"]) == ["c1", "c3", "c5"]
+
+
+def test_migrate_legacy_copies_embeddings(tmp_path):
+    import chromadb
+    client = chromadb.PersistentClient(path=str(tmp_path / "chroma"))
+    legacy = client.create_collection("legacy", embedding_function=None)
+    vectors = _vectors(5)
+    legacy.add(ids=[f"c{i}" for i in range(5)], embeddings=vectors, documents=[f"d{i}" for i in range(5)],
+               metadatas=[{"security": SECURITY_LEVELS[i % 3]} for i in range(5)])
+    collection = _collection(tmp_path / "shards")
+
+    assert migrate_legacy(client, "legacy", collection, page_size=2) == 5
+    assert "legacy" not in [getattr(c, "name", c) for c in client.list_collections()]
+    assert collection.counts() == {"low": 2, "medium": 2, "high": 1}
+    assert np.allclose(collection.get(ids=["c3"], include=["embeddings"])["embeddings"][0], vectors[3])
+    assert migrate_legacy(client, "legacy", collection) == 0
@@ -0,0 +1,38 @@
+# tests/test_questionnaire.py
+from backend import questionnaire
+
+
+def _group(*questions):
+    return [({"question": q, "status": "success"}, [{"source": "policy.txt"}]) for q in questions]
+
+
+def _chat(*chunks, error=None):
+    def stream():
+        for text in chunks:
+            yield {"message": {"content": text}}
+        if error:
+            raise ConnectionError(error)
+    return stream()
+
+
+def test_answer_starting_with_error_is_not_a_failure(monkeypatch):
+    monkeypatch.setattr(questionnaire, "build_prompt", lambda question, results: ("prompt", ["policy.txt"], 0))
+    monkeypatch.setattr(questionnaire, "submit_prompt", lambda prompt, user: _chat("Error: budgets ", "are reviewed."))
+    (item, _), = questionnaire._generate(_group("What does the log say?"), "tester")
+    assert item["status"] == "success"
+    assert item["answer"] == "Error: budgets are reviewed."
+
+
+def test_failed_stream_marks_the_group_as_error(monkeypatch):
+    monkeypatch.setattr(questionnaire, "build_batch_prompt", lambda questions, results: ("prompt", ["policy.txt"], 0))
+    monkeypatch.setattr(questionnaire, "submit_prompt", lambda prompt, user: _chat("Partial", error="reset"))
+    group = questionnaire._generate(_group("a?", "b?"), "tester")
+    assert [item["status"] for item, _ in group] == ["error", "error"]
+    assert group[0][0]["answer"] == "Error: reset"
+
+
+def test_refused_request_marks_the_group_as_error(monkeypatch):
+    monkeypatch.setattr(questionnaire, "build_prompt", lambda question, results: ("prompt", ["policy.txt"], 0))
+    monkeypatch.setattr(questionnaire, "submit_prompt", lambda prompt, user: "Error: queue full")
+    (item, _), = questionnaire._generate(_group("a?"), "tester")
+    assert (item["status"], item["answer"]) == ("error", "Error: queue full")
@@ -0,0 +1,91 @@
+# tests/test_shard_store.py
+import os
+import numpy as np
+import pytest
+from backend.shard_store import ShardCollection, is_sealed, quantize
+
+DIM = 8
+
+
+def _vectors(n, seed=0):
+    return np.random.default_rng(seed).normal(size=(n, DIM)).astype(np.float32)
+
+
+def _store(folder, **kwargs):
+    return ShardCollection(str(folder), dim=DIM, shard_rows=4, **kwargs)
+
+
+def _fill(store, n):
+    vectors = _vectors(n)
+    ids = [f"c{i}" for i in range(n)]
+    store.upsert(ids=ids, embeddings=vectors, documents=[f"doc {i}" for i in range(n)],
+                 metadatas=[{"source": f"s{i % 2}.txt", "security": "low"} for i in range(n)])
+    return ids, vectors
+
+
+@pytest.mark.parametrize("quantization", ["int8", "float16"])
+def test_query_rescores_to_exact_neighbours(tmp_path, quantization):
+    store = _store(tmp_path, quantization=quantization)
+    ids, vectors = _fill(store, 10)
+    results = store.query(vectors[[3, 7]], n_results=2)
+    assert [hits[0] for hits in results["ids"]] == ["c3", "c7"]
+    assert results["distances"][0][0] == pytest.approx(0.0, abs=1e-5)
+
+    filtered = store.query(vectors[[3]], n_results=10, where={"source": "s0.txt"})
+    assert filtered["ids"][0][0] != "c3" and all(int(i[1:]) % 2 == 0 for i in filtered["ids"][0])
+
+
+def test_upsert_replaces_and_reopen_keeps_rows(tmp_path):
+    store = _store(tmp_path)
+    ids, vectors = _fill(store, 6)
+    store.upsert(ids=["c1"], embeddings=vectors[[5]], documents=["replaced"], metadatas=[{"source": "s1.txt"}])
+    assert store.count() == 6
+    store.close()
+
+    reopened = _store(tmp_path)
+    assert reopened.count() == 6
+    assert reopened.get(ids=["c1"])["documents"] == ["replaced"]
+    assert np.allclose(reopened.get(ids=["c1"], include=["embeddings"])["embeddings"][0], vectors[5])
+    assert sorted(reopened.get(where={"source": "s0.txt"}, include=[])["ids"]) == ["c0", "c2", "c4"]
+
+
+def test_compaction_renumbers_slots(tmp_path):
+    store = _store(tmp_path)
+    ids, vectors = _fill(store, 12)
+    store.delete(ids=ids[:8])  # 8 dead of 12 slots: rewritten into one new-generation shard
+    assert store.footprint()["slots"] == 4
+    shards = sorted(name for name in os.listdir(tmp_path) if name.startswith("shard-"))
+    assert shards == ["shard-0001-00000.f32", "shard-0001-00000.q"]
+
+    kept = store.get(include=["embeddings"])
+    assert kept["ids"] == ids[8:]
+    assert np.allclose(np.array(kept["embeddings"]), vectors[8:])
+    assert store.query(vectors[[9]], n_results=1)["ids"] == [["c9"]]
+    store.close()
+    assert _store(tmp_path).query(vectors[[11]], n_results=1)["ids"] == [["c11"]]
+
+
+def test_torn_tail_is_dropped_on_open(tmp_path):
+    store = _store(tmp_path)
+    _fill(store, 6)
+    store.close()
+    last = tmp_path / "shard-0000-00001.q"
+    os.truncate(last, os.path.getsize(last) - 1)
+
+    reopened = _store(tmp_path)
+    assert reopened.count() == 5
+    assert "c5" not in reopened.get(include=[])["ids"]
+
+
+def test_sealed_shards(tmp_path):
+    store = _store(tmp_path)
+    _fill(store, 6)
+    assert is_sealed(str(tmp_path / "shard-0000-00000.q"))
+    assert not is_sealed(str(tmp_path / "shard-0000-00001.q"))
+
+
+def test_int8_quantization_keeps_direction():
+    vectors = _vectors(5)
+    quantized, scale = quantize(vectors, "int8")
+    assert quantized.dtype == np.int8 and np.abs(quantized).max() == 127
+    assert np.allclose(quantized * scale[:, None], vectors, atol=scale.max())
@@ -0,0 +1,38 @@
+# tests/test_warmup.py
+import pytest
+from backend import lexical_index, vector_store, warmup
+from frontend import api_client
+
+
+@pytest.fixture
+def fresh_status(monkeypatch):
+    monkeypatch.setattr(warmup, "_thread", None)
+    monkeypatch.setattr(warmup, "_status", {"state": "idle", "steps": {}, "error": None, "total_ms": 0.0})
+
+
+def _forbidden(*args, **kwargs):
+    raise AssertionError("the thin client must not open the local stores")
+
+
+def test_thin_client_only_connects_to_the_api(fresh_status, monkeypatch):
+    monkeypatch.setattr(vector_store, "get_collection", _forbidden)
+    monkeypatch.setattr(vector_store, "embed", _forbidden)
+    monkeypatch.setattr(lexical_index, "count", _forbidden)
+    monkeypatch.setattr(api_client, "get_health", lambda: {"open": True})
+
+    warmup.start_warmup(thin_client=True)
+    warmup._thread.join(5)
+    status = warmup.get_warmup_status()
+    assert status["state"] == "done", status["error"]
+    assert set(status["steps"]) == {"import_httpx", "import_pandas", "connect_api"}
+
+
+def test_unreachable_api_marks_warmup_failed(fresh_status, monkeypatch):
+    def down():
+        raise api_client.APIError("Error: ConnectError: connection refused")
+    monkeypatch.setattr(api_client, "get_health", down)
+
+    warmup.start_warmup(thin_client=True)
+    warmup._thread.join(5)
+    assert warmup.get_warmup_status()["state"] == "failed"
+    assert "connection refused" in warmup.get_warmup_status()["error"]